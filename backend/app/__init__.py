@@ -1,35 +1,69 @@
-from flask import Flask, send_from_directory
+from flask import Flask
 from .config import Config
-from .extensions import db, migrate, jwt, cors
+from .extensions import db, migrate, jwt, cors, job_queue
 import os
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    if app.config.get("MODEL_SERVING") == "sidecar" and not app.config.get("MODEL_SERVER_AUTHKEY"):
+        raise RuntimeError("MODEL_SERVER_AUTHKEY es obligatoria con MODEL_SERVING=sidecar")
+
+    from app.services import db_routing
+    db_routing.configure(app)
     db.init_app(app)
+    db_routing.init_app(app, db)
     migrate.init_app(app, db)
     jwt.init_app(app)
     cors.init_app(app, resources={r"/api/*": {"origins": "*"}}) # cambiar en producción
+    job_queue.init_app(app)
 
 
     # 👇 ESTA LÍNEA ES OBLIGATORIA
     from app import models  
 
-    MEDIA_ROOT = os.path.join(os.getcwd(), "media")
+    from app.services import dashboard, identity, prediction_cache
+    dashboard.init_app(app)
+    identity.init_app(app)
+    prediction_cache.init_app(app)
+
+    from app import commands
+    commands.init_app(app)
+
+    from app.services import query_counter
+    query_counter.init_app(app)
 
-    @app.route("/media/<path:filename>")
-    def media_files(filename):
-        return send_from_directory(MEDIA_ROOT, filename)
+    if app.config.get("METRICS_ENABLED"):
+        from app.services import metrics
+        metrics.init_app(app)
 
     from app.routes.diagnosis_routes import diagnosis_bp
     from app.routes.auth_routes import auth_bp
     from app.routes.patient_routes import patient_bp
     from app.routes.dashboard_routes import dashboard_bp
+    from app.routes.health_routes import health_bp
+    from app.routes.media_routes import media_bp
 
     app.register_blueprint(diagnosis_bp, url_prefix="/api/diagnoses")
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
     app.register_blueprint(patient_bp, url_prefix="/api/patients")
     app.register_blueprint(dashboard_bp, url_prefix="/api/dashboard")
+    app.register_blueprint(health_bp, url_prefix="/api/health")
+    app.register_blueprint(media_bp, url_prefix="/media")
+
+    if app.config.get("METRICS_ENABLED"):
+        from app.routes.metrics_routes import metrics_bp
+        app.register_blueprint(metrics_bp, url_prefix="/metrics")
+
+    # Warm-up del modelo en segundo plano con el primer request (los comandos
+    # de CLI como `flask db upgrade` no lo disparan)
+    if app.config.get("MODEL_WARMUP") == "background":
+        from app.ml.covid_predictor import MODELS, MODELS_AVAILABLE
+
+        @app.before_request
+        def _warmup_models():
+            if MODELS_AVAILABLE and MODELS.state == "idle":
+                MODELS.start_background()
 
     return app
@@ -0,0 +1,137 @@
+# app/commands.py
+import glob
+import os
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app.ml import covid_predictor
+from app.ml.covid_predictor import MODELS
+from app.services import dashboard, heatmaps, media_migration, query_plans, stats
+
+stats_cli = AppGroup("stats", help="Estadísticas materializadas por doctor (doctor_stats).")
+plans_cli = AppGroup("plans", help="Planes de ejecución del SQL de los endpoints.")
+heatmaps_cli = AppGroup("heatmaps", help="Grad-CAM diferidos (HEATMAP_MODE lazy/background).")
+model_cli = AppGroup("model", help="Variantes optimizadas del DenseNet169 (MODEL_BACKEND).")
+storage_cli = AppGroup("storage", help="Archivos de media (STORAGE_BACKEND).")
+
+
+@stats_cli.command("rebuild")
+def rebuild_stats():
+    """Recalcula doctor_stats y doctor_daily_stats desde cero."""
+    doctors, buckets = stats.rebuild()
+    dashboard.summary_cache.clear()
+    click.echo(f"doctor_stats reconstruida: {doctors} doctores, {buckets} buckets diarios")
+
+
+@stats_cli.command("check")
+def check_stats():
+    """Compara doctor_stats contra un recuento completo."""
+    problems = stats.check()
+    for problem in problems:
+        click.echo(problem)
+    if problems:
+        raise SystemExit(1)
+    click.echo("doctor_stats consistente")
+
+
+@plans_cli.command("check")
+@click.option("--doctor-id", type=int, help="Doctor con el que se hacen las consultas (por defecto el primero).")
+@click.option("--strict", is_flag=True, help="Termina con error si alguna consulta recorre una tabla completa.")
+def check_plans(doctor_id, strict):
+    """Ejecuta los endpoints de lectura y muestra el EXPLAIN de su SQL."""
+    try:
+        report = query_plans.check_endpoints(current_app._get_current_object(), doctor_id)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+    full_scans = 0
+    for url, statement, plan in report:
+        click.echo(f"\n{url}\n  {' '.join(statement.split())[:160]}")
+        for detail, full_scan in plan:
+            full_scans += full_scan
+            click.echo(f"    {'FULL SCAN ' if full_scan else 'ok        '}{detail}")
+
+    click.echo(f"\n{len(report)} consultas, {full_scans} recorridos completos")
+    if strict and full_scans:
+        raise SystemExit(1)
+
+
+@heatmaps_cli.command("render")
+@click.option("--limit", type=int, help="Máximo de heatmaps a generar.")
+def render_heatmaps(limit):
+    """Genera los heatmaps pendientes de la versión actual del modelo."""
+    # Se listan antes de generar: ensure() no debe competir con el cursor abierto
+    pending = list(heatmaps.pending(limit))
+    if pending:
+        MODELS.load()
+
+    for heatmap_path in pending:
+        heatmaps.ensure(heatmap_path)
+        click.echo(heatmap_path)
+    click.echo(f"{len(pending)} heatmaps generados")
+
+
+@storage_cli.command("migrate")
+@click.option("--dry-run", is_flag=True, help="Solo lista las rutas a migrar.")
+@click.option("--batch-size", type=int, default=200, show_default=True, help="Filas por commit.")
+def migrate_storage(dry_run, batch_size):
+    """Mueve radiografías y heatmaps a claves particionadas y actualiza la base."""
+    counts = {}
+    for path, key, status in media_migration.migrate(dry_run, batch_size):
+        counts[status] = counts.get(status, 0) + 1
+        click.echo(f"{status:8} {path} -> {key}")
+
+    click.echo(", ".join(f"{n} {status}" for status, n in sorted(counts.items())) or "Nada que migrar")
+
+
+@model_cli.command("export-tflite")
+@click.option("--quantization", type=click.Choice(["float16", "int8", "dynamic"]), default="float16", show_default=True)
+@click.option("--output", type=click.Path(dir_okay=False), help="Destino (por defecto MODEL_TFLITE_PATH).")
+@click.option("--samples", type=click.Path(exists=True, file_okay=False),
+              help="Carpeta con radiografías para calibrar int8.")
+@click.option("--calibration-size", type=int, default=100, show_default=True)
+def export_tflite(quantization, output, samples, calibration_size):
+    """Exporta el extractor de features de DenseNet169 a TFLite cuantizado."""
+    from app.ml.inference_engine import export_tflite as export
+
+    images = []
+    if samples:
+        paths = sorted(
+            path for path in glob.glob(os.path.join(samples, "**", "*"), recursive=True)
+            if os.path.splitext(path)[1].lower() in (".png", ".jpg", ".jpeg")
+        )
+        images = [covid_predictor.load_image(path) for path in paths[:calibration_size]]
+
+    output = output or covid_predictor.TFLITE_PATH
+    try:
+        export(output, quantization, images)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    click.echo(f"{output}: {os.path.getsize(output) / 1e6:.1f} MB ({quantization}, {len(images)} imágenes de calibración)")
+
+
+@model_cli.command("export-xgb")
+def export_xgb():
+    """Guarda el XGBoost del pickle como booster JSON nativo."""
+    import numpy as np
+
+    booster = covid_predictor.load_booster(covid_predictor.MODEL_PATH)
+    booster.save_model(covid_predictor.XGB_BOOSTER_PATH)
+
+    # El booster exportado debe predecir exactamente lo mismo
+    features = np.random.default_rng(0).random((64, booster.num_features()), dtype=np.float32) * 4
+    exported = covid_predictor.load_booster(covid_predictor.XGB_BOOSTER_PATH)
+    if not np.array_equal(booster.inplace_predict(features), exported.inplace_predict(features)):
+        os.remove(covid_predictor.XGB_BOOSTER_PATH)
+        raise click.ClickException("El booster exportado no coincide con el pickle")
+    click.echo(f"{covid_predictor.XGB_BOOSTER_PATH}: {booster.num_features()} features")
+
+
+def init_app(app):
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(plans_cli)
+    app.cli.add_command(heatmaps_cli)
+    app.cli.add_command(model_cli)
+    app.cli.add_command(storage_cli)
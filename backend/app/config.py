@@ -10,5 +10,115 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Pool de conexiones (no aplica a SQLite) y réplica de solo lectura
+    # opcional para los listados (app/services/db_routing.py)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # < wait_timeout de MySQL
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+    SQLALCHEMY_REPLICA_URI = os.getenv("DATABASE_REPLICA_URL")
+
     JWT_SECRET_KEY = os.getenv("SECRET_KEY", SECRET_KEY) 
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
+
+    # Doctor del JWT (id + is_active) cacheado por worker, ver app/services/identity.py
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", 60))
+    IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", 4096))
+
+    # Hash de contraseñas (app/services/passwords.py): método de werkzeug, p. ej.
+    # "scrypt", "scrypt:16384:8:1" o "pbkdf2:sha256:600000"; los hashes con otro
+    # método se regeneran al iniciar sesión
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+
+    # Cola de predicciones asíncronas (?async=1)
+    JOB_QUEUE_MODE = os.getenv("JOB_QUEUE_MODE", "thread")  # "thread" | "inline"
+    JOB_QUEUE_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", 2))
+    JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 16))
+    JOB_QUEUE_HISTORY = int(os.getenv("JOB_QUEUE_HISTORY", 1000))
+
+    # Micro-batching de inferencia: requests concurrentes comparten un batch de DenseNet
+    PREDICT_MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", 16))
+    PREDICT_MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", 5))
+    PREDICT_TIMEOUT = float(os.getenv("PREDICT_TIMEOUT", 60))  # espera máxima por imagen, en segundos
+
+    # Carga masiva de estudios (/api/diagnoses/predict/batch)
+    PREDICT_BATCH_MAX_FILES = int(os.getenv("PREDICT_BATCH_MAX_FILES", 500))
+    # Bytes descomprimidos por solicitud (suma de imágenes sueltas y de los zip/tar)
+    PREDICT_BATCH_MAX_BYTES = int(os.getenv("PREDICT_BATCH_MAX_BYTES", 1024 * 1024 * 1024))
+
+    # Alta masiva de pacientes (/api/patients/bulk): filas por INSERT y commit
+    PATIENT_IMPORT_CHUNK_SIZE = int(os.getenv("PATIENT_IMPORT_CHUNK_SIZE", 500))
+
+    # Caché del resumen del dashboard (por doctor, en segundos)
+    DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", 30))
+    DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", 1024))
+
+    # Cabecera X-SQL-Queries con el número de sentencias SQL de cada request
+    SQL_QUERY_COUNT_HEADER = os.getenv("SQL_QUERY_COUNT_HEADER", "0") == "1"
+
+    # Métricas de Prometheus en /metrics (app/services/metrics.py) y cabecera
+    # Server-Timing con la duración de cada etapa del request
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+    SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "0") == "1"
+
+    # Carga del modelo: "background" la inicia con el primer request (sin bloquear),
+    # "lazy" espera al primer /predict de COVID
+    MODEL_WARMUP = os.getenv("MODEL_WARMUP", "background")
+
+    # Servir el modelo dentro de cada worker ("inprocess") o desde un único
+    # proceso compartido ("sidecar", ver app/ml/model_server.py)
+    MODEL_SERVING = os.getenv("MODEL_SERVING", "inprocess")
+    MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET", "/tmp/covid-model-server.sock")
+    MODEL_SERVER_AUTHKEY = os.getenv("MODEL_SERVER_AUTHKEY")  # obligatoria en modo sidecar
+    MODEL_SERVER_TIMEOUT = float(os.getenv("MODEL_SERVER_TIMEOUT", 30))
+
+    # DenseNet169: "keras" (eager), "graph" (tf.function) o "tflite" (cuantizado,
+    # generado con `flask model export-tflite`). Ver app/ml/inference_engine.py
+    MODEL_BACKEND = os.getenv("MODEL_BACKEND", "keras")
+    MODEL_TFLITE_PATH = os.getenv("MODEL_TFLITE_PATH")  # por defecto app/ml/models/densenet169_features.tflite
+    MODEL_TFLITE_THREADS = int(os.getenv("MODEL_TFLITE_THREADS", 0)) or None  # None: los que elija TFLite
+
+    # Hilos de XGBoost por predicción; 1 evita competir con TensorFlow
+    XGB_NTHREAD = int(os.getenv("XGB_NTHREAD", 1))
+
+    # Caché de predicciones por contenido (SHA-256 de la imagen + versión del modelo)
+    PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 4096))
+    MODEL_VERSION = os.getenv("MODEL_VERSION")  # por defecto: hash del modelo XGBoost
+
+    # Overlay del Grad-CAM: formato "png" | "jpeg" | "webp"
+    GRADCAM_FORMAT = os.getenv("GRADCAM_FORMAT", "png")
+    GRADCAM_PNG_COMPRESSION = int(os.getenv("GRADCAM_PNG_COMPRESSION", 3))  # 0-9
+    GRADCAM_QUALITY = int(os.getenv("GRADCAM_QUALITY", 90))  # JPEG/WebP, 0-100
+
+    # Grad-CAM: "eager" (en cada predicción), "lazy" (al pedirlo por /media)
+    # o "background" (lazy + generación encolada). Ver app/services/heatmaps.py
+    HEATMAP_MODE = os.getenv("HEATMAP_MODE", "eager")
+    HEATMAP_WAIT_TIMEOUT = float(os.getenv("HEATMAP_WAIT_TIMEOUT", 30))
+
+    # Ingesta de imágenes: límites que se validan antes de cualquier inferencia
+    UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 20 * 1024 * 1024))
+    UPLOAD_MIN_DIMENSION = int(os.getenv("UPLOAD_MIN_DIMENSION", 32))
+    UPLOAD_MAX_DIMENSION = int(os.getenv("UPLOAD_MAX_DIMENSION", 8192))
+    UPLOAD_WRITER_THREADS = int(os.getenv("UPLOAD_WRITER_THREADS", 2))
+
+    # /media: los nombres son por contenido (o uuid) y nunca cambian
+    MEDIA_CACHE_MAX_AGE = int(os.getenv("MEDIA_CACHE_MAX_AGE", 365 * 24 * 3600))
+    MEDIA_THUMB_SIZE = int(os.getenv("MEDIA_THUMB_SIZE", 256))  # lado mayor, px
+    MEDIA_THUMB_QUALITY = int(os.getenv("MEDIA_THUMB_QUALITY", 80))
+    # "" (Flask envía los bytes), "x-accel" (nginx) o "x-sendfile" (Apache/lighttpd)
+    MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE", "")
+    MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")
+    USE_X_SENDFILE = MEDIA_SENDFILE == "x-sendfile"
+
+    # Storage de media (app/services/storage.py): "local" o "s3" (S3/MinIO)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+    MEDIA_ROOT = os.getenv("MEDIA_ROOT", os.path.join(os.getcwd(), "media"))
+    STORAGE_S3_BUCKET = os.getenv("STORAGE_S3_BUCKET")
+    STORAGE_S3_PREFIX = os.getenv("STORAGE_S3_PREFIX", "")
+    STORAGE_S3_ENDPOINT_URL = os.getenv("STORAGE_S3_ENDPOINT_URL")  # p. ej. http://localhost:9000 (MinIO)
+    STORAGE_S3_REGION = os.getenv("STORAGE_S3_REGION")
+    STORAGE_S3_URL_EXPIRES = int(os.getenv("STORAGE_S3_URL_EXPIRES", 3600))
@@ -3,8 +3,12 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from app.services.db_routing import RoutingSession
+from app.services.jobs import JobQueue
 
-db = SQLAlchemy()
+# Las sesiones eligen primario o réplica por consulta (app/services/db_routing.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 cors = CORS()
+job_queue = JobQueue()
@@ -0,0 +1,79 @@
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import numpy as np
+
+
+# Agrupa imágenes de requests concurrentes en un solo batch. Un hilo
+# despachador espera hasta max_batch_size elementos o max_wait_ms desde el
+# primero, llama una vez a batch_fn y reparte el resultado i-ésimo a cada
+# llamador. timeout (segundos) limita la espera de cada llamador.
+class MicroBatcher:
+
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=5, timeout=None):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, item):
+        future = Future()
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+                self._thread.start()
+            self._pending.append((item, future))
+            self._cond.notify()
+        return future
+
+    def __call__(self, item):
+        future = self.submit(item)
+        try:
+            return future.result(self.timeout)
+        except FutureTimeout:
+            # Si todavía no entró en un batch, el despachador lo descarta
+            future.cancel()
+            raise
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            # Ventana de espera desde que llegó el primer elemento
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+
+        # Fuera quedan los que el llamador canceló por timeout
+        return [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            futures = [future for _, future in batch]
+
+            try:
+                # Dentro del try: un elemento con otra forma o dtype falla el
+                # batch entero sin matar al despachador
+                results = self.batch_fn(np.stack([item for item, _ in batch]))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
@@ -1,117 +1,261 @@
 import os
 import pickle
+import hashlib
+import importlib.util
+from functools import lru_cache
 import numpy as np
-import tensorflow as tf
-from keras.applications.densenet import DenseNet169, preprocess_input
-from keras.preprocessing.image import load_img, img_to_array
-from cv2 import resize, imread
-import matplotlib.cm as cm
-from tensorflow import keras
+
+from app.config import Config
+from app.ml.batcher import MicroBatcher
+from app.ml.model_loader import ModelLoader, ModelNotReady
+from app.ml.model_server import SidecarUnavailable
+from app.services import metrics
 
 BASE_DIR = os.path.dirname(__file__)
 MODEL_PATH = os.path.join(BASE_DIR, "models", "xgb_model.pkl")
+# Booster en formato JSON nativo (`flask model export-xgb`). Si existe se
+# carga en lugar del pickle. xgb_model.json es un volcado binario anterior y
+# no corresponde al modelo del pickle: no se usa.
+XGB_BOOSTER_PATH = os.path.join(BASE_DIR, "models", "xgb_booster.json")
+TFLITE_PATH = Config.MODEL_TFLITE_PATH or os.path.join(BASE_DIR, "models", "densenet169_features.tflite")
 
+# Entrada de DenseNet169 (igual que inference_engine.IMG_SIZE)
+IMG_SIZE = (224, 224)
 
-# ---------- CARGA DE MODELOS (UNA SOLA VEZ) ----------
+# TensorFlow, Keras y OpenCV se importan recién al cargar/usar el
+# modelo: importar este módulo no cuesta nada. En modo sidecar el modelo vive
+# en otro proceso (app/ml/model_server.py)
+SIDECAR_MODE = Config.MODEL_SERVING == "sidecar"
+MODELS_AVAILABLE = SIDECAR_MODE or importlib.util.find_spec("tensorflow") is not None
 
-DNN_MODEL = DenseNet169(
-    include_top=False,
-    input_shape=(224, 224, 3),
-    pooling="avg",
-    weights="imagenet"
-)
 
-with open(MODEL_PATH, "rb") as f:
-    XGB_MODEL = pickle.load(f)
+# ---------- CARGA DE MODELOS (UNA SOLA VEZ, PEREZOSA) ----------
 
+class LoadedModels:
+    def __init__(self, engine, booster):
+        # DenseNet169 + grad-model conv5 se construyen una vez y se reutilizan
+        self.engine = engine
+        self.dnn_model = engine.backbone
+        self.booster = booster
+
+    def classify(self, features):
+        with metrics.stage("xgboost"):
+            return classify_features(self.booster, features)
+
+    def infer(self, images):
+        # Una sola pasada para todo el batch: features para XGBoost + Grad-CAM
+        # (features y gradiente salen del mismo GradientTape: una sola etapa)
+        with metrics.stage("densenet_gradcam"):
+            features, heatmaps = self.engine.run(images)
+        return [
+            (label, confidence, heatmap)
+            for (label, confidence), heatmap in zip(self.classify(features), heatmaps)
+        ]
+
+    def predict(self, images):
+        # Solo (label, confidence): el Grad-CAM se genera después si se pide
+        with metrics.stage("densenet"):
+            features = self.engine.features(images)
+        return self.classify(features)
 
-# ---------- PREDICCIÓN ----------
-def predict_image(image_path, heatmap_output_path):
-    # Leer imagen con OpenCV (BGR)
-    img = imread(image_path)
-    img = resize(img, (224, 224))
 
-    # Batch dimension
-    img_array = np.array([img])  # EXACTAMENTE como el primero
+def classify_features(booster, features):
+    # Una sola pasada por los árboles (binary:logistic): P(COVID) por fila.
+    # Equivale a predict + predict_proba del XGBClassifier (umbral 0.5).
+    # inplace_predict no arma DMatrix y es seguro entre hilos.
+    probabilities = booster.inplace_predict(np.asarray(features, dtype=np.float32))
+    return [
+        ("COVID" if p > 0.5 else "NORMAL", float(max(p, 1 - p)) * 100)
+        for p in probabilities
+    ]
 
-    # Feature extraction
-    features = DNN_MODEL.predict(img_array)
 
-    # XGBoost prediction
-    prediction = XGB_MODEL.predict(features)[0]
+def booster_path():
+    return XGB_BOOSTER_PATH if os.path.exists(XGB_BOOSTER_PATH) else MODEL_PATH
 
-    # Opcional: probabilidad
-    if hasattr(XGB_MODEL, "predict_proba"):
-        confidence = float(np.max(XGB_MODEL.predict_proba(features)) * 100)
+
+def load_booster(path=None):
+    import xgboost as xgb
+
+    path = path or booster_path()
+    if path.endswith(".json"):
+        booster = xgb.Booster(model_file=path)
     else:
-        confidence = None
+        # XGBClassifier pickleado: solo se usa su booster
+        with open(path, "rb") as f:
+            booster = pickle.load(f).get_booster()
+
+    # Pocos hilos: XGBoost compite con el pool intra-op de TensorFlow
+    booster.set_param({"nthread": Config.XGB_NTHREAD})
+    return booster
+
+
+def load_local_models(backend=None):
+    from app.ml.inference_engine import InferenceEngine
+
+    engine = InferenceEngine(
+        backend=backend or Config.MODEL_BACKEND,
+        tflite_path=TFLITE_PATH,
+        tflite_threads=Config.MODEL_TFLITE_THREADS
+    )
+    return LoadedModels(engine, load_booster())
+
+
+def _load_models():
+    if SIDECAR_MODE:
+        from app.ml.model_server import connect_sidecar
+        return connect_sidecar()
+    return load_local_models()
+
+
+@lru_cache(maxsize=None)
+def model_version():
+    # Identifica los resultados cacheados; cambia si se reemplaza el XGBoost
+    # o el DenseNet cuantizado
+    if Config.MODEL_VERSION:
+        return Config.MODEL_VERSION
+    version = f"densenet169-xgb-{_file_hash(booster_path())}"
+    if Config.MODEL_BACKEND == "tflite":
+        version += f"-tflite-{_file_hash(TFLITE_PATH)}"
+    return version
+
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+# LoadedModels (inprocess) o SidecarClient (sidecar): ambos exponen
+# infer(images) y predict(images)
+MODELS = ModelLoader(_load_models)
+
+
+# ---------- PREDICCIÓN ----------
+def load_image(image_path, original=None):
+    # image_path: archivo local (scripts/benchmarks) si no viene original
+    from cv2 import resize
+    from app.ml import gradcam_overlay
 
-    label = "COVID" if prediction == 1 else "NORMAL"
+    # Leer imagen con OpenCV (BGR), igual que en el entrenamiento del XGBoost
+    img = gradcam_overlay.read_image(image_path) if original is None else original
+    with metrics.stage("resize"):
+        return resize(img, IMG_SIZE)
 
-    # Grad-CAM (misma idea que antes)
-    heatmap = generate_gradcam(image_path)
-    save_gradcam(image_path, heatmap, heatmap_output_path)
+
+def _run_models(op, images):
+    models = MODELS.require()
+    try:
+        return getattr(models, op)(images)
+    except SidecarUnavailable as e:
+        # Sin servidor de modelos los requests reciben 503 hasta que vuelva
+        MODELS.invalidate(str(e))
+        raise ModelNotReady(str(e))
+
+
+def infer_batch(images):
+    return _run_models("infer", images)
+
+
+def classify_batch(images):
+    return _run_models("predict", images)
+
+
+# Requests concurrentes se agrupan en un solo batch de DenseNet y de XGBoost
+BATCHER = MicroBatcher(
+    infer_batch,
+    max_batch_size=Config.PREDICT_MAX_BATCH_SIZE,
+    max_wait_ms=Config.PREDICT_MAX_WAIT_MS,
+    timeout=Config.PREDICT_TIMEOUT
+)
+
+# Igual, pero sin Grad-CAM (heatmaps diferidos, ver app/services/heatmaps.py)
+CLASSIFY_BATCHER = MicroBatcher(
+    classify_batch,
+    max_batch_size=Config.PREDICT_MAX_BATCH_SIZE,
+    max_wait_ms=Config.PREDICT_MAX_WAIT_MS,
+    timeout=Config.PREDICT_TIMEOUT
+)
+
+
+def predict_image(image_key, heatmap_key=None, original=None):
+    # image_key / heatmap_key: claves del storage de media (app/services/storage.py)
+    # original: imagen ya decodificada por la ingesta (evita leerla de nuevo)
+
+    # Falla rápido (ModelNotReady) antes de leer la imagen si el modelo no está listo
+    MODELS.require()
+
+    # La imagen se decodifica una vez y sirve para el modelo y para el overlay
+    if original is None:
+        original = _read_original(image_key)
+
+    img = load_image(image_key, original)
+
+    # Sin clave de salida solo se clasifica: sin gradiente ni overlay.
+    # "inference" incluye la espera del micro-batch
+    if heatmap_key is None:
+        with metrics.stage("inference"):
+            return CLASSIFY_BATCHER(img)
+
+    with metrics.stage("inference"):
+        label, confidence, heatmap = BATCHER(img)
+
+    save_gradcam(original, heatmap, heatmap_key)
 
     return label, confidence
 
 
-# ---------- GRAD-CAM ----------
+def predict_batch(image_keys, heatmap_keys=None):
+    MODELS.require()
 
-def generate_gradcam(img_path):
-    img_size = (224, 224)
-    last_conv_layer_name = "conv5_block32_concat"
-
-    # EXACTAMENTE igual al primer código
-    img = load_img(img_path, target_size=img_size)
-    img_array = img_to_array(img)
-    img_array = np.expand_dims(img_array, axis=0)
-    img_array = preprocess_input(img_array)
-
-    model = DenseNet169(
-        weights="imagenet",
-        include_top=False,
-        input_shape=(224, 224, 3),
-        pooling="avg"
-    )
+    # Para estudios completos: el batch ya viene armado, no pasa por el BATCHER
+    originals = [_read_original(key) for key in image_keys]
+    images = np.stack([load_image(key, original) for key, original in zip(image_keys, originals)])
 
-    grad_model = tf.keras.models.Model(
-        [model.inputs],
-        [model.get_layer(last_conv_layer_name).output, model.output]
-    )
+    with metrics.stage("inference"):
+        if heatmap_keys is None:
+            return classify_batch(images)
+        inferred = infer_batch(images)
 
-    with tf.GradientTape() as tape:
-        last_conv_output, preds = grad_model(img_array)
+    results = []
+    for original, heatmap_key, (label, confidence, heatmap) in zip(originals, heatmap_keys, inferred):
+        save_gradcam(original, heatmap, heatmap_key)
+        results.append((label, confidence))
 
-        # 🔥 ESTA ES LA DIFERENCIA CLAVE
-        pred_index = tf.argmax(preds[0])
-        class_channel = preds[:, pred_index]
+    return results
 
-    grads = tape.gradient(class_channel, last_conv_output)
-    pooled_grads = tf.reduce_mean(grads, axis=(0, 1, 2))
 
-    last_conv_output = last_conv_output[0]
-    heatmap = last_conv_output @ pooled_grads[..., tf.newaxis]
-    heatmap = tf.squeeze(heatmap)
+def _read_original(image_key):
+    from app.ml import gradcam_overlay
+    from app.services import storage
 
-    heatmap = tf.maximum(heatmap, 0)
-    heatmap /= tf.reduce_max(heatmap) + 1e-8
+    data = storage.media.read(image_key)
+    with metrics.stage("decode"):
+        return gradcam_overlay.decode(data)
+
+
+# ---------- GRAD-CAM ----------
 
-    return heatmap.numpy()
+def generate_gradcam(image_key):
+    _, _, heatmap = infer_batch(np.expand_dims(load_image(image_key, _read_original(image_key)), axis=0))[0]
+    return heatmap
 
 
-def save_gradcam(img_path, heatmap, output_path, alpha=0.4):
-    img = keras.preprocessing.image.load_img(img_path)
-    img = keras.preprocessing.image.img_to_array(img)
+def render_gradcam(image_key, heatmap_key):
+    # Grad-CAM diferido de una predicción ya clasificada
+    MODELS.require()
+    original = _read_original(image_key)
+    _, _, heatmap = BATCHER(load_image(image_key, original))
+    save_gradcam(original, heatmap, heatmap_key)
 
-    heatmap = np.uint8(255 * heatmap)
-    jet = cm.get_cmap("jet")
-    jet_colors = jet(np.arange(256))[:, :3]
-    jet_heatmap = jet_colors[heatmap]
 
-    jet_heatmap = keras.preprocessing.image.array_to_img(jet_heatmap)
-    jet_heatmap = jet_heatmap.resize((img.shape[1], img.shape[0]))
-    jet_heatmap = keras.preprocessing.image.img_to_array(jet_heatmap)
+def save_gradcam(img, heatmap, heatmap_key, alpha=0.4):
+    # img: clave del storage o imagen ya decodificada (BGR, resolución original)
+    from app.ml import gradcam_overlay
+    from app.services import storage
 
-    superimposed_img = jet_heatmap * alpha + img
-    superimposed_img = keras.preprocessing.image.array_to_img(superimposed_img)
-    superimposed_img.save(output_path)
+    if isinstance(img, str):
+        img = _read_original(img)
+    with metrics.stage("gradcam_render"):
+        data = gradcam_overlay.encode(gradcam_overlay.render(img, heatmap, alpha))
+    with metrics.stage("gradcam_write"):
+        storage.media.write(heatmap_key, data)
@@ -0,0 +1,101 @@
+import os
+import threading
+
+import numpy as np
+
+from app.config import Config
+
+# OpenCV se importa dentro de cada función, como en covid_predictor: las rutas
+# usan extension() sin pagar el import
+
+# Formatos de salida del heatmap
+EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+
+
+def _jet_lut():
+    # Colormap "jet" de matplotlib (mismos tramos lineales), precalculado una
+    # vez como tabla uint8 de 256 colores en orden BGR (el de OpenCV)
+    x = np.linspace(0, 1, 256)
+    red = np.interp(x, [0, 0.35, 0.66, 0.89, 1], [0, 0, 1, 1, 0.5])
+    green = np.interp(x, [0, 0.125, 0.375, 0.64, 0.91, 1], [0, 0, 1, 1, 0, 0])
+    blue = np.interp(x, [0, 0.11, 0.34, 0.65, 1], [0.5, 1, 1, 0, 0])
+    lut = np.round(np.stack([blue, green, red], axis=1) * 255).astype(np.uint8)
+    # Forma (256, 1, 3) para cv2.LUT sobre una imagen de 3 canales
+    return lut.reshape(256, 1, 3)
+
+
+JET_LUT = _jet_lut()
+
+
+def extension(fmt=None):
+    return EXTENSIONS[fmt or Config.GRADCAM_FORMAT]
+
+
+def _encode_params(fmt):
+    import cv2
+
+    if fmt == "png":
+        return [cv2.IMWRITE_PNG_COMPRESSION, Config.GRADCAM_PNG_COMPRESSION]
+    if fmt == "jpeg":
+        return [cv2.IMWRITE_JPEG_QUALITY, Config.GRADCAM_QUALITY]
+    return [cv2.IMWRITE_WEBP_QUALITY, Config.GRADCAM_QUALITY]
+
+
+def read_image(image_path):
+    import cv2
+
+    # Decodifica la radiografía una sola vez (BGR, resolución original)
+    img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"No se pudo leer la imagen: {image_path}")
+    return img
+
+
+def decode(data):
+    import cv2
+
+    # Imagen codificada (bytes o buffer) -> BGR, resolución original
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("No se pudo decodificar la imagen")
+    return img
+
+
+def render(img, heatmap, alpha=0.4):
+    import cv2
+
+    height, width = img.shape[:2]
+
+    # El heatmap (7x7) se escala como índice y se colorea con la tabla: una
+    # sola interpolación en uint8 en vez de reescalar una imagen RGB en float.
+    # El camino con Keras coloreaba el 7x7 y reescalaba la imagen RGB con PIL,
+    # así que los píxeles no coinciden exactamente: el overlay es equivalente
+    # a la vista, no idéntico byte a byte
+    index = cv2.resize(np.uint8(255 * heatmap), (width, height), interpolation=cv2.INTER_CUBIC)
+    jet = cv2.LUT(cv2.cvtColor(index, cv2.COLOR_GRAY2BGR), JET_LUT)
+
+    # Igual que antes: img + alpha * jet, reescalado al rango 0-255
+    # (array_to_img normaliza por mínimo/máximo)
+    blended = cv2.addWeighted(img, 1.0, jet, alpha, 0.0, dtype=cv2.CV_32F)
+    return cv2.normalize(blended, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+
+
+def encode(overlay, fmt=None):
+    import cv2
+
+    fmt = fmt or Config.GRADCAM_FORMAT
+    ext = extension(fmt)
+    ok, buffer = cv2.imencode(ext, overlay, _encode_params(fmt))
+    if not ok:
+        raise ValueError(f"No se pudo codificar el heatmap como {ext}")
+    return buffer.tobytes()
+
+
+def save(img, heatmap, output_path, alpha=0.4, fmt=None):
+    data = encode(render(img, heatmap, alpha), fmt)
+
+    # Escritura atómica: /media nunca sirve un heatmap a medio escribir
+    part_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.part"
+    with open(part_path, "wb") as f:
+        f.write(data)
+    os.replace(part_path, output_path)
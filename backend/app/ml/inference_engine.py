@@ -0,0 +1,162 @@
+import threading
+import numpy as np
+import tensorflow as tf
+from keras.applications.densenet import DenseNet169
+
+IMG_SIZE = (224, 224)
+LAST_CONV_LAYER_NAME = "conv5_block32_concat"
+
+# "keras": llamadas eager al modelo
+# "graph": el mismo cómputo compilado con tf.function (firma fija, sin retrazar
+#          por tamaño de batch); resultados idénticos en float32
+# "tflite": features desde un DenseNet169 exportado a TFLite (float16 o int8,
+#           ver export_tflite) para clasificar en todos los caminos, con o sin
+#           Grad-CAM; el Grad-CAM sigue en grafo float32 porque TFLite no
+#           calcula gradientes
+BACKENDS = ("keras", "graph", "tflite")
+
+# Batch de imágenes preprocesadas; None deja el tamaño libre
+INPUT_SIGNATURE = [tf.TensorSpec([None, *IMG_SIZE, 3], tf.float32)]
+
+
+def build_backbone():
+    return DenseNet169(
+        include_top=False,
+        input_shape=(*IMG_SIZE, 3),
+        pooling="avg",
+        weights="imagenet"
+    )
+
+
+# Intérprete TFLite con la misma firma que backbone(inputs): batch -> features
+class TFLiteFeatures:
+
+    def __init__(self, model_path, num_threads=None):
+        self.interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self._input = self.interpreter.get_input_details()[0]["index"]
+        self._output = self.interpreter.get_output_details()[0]["index"]
+        self._batch_size = None
+
+    def __call__(self, inputs):
+        # Solo se reasignan los tensores cuando cambia el tamaño del batch
+        if len(inputs) != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input, [len(inputs), *IMG_SIZE, 3])
+            self.interpreter.allocate_tensors()
+            self._batch_size = len(inputs)
+
+        self.interpreter.set_tensor(self._input, np.asarray(inputs, dtype=np.float32))
+        self.interpreter.invoke()
+        # get_tensor copia: el buffer interno se reutiliza en el próximo invoke
+        return self.interpreter.get_tensor(self._output)
+
+
+def export_tflite(output_path, quantization="float16", samples=None, backbone=None):
+    # Cuantización post-entrenamiento del extractor de features.
+    # "float16": pesos a float16 (la mitad de tamaño, casi sin pérdida)
+    # "int8": pesos y activaciones a int8; samples son imágenes preprocesadas
+    #         (224, 224, 3) para calibrar los rangos
+    # "dynamic": pesos int8 y activaciones en float, sin calibración
+    converter = tf.lite.TFLiteConverter.from_keras_model(backbone or build_backbone())
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        if not samples:
+            raise ValueError("La cuantización int8 necesita imágenes de calibración")
+
+        def representative_dataset():
+            for sample in samples:
+                yield [np.expand_dims(sample, axis=0).astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+    elif quantization != "dynamic":
+        raise ValueError(f"Cuantización no soportada: {quantization}")
+
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+
+
+# Mantiene DenseNet169 y su grad-model en memoria. Una sola pasada (bajo
+# GradientTape) devuelve las features para XGBoost y el Grad-CAM de la imagen.
+class InferenceEngine:
+
+    def __init__(self, last_conv_layer_name=LAST_CONV_LAYER_NAME, backend="keras",
+                 tflite_path=None, tflite_threads=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend de inferencia no soportado: {backend}")
+        self.backend = backend
+
+        self.backbone = build_backbone()
+
+        # Se construye una sola vez: salida conv5 + features agrupadas
+        self.grad_model = tf.keras.models.Model(
+            [self.backbone.inputs],
+            [self.backbone.get_layer(last_conv_layer_name).output, self.backbone.output]
+        )
+
+        if backend == "keras":
+            self._run = self._grad_cam
+            self._features = self._backbone_features
+        else:
+            self._run = tf.function(self._grad_cam, input_signature=INPUT_SIGNATURE)
+            self._features = tf.function(self._backbone_features, input_signature=INPUT_SIGNATURE)
+
+        if backend == "tflite":
+            self._features = TFLiteFeatures(tflite_path, tflite_threads)
+
+        # Keras (y el intérprete TFLite) no garantizan llamadas concurrentes
+        # seguras sobre el mismo modelo
+        self._lock = threading.Lock()
+
+    def _grad_cam(self, inputs):
+        with tf.GradientTape() as tape:
+            tape.watch(inputs)
+            last_conv_output, features = self.grad_model(inputs, training=False)
+
+            # Canal dominante por imagen (misma idea que el Grad-CAM original)
+            pred_index = tf.argmax(features, axis=1)
+            class_channel = tf.gather(features, pred_index, axis=1, batch_dims=1)
+
+        grads = tape.gradient(class_channel, last_conv_output)
+
+        # Cada imagen depende solo de su propio canal, así que el gradiente
+        # del batch completo equivale al gradiente individual
+        pooled_grads = tf.reduce_mean(grads, axis=(1, 2))
+        heatmaps = tf.einsum("nhwc,nc->nhw", last_conv_output, pooled_grads)
+
+        heatmaps = tf.maximum(heatmaps, 0)
+        heatmaps /= tf.reduce_max(heatmaps, axis=(1, 2), keepdims=True) + 1e-8
+
+        return features, heatmaps
+
+    def _backbone_features(self, inputs):
+        return self.backbone(inputs, training=False)
+
+    # Recibe un batch (N, 224, 224, 3) y devuelve (features, heatmaps)
+    def run(self, img_array):
+        inputs = tf.convert_to_tensor(img_array, dtype=tf.float32)
+
+        with self._lock:
+            features, heatmaps = self._run(inputs)
+            if self.backend == "tflite":
+                # La etiqueta sale del modelo cuantizado también con Grad-CAM:
+                # no depende de HEATMAP_MODE y coincide con model_version()
+                features = self._features(np.asarray(img_array, dtype=np.float32))
+
+        return np.asarray(features), np.asarray(heatmaps)
+
+    # Solo features (sin GradientTape ni conv5): para clasificar sin Grad-CAM
+    def features(self, img_array):
+        if self.backend == "tflite":
+            inputs = np.asarray(img_array, dtype=np.float32)
+        else:
+            inputs = tf.convert_to_tensor(img_array, dtype=tf.float32)
+
+        with self._lock:
+            return np.asarray(self._features(inputs))
+
+    # Atajo para una sola imagen (224, 224, 3)
+    def run_single(self, img):
+        features, heatmaps = self.run(np.expand_dims(img, axis=0))
+        return features, heatmaps[0]
@@ -0,0 +1,81 @@
+import threading
+import time
+
+
+class ModelNotReady(Exception):
+    pass
+
+
+# Carga perezosa y thread-safe de los modelos. load_fn se ejecuta una sola vez,
+# en segundo plano (start_background) o en la primera llamada a load().
+class ModelLoader:
+
+    def __init__(self, load_fn):
+        self.load_fn = load_fn
+        self.state = "idle"  # idle | loading | ready | failed
+        self.error = None
+        self.load_seconds = None
+        self._models = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            self._models = self.load_fn()
+            self.state = "ready"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+        self.load_seconds = round(time.perf_counter() - start, 2)
+        self._done.set()
+
+    def _claim(self):
+        # Devuelve True si este hilo debe hacer la carga
+        with self._lock:
+            if self.state in ("idle", "failed"):
+                self.state = "loading"
+                self.error = None
+                self._done.clear()
+                return True
+            return False
+
+    def start_background(self):
+        if self._claim():
+            threading.Thread(target=self._load, name="model-warmup", daemon=True).start()
+
+    def load(self):
+        # Carga bloqueante (scripts, benchmarks)
+        if self._claim():
+            self._load()
+        self._done.wait()
+        if not self.ready:
+            raise ModelNotReady(self.error)
+        return self._models
+
+    def require(self):
+        # Para requests: nunca bloquea; si no está listo lanza la carga y avisa
+        if self.ready:
+            return self._models
+        self.start_background()
+        raise ModelNotReady(self.error or "Modelo cargando")
+
+    def invalidate(self, error):
+        # Los modelos dejaron de responder (p. ej. se cayó el servidor de
+        # modelos): el próximo require() los vuelve a cargar en segundo plano
+        with self._lock:
+            if self.state == "ready":
+                self.state = "failed"
+                self.error = error
+                self._models = None
+
+    def status(self):
+        return {
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "error": self.error
+        }
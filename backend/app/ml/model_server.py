@@ -0,0 +1,248 @@
+# Servidor de modelos compartido entre workers (sidecar).
+#
+# Un solo proceso carga DenseNet169 + XGBoost y escucha en un socket Unix. Los
+# workers de Flask dejan el batch ya preprocesado (uint8, N x 224 x 224 x 3) en
+# un bloque de multiprocessing.shared_memory y solo envían su nombre y forma;
+# el servidor lo lee sin copiarlo y responde (label, confidence, heatmap), o
+# solo (label, confidence) para la operación "predict". Cada respuesta lleva
+# el id de su mensaje.
+#
+# El bloque de memoria lo libera el cliente al recibir la respuesta. Si el
+# cliente dejó de esperar (timeout) cierra la conexión; el servidor no puede
+# responder y entonces lo libera él.
+#
+# Uso (desde backend/):
+#   python -m app.ml.model_server
+# y en los workers MODEL_SERVING=sidecar y la misma MODEL_SERVER_AUTHKEY
+# (obligatoria) en ambos lados (ver app/config.py).
+import itertools
+import os
+import threading
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Listener
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from app.config import Config
+from app.ml.batcher import MicroBatcher
+
+
+class SidecarError(Exception):
+    pass
+
+
+class SidecarTimeout(SidecarError):
+    pass
+
+
+class SidecarUnavailable(SidecarError):
+    # El servidor no está o se cayó: el modelo deja de estar listo (503)
+    pass
+
+
+def _authkey():
+    if not Config.MODEL_SERVER_AUTHKEY:
+        raise SidecarError("MODEL_SERVER_AUTHKEY es obligatoria con MODEL_SERVING=sidecar")
+    return Config.MODEL_SERVER_AUTHKEY
+
+
+# ---------- CLIENTE (workers de Flask) ----------
+
+class SidecarClient:
+
+    def __init__(self, address, authkey, timeout=30):
+        self.address = address
+        self.authkey = authkey.encode()
+        self.timeout = timeout
+        # Una conexión por hilo: Connection no es thread-safe
+        self._local = threading.local()
+        self._ids = itertools.count()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        # Una respuesta tardía no debe quedar en el pipe para el próximo request
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def _request(self, message):
+        message = {**message, "id": next(self._ids)}
+        try:
+            conn = self._connection()
+            conn.send(message)
+            while True:
+                if not conn.poll(self.timeout):
+                    self._drop_connection()
+                    raise SidecarTimeout("Timeout esperando al servidor de modelos")
+                response = conn.recv()
+                # Con la conexión descartada en cada timeout no debería haber
+                # respuestas ajenas; si aparece una, se ignora
+                if response.get("id") == message["id"]:
+                    break
+        except (EOFError, OSError) as e:
+            self._drop_connection()
+            raise SidecarUnavailable(f"Conexión con el servidor de modelos perdida: {e}")
+
+        if not response.get("ok"):
+            raise SidecarError(response.get("error", "Error en el servidor de modelos"))
+        return response
+
+    def ping(self):
+        return self._request({"op": "ping"})
+
+    def _send_batch(self, op, images):
+        images = np.ascontiguousarray(images, dtype=np.uint8)
+        shm = SharedMemory(create=True, size=images.nbytes)
+        release = True
+        try:
+            np.ndarray(images.shape, dtype=images.dtype, buffer=shm.buf)[:] = images
+            response = self._request({
+                "op": op,
+                "shm": shm.name,
+                "shape": images.shape,
+                "dtype": images.dtype.str
+            })
+        except SidecarTimeout:
+            # El servidor puede seguir leyendo el bloque: lo libera él
+            release = False
+            resource_tracker.unregister(shm._name, "shared_memory")
+            raise
+        finally:
+            shm.close()
+            if release:
+                shm.unlink()
+        return response["results"]
+
+    def infer(self, images):
+        return self._send_batch("infer", images)
+
+    def predict(self, images):
+        # Solo (label, confidence), sin Grad-CAM
+        return self._send_batch("predict", images)
+
+
+def connect_sidecar():
+    # load_fn del ModelLoader en modo sidecar: listo cuando el servidor responde
+    client = SidecarClient(
+        Config.MODEL_SERVER_SOCKET,
+        _authkey(),
+        timeout=Config.MODEL_SERVER_TIMEOUT
+    )
+    try:
+        client.ping()
+    except SidecarUnavailable as e:
+        raise SidecarError(f"Servidor de modelos no disponible en {Config.MODEL_SERVER_SOCKET}: {e}")
+    return client
+
+
+# ---------- SERVIDOR ----------
+
+class ModelServer:
+
+    def __init__(self, models, address, authkey):
+        self.models = models
+        self.address = address
+        self.authkey = authkey.encode()
+        # Las imágenes sueltas de distintos workers se agrupan en un batch
+        self.batchers = {
+            op: MicroBatcher(
+                getattr(models, op),
+                max_batch_size=Config.PREDICT_MAX_BATCH_SIZE,
+                max_wait_ms=Config.PREDICT_MAX_WAIT_MS,
+                timeout=Config.PREDICT_TIMEOUT
+            )
+            for op in ("infer", "predict")
+        }
+
+    def _run(self, message):
+        shm = SharedMemory(name=message["shm"])
+        # El bloque lo crea y libera el cliente; que el resource tracker de
+        # este proceso no intente borrarlo
+        resource_tracker.unregister(shm._name, "shared_memory")
+        try:
+            images = np.ndarray(message["shape"], dtype=np.dtype(message["dtype"]), buffer=shm.buf)
+            op = message["op"]
+            if len(images) == 1:
+                results = [self.batchers[op](images[0])]
+            else:
+                results = getattr(self.models, op)(images)
+            del images
+        finally:
+            shm.close()
+        return results
+
+    def _reply(self, message):
+        try:
+            if message["op"] == "ping":
+                return {"ok": True}
+            if message["op"] in self.batchers:
+                return {"ok": True, "results": self._run(message)}
+            return {"ok": False, "error": f"Operación desconocida: {message['op']}"}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    def _release(self, message):
+        # El cliente se fue antes de la respuesta: nadie más va a liberar el bloque
+        if "shm" not in message:
+            return
+        try:
+            shm = SharedMemory(name=message["shm"])
+        except FileNotFoundError:
+            return
+        resource_tracker.unregister(shm._name, "shared_memory")
+        shm.close()
+        shm.unlink()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                reply = self._reply(message)
+                try:
+                    conn.send({**reply, "id": message.get("id")})
+                except OSError:
+                    self._release(message)
+                    return
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.remove(self.address)
+
+        with Listener(self.address, family="AF_UNIX", authkey=self.authkey) as listener:
+            print(f"Servidor de modelos escuchando en {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    # Autenticación fallida u otro error de un cliente: seguir atendiendo
+                    print(f"Conexión rechazada: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+
+def main():
+    from app.ml.covid_predictor import load_local_models
+
+    try:
+        authkey = _authkey()
+    except SidecarError as e:
+        raise SystemExit(str(e))
+
+    print("Cargando modelos...")
+    models = load_local_models()
+    ModelServer(models, Config.MODEL_SERVER_SOCKET, authkey).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
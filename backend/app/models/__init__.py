@@ -1,3 +1,5 @@
 from .doctor import Doctor
 from .patient import Patient
 from .diagnosis import Diagnosis
+from .doctor_stats import DoctorStats, DoctorDailyStats
+from .prediction_cache import PredictionCache
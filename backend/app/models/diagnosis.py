@@ -1,7 +1,47 @@
+from sqlalchemy.orm import validates
 from app.extensions import db
 
+# Código compacto e indexable para cada etiqueta de resultado. Las etiquetas
+# desconocidas quedan en 0 y solo se filtran por texto.
+RESULT_CODES = {
+    "COVID": 1,
+    "NORMAL": 2,
+    "Positivo": 3,
+    "Negativo": 4,
+    "Riesgo Alto": 5,
+    "Riesgo Bajo": 6,
+    "MOCK_RESULT": 7,
+}
+UNKNOWN_RESULT_CODE = 0
+
+
+def result_code_for(label):
+    return RESULT_CODES.get(label, UNKNOWN_RESULT_CODE)
+
+
+def result_codes_matching(text):
+    # Mismo criterio que el antiguo ILIKE '%texto%', resuelto sobre las etiquetas conocidas
+    text = text.lower()
+    return [code for label, code in RESULT_CODES.items() if text in label.lower()]
+
+
+def _default_result_code(context):
+    # También se aplica en inserts masivos (bulk_insert_mappings / executemany)
+    return result_code_for(context.get_current_parameters().get("result"))
+
+
 class Diagnosis(db.Model):
     __tablename__ = "diagnoses"
+    __table_args__ = (
+        # Conteos por resultado del doctor (recount de doctor_stats)
+        db.Index("ix_diagnoses_doctor_result", "doctor_id", "result"),
+        # Actividad reciente y buckets diarios
+        db.Index("ix_diagnoses_doctor_created", "doctor_id", "created_at"),
+        # Historial del paciente ordenado por id
+        db.Index("ix_diagnoses_patient_id", "patient_id", "id"),
+        # Filtro por resultado en el listado, ordenado por id
+        db.Index("ix_diagnoses_result_code", "result_code", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey("patients.id"), nullable=False)
@@ -11,9 +51,15 @@ class Diagnosis(db.Model):
     heatmap_path = db.Column(db.String(255), nullable=False)
 
     result = db.Column(db.String(50), nullable=False)
+    result_code = db.Column(db.SmallInteger, nullable=False, default=_default_result_code)
     confidence = db.Column(db.Numeric(5, 2))
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     
     # Relationships
     patient = db.relationship("Patient", backref=db.backref("diagnoses", lazy=True))
-    doctor = db.relationship("Doctor", backref=db.backref("diagnoses", lazy=True))
\ No newline at end of file
+    doctor = db.relationship("Doctor", backref=db.backref("diagnoses", lazy=True))
+
+    @validates("result")
+    def _sync_result_code(self, key, value):
+        self.result_code = result_code_for(value)
+        return value
@@ -0,0 +1,28 @@
+# app/models/doctor_stats.py
+from app.extensions import db
+
+# Contadores por doctor mantenidos de forma incremental (ver app/services/stats.py)
+class DoctorStats(db.Model):
+    __tablename__ = "doctor_stats"
+
+    doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id"), primary_key=True)
+
+    total_patients = db.Column(db.Integer, nullable=False, default=0)
+    male_patients = db.Column(db.Integer, nullable=False, default=0)
+    female_patients = db.Column(db.Integer, nullable=False, default=0)
+    other_patients = db.Column(db.Integer, nullable=False, default=0)
+    age_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    age_count = db.Column(db.Integer, nullable=False, default=0)
+
+    total_diagnoses = db.Column(db.Integer, nullable=False, default=0)
+    covid_positive = db.Column(db.Integer, nullable=False, default=0)
+    covid_negative = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Diagnósticos por doctor y día (para la "actividad de los últimos 7 días")
+class DoctorDailyStats(db.Model):
+    __tablename__ = "doctor_daily_stats"
+
+    doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    diagnoses = db.Column(db.Integer, nullable=False, default=0)
@@ -3,6 +3,12 @@ from app.extensions import db
 
 class Patient(db.Model):
     __tablename__ = "patients"
+    __table_args__ = (
+        # Listado del doctor ordenado por fecha
+        db.Index("ix_patients_doctor_created", "doctor_id", "created_at"),
+        # Búsqueda por dni del doctor (upsert de /api/patients/bulk)
+        db.Index("ix_patients_doctor_dni", "doctor_id", "dni"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id"), nullable=False)
@@ -0,0 +1,15 @@
+# app/models/prediction_cache.py
+from app.extensions import db
+
+# Resultado de una predicción COVID por contenido de la imagen y versión del modelo
+class PredictionCache(db.Model):
+    __tablename__ = "prediction_cache"
+
+    content_hash = db.Column(db.String(64), primary_key=True)
+    model_version = db.Column(db.String(64), primary_key=True)
+
+    result = db.Column(db.String(50), nullable=False)
+    confidence = db.Column(db.Numeric(5, 2))
+    image_path = db.Column(db.String(255), nullable=False)
+    heatmap_path = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
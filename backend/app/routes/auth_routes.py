@@ -1,11 +1,19 @@
 from flask import Blueprint, request, jsonify
 from app.models.doctor import Doctor
 from app.extensions import db
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, current_user
+from app.services import identity
+from app.services.passwords import PasswordHashBusy, hash_password, needs_rehash, verify_password
 
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(PasswordHashBusy)
+def _password_hash_busy(e):
+    # Pool de hash saturado (ráfaga de logins): se rechaza en vez de encolar sin límite
+    response = jsonify({"error": "Demasiados inicios de sesión simultáneos, intente nuevamente"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -19,7 +27,7 @@ def register():
     if Doctor.query.filter_by(email=data['email']).first():
         return jsonify({"error": "El email ya está registrado"}), 400
 
-    hashed_password = generate_password_hash(data['password'])
+    hashed_password = hash_password(data['password'])
     
     new_doctor = Doctor(
         email=data['email'],
@@ -45,7 +53,19 @@ def login():
 
     doctor = Doctor.query.filter_by(email=data['email']).first()
 
-    if doctor and check_password_hash(doctor.password, data['password']):
+    if doctor and verify_password(doctor.password, data['password']):
+        if not doctor.is_active:
+            return jsonify({"error": "La cuenta del doctor está desactivada"}), 403
+
+        # Hash con un método anterior a PASSWORD_HASH_METHOD: se regenera ahora
+        # que se conoce la contraseña
+        if needs_rehash(doctor.password):
+            doctor.password = hash_password(data['password'])
+            try:
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+
         access_token = create_access_token(identity=str(doctor.id))
         return jsonify({
             "access_token": access_token
@@ -56,11 +76,8 @@ def login():
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def profile():
-    current_doctor_id = get_jwt_identity()
-    doctor = Doctor.query.get(current_doctor_id)
-
-    if not doctor:
-        return jsonify({"error": "Doctor no encontrado"}), 404
+    # Resuelto por el user_lookup_loader desde la caché de identidades
+    doctor = current_user
 
     return jsonify({
         "id": doctor.id,
@@ -102,14 +119,15 @@ def update_profile():
             return jsonify({"detail": "Debe proporcionar la contraseña actual"}), 400
         
         # Verificar que la contraseña actual sea correcta
-        if not check_password_hash(doctor.password, data['current_password']):
+        if not verify_password(doctor.password, data['current_password']):
             return jsonify({"detail": "La contraseña actual es incorrecta"}), 400
         
         # Actualizar con la nueva contraseña
-        doctor.password = generate_password_hash(data['new_password'])
+        doctor.password = hash_password(data['new_password'])
         
     try:
         db.session.commit()
+        identity.invalidate(doctor.id)
         return jsonify({
             "message": "Perfil actualizado correctamente"
         }), 200
@@ -130,6 +148,7 @@ def deactivate_profile():
     
     try:
         db.session.commit()
+        identity.invalidate(doctor.id)
         return jsonify({"message": "La cuenta ha sido desactivada"}), 200
     except Exception as e:
         db.session.rollback()
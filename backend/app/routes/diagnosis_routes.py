@@ -1,27 +1,32 @@
 import os
-import uuid
+import json
 import random
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.extensions import db
-from app.models.diagnosis import Diagnosis
+from werkzeug.exceptions import RequestEntityTooLarge
+from app.extensions import db, job_queue
+from app.models.diagnosis import Diagnosis, UNKNOWN_RESULT_CODE, result_codes_matching
 from app.models.patient import Patient
+from app.services.jobs import QueueFullError
+from app.services.batch_upload import BatchUploadError, discard, receive_batch
+from app.services.uploads import InvalidImage
+from app.services import dashboard, heatmaps, ingest, metrics, prediction_cache, stats, storage
+from app.services.pagination import InvalidCursor, cursor_page
+from app.services.db_routing import read_only
 
-# Intento de importación condicional para evitar fallos si TF no está instalado
-try:
-    from app.ml.covid_predictor import predict_image
-    TF_AVAILABLE = True
-except ImportError:
-    TF_AVAILABLE = False
+# El predictor se importa sin cargar TensorFlow; el modelo se carga en segundo plano
+from app.ml.covid_predictor import MODELS, MODELS_AVAILABLE, model_version, predict_image, predict_batch
+from app.ml.model_loader import ModelNotReady
+
+TF_AVAILABLE = MODELS_AVAILABLE
+if not TF_AVAILABLE:
     print("Advertencia: covid_predictor no disponible (TensorFlow faltante).")
 
 diagnosis_bp = Blueprint("diagnosis", __name__)
 
-UPLOAD_FOLDER = "media/uploads/x-ray"
-HEATMAP_FOLDER = "media/heatmap"
-
 @diagnosis_bp.route("/", methods=["GET"])
 @jwt_required()
+@read_only
 def get_diagnoses():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
@@ -32,16 +37,34 @@ def get_diagnoses():
     date_from = request.args.get('date_from')
     date_to = request.args.get('date_to')
     
-    query = Diagnosis.query
+    # Una sola consulta con JOIN y solo las columnas necesarias (sin N+1 ni objetos ORM)
+    query = db.session.query(
+        Diagnosis.id,
+        Diagnosis.result,
+        Diagnosis.confidence,
+        Diagnosis.image_path,
+        Diagnosis.heatmap_path,
+        Diagnosis.created_at,
+        Patient.full_name.label("patient_name")
+    ).outerjoin(Patient, Patient.id == Diagnosis.patient_id)
 
     if patient_id:
-        query = query.filter_by(patient_id=patient_id)
+        query = query.filter(Diagnosis.patient_id == patient_id)
     
     if result_filter:
-        if request.args.get('result') == "NO COVID":
-            query = query.filter(Diagnosis.result.ilike("%NORMAL%"))
+        if result_filter == "NO COVID":
+            result_filter = "NORMAL"
+
+        # Igualdad sobre result_code (indexado); el texto libre solo se busca
+        # entre las etiquetas desconocidas (código 0)
+        codes = result_codes_matching(result_filter)
+        if codes:
+            query = query.filter(Diagnosis.result_code.in_(codes))
         else:
-            query = query.filter(Diagnosis.result.ilike(f"%{result_filter}%"))
+            query = query.filter(
+                Diagnosis.result_code == UNKNOWN_RESULT_CODE,
+                Diagnosis.result.ilike(f"%{result_filter}%")
+            )
         
     if date_from:
         query = query.filter(Diagnosis.created_at >= date_from)
@@ -49,48 +72,167 @@ def get_diagnoses():
     if date_to:
         query = query.filter(Diagnosis.created_at <= date_to)
 
-    # Ordenar por defecto descendente
-    query = query.order_by(Diagnosis.id.desc())
-
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    diagnoses = pagination.items
+    if "cursor" in request.args:
+        # Paginación por cursor sobre id (sin OFFSET ni COUNT)
+        try:
+            diagnoses, meta = cursor_page(query, [Diagnosis.id], request.args, per_page)
+        except InvalidCursor as e:
+            return {"error": str(e)}, 400
+    else:
+        # Ordenar por defecto descendente
+        pagination = query.order_by(Diagnosis.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+        diagnoses = pagination.items
+        meta = {
+            "page": pagination.page,
+            "per_page": per_page,
+            "total": pagination.total
+        }
     
     base_url = request.host_url.rstrip("/")
     data = []
     
     for d in diagnoses:
-        # Obtener nombre del paciente si es posible
-        patient_name = d.patient.full_name if d.patient else "Desconocido"
-        
         data.append({
             "id": d.id,
-            "patient_name": patient_name,
+            "patient_name": d.patient_name or "Desconocido",
             "result": d.result,
             "confidence": float(d.confidence),
             "image_url": f"{base_url}/media/{d.image_path}",
+            "thumbnail_url": f"{base_url}/media/{d.image_path}?size=thumb",
             "heatmap_url": f"{base_url}/media/{d.heatmap_path}",
             "created_at": d.created_at.isoformat() if d.created_at else None
         })
         
-    return jsonify({
-        "page": pagination.page,
-        "per_page": per_page,
-        "total": pagination.total,
-        "data": data
-    }), 200
+    return jsonify({**meta, "data": data}), 200
+
+DISEASE_TYPES = ["COVID", "IRA", "EDA", "HIPERTENSION", "DIABETES"]
+
+
+def serialize_prediction(diagnosis, base_url):
+    return {
+        "id": diagnosis.id,
+        "result": diagnosis.result,
+        "confidence": float(diagnosis.confidence),
+        "image_url": f"{base_url}/media/{diagnosis.image_path}",
+        "heatmap_url": f"{base_url}/media/{diagnosis.heatmap_path}",
+        # Diferido (HEATMAP_MODE lazy/background): se genera al pedir heatmap_url
+        "heatmap_pending": heatmaps.is_pending(diagnosis.heatmap_path)
+    }
+
+
+def mock_prediction(disease_type, image_key, heatmap_key):
+    # --- MOCK / SIMULACIÓN ---
+    storage.media.copy(image_key, heatmap_key)
+
+    if disease_type == "COVID":
+        # TensorFlow no disponible
+        return "MOCK_RESULT", 90.0
+
+    possible_outcomes = ["Positivo", "Negativo", "Riesgo Alto", "Riesgo Bajo"]
+    return random.choice(possible_outcomes), round(random.uniform(70.0, 99.0), 2)
+
+
+def _content_hash(filename):
+    # Los uploads se guardan como <sha256>.<ext>
+    return os.path.splitext(filename)[0]
+
+
+def _heatmap_key(filename, disease_type):
+    # El Grad-CAM depende de la versión del modelo; el mock es una copia de la imagen
+    if disease_type == "COVID" and TF_AVAILABLE:
+        return heatmaps.key_for(_content_hash(filename))
+    return storage.heatmap_key(filename)
+
+
+def run_prediction(patient_id, doctor_id, disease_type, filename, upload=None):
+    # upload: IngestedImage en memoria (predict); None si el archivo ya está guardado
+
+    # Claves del storage, que son también las rutas guardadas en BD
+    db_image_path = storage.upload_key(filename)
+    db_heatmap_path = _heatmap_key(filename, disease_type)
+
+    #  Lógica de Predicción según enfermedad
+    if disease_type == "COVID" and TF_AVAILABLE:
+        # Misma imagen + mismo modelo: se reutiliza el resultado y los archivos
+        content_hash = _content_hash(filename)
+        cached = prediction_cache.lookup(content_hash, model_version())
+        if cached:
+            label, confidence = cached["result"], cached["confidence"]
+            db_heatmap_path = cached["heatmap_path"]
+        else:
+            # Predicción REAL (en modo diferido solo se clasifica)
+            label, confidence = predict_image(
+                db_image_path,
+                None if heatmaps.DEFERRED else db_heatmap_path,
+                upload.image if upload is not None else None
+            )
+            prediction_cache.store(
+                content_hash, model_version(), label, confidence, db_image_path, db_heatmap_path
+            )
+    else:
+        # El mock copia el archivo: tiene que estar escrito
+        if upload is not None:
+            upload.wait_saved()
+        label, confidence = mock_prediction(disease_type, db_image_path, db_heatmap_path)
+
+    # El original se escribe en paralelo con la inferencia; el diagnóstico se
+    # guarda recién cuando está en disco
+    if upload is not None:
+        upload.wait_saved()
+
+    # Guardaremos el label directo como 'result'
+    diagnosis = Diagnosis(
+        patient_id=patient_id,
+        doctor_id=doctor_id,
+        image_path=db_image_path,
+        heatmap_path=db_heatmap_path,
+        result=label,
+        confidence=confidence
+    )
+
+    db.session.add(diagnosis)
+    with metrics.stage("db_commit"):
+        db.session.commit()
+
+    heatmaps.schedule(db_heatmap_path)
+    return diagnosis
+
+
+def run_prediction_job(patient_id, doctor_id, disease_type, filename, base_url, upload=None):
+    try:
+        diagnosis = run_prediction(patient_id, doctor_id, disease_type, filename, upload)
+        return serialize_prediction(diagnosis, base_url)
+    except Exception:
+        db.session.rollback()
+        if upload is not None:
+            upload.discard()
+        raise
+
 
 @diagnosis_bp.route("/predict", methods=["POST"])
 @jwt_required()
 def predict():
-    # 1️⃣ Validar datos básicos
-    if "image" not in request.files:
+    # 1️⃣ Leer el formulario una sola vez: la imagen queda en memoria y se
+    # valida (tamaño, formato, dimensiones) antes de cualquier trabajo del modelo
+    try:
+        form, upload = ingest.receive_image(request.environ)
+    except RequestEntityTooLarge:
+        return {"error": f"La imagen supera el máximo de {current_app.config['UPLOAD_MAX_BYTES']} bytes"}, 413
+    except InvalidImage as e:
+        return {"error": str(e)}, 400
+
+    if upload is None:
         return {"error": "No image provided"}, 400
     
-    patient_id = request.form.get("patient_id")
-    disease_type = request.form.get("disease_type", "COVID") # Default a COVID
+    patient_id = form.get("patient_id")
+    disease_type = form.get("disease_type", "COVID").upper() # Default a COVID
+    run_async = request.args.get("async") in ("1", "true")
 
     if not patient_id:
         return {"error": "patient_id required"}, 400
+
+    if disease_type not in DISEASE_TYPES:
+        return {"error": f"Tipo de enfermedad '{disease_type}' no soportado"}, 400
         
     doctor_id = get_jwt_identity()
 
@@ -99,91 +241,253 @@ def predict():
     if not patient:
         return {"error": "Paciente no encontrado"}, 404
 
-    image = request.files["image"]
+    # Si el modelo todavía se está cargando se responde 503 sin guardar nada
+    if disease_type == "COVID" and TF_AVAILABLE and not MODELS.ready:
+        return _warming_up_response()
 
-    # Preparar carpetas
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    os.makedirs(HEATMAP_FOLDER, exist_ok=True)
+    # En modo asíncrono se rechaza antes de guardar nada si la cola está llena
+    if run_async and job_queue.is_full():
+        return _queue_full_response()
 
-    filename = f"{uuid.uuid4().hex}.png"
-    image_path = os.path.join(UPLOAD_FOLDER, filename)
-    heatmap_path = os.path.join(HEATMAP_FOLDER, filename)
-    
-    # Guardar imagen original
-    image.save(image_path)
+    # Guardar el original en segundo plano con nombre por contenido (SHA-256)
+    # y su extensión real: las subidas repetidas no duplican el archivo y
+    # pueden reutilizar la predicción
+    upload.persist()
+    filename = upload.filename
 
-    #  Lógica de Predicción según enfermedad
-    label = "Desconocido"
-    confidence = 0.0
-    
-    # Rutas relativas para DB
-    db_image_path = f"uploads/x-ray/{filename}"
-    db_heatmap_path = f"heatmap/{filename}"
+    base_url = request.host_url.rstrip("/")
+
+    if run_async:
+        try:
+            job = job_queue.submit(
+                doctor_id, run_prediction_job,
+                patient_id, doctor_id, disease_type, filename, base_url, upload
+            )
+        except QueueFullError:
+            upload.discard()
+            return _queue_full_response()
+
+        return jsonify({
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"{base_url}/api/diagnoses/jobs/{job.id}"
+        }), 202
 
     try:
-        if disease_type.upper() == "COVID":
-            # Predicción REAL
-            if TF_AVAILABLE:
-                label, confidence = predict_image(image_path, heatmap_path)
-            else:
-                label = "MOCK_RESULT"
-                confidence = 90.0
-                import shutil
-                shutil.copy(image_path, heatmap_path)
-        
-        elif disease_type.upper() in ["IRA", "EDA", "HIPERTENSION", "DIABETES"]:
-            # --- MOCK / SIMULACIÓN ---
-            import shutil
-            shutil.copy(image_path, heatmap_path)
-            
-            possible_outcomes = ["Positivo", "Negativo", "Riesgo Alto", "Riesgo Bajo"]
-            label = random.choice(possible_outcomes)
-            confidence = round(random.uniform(70.0, 99.0), 2)
-            
+        diagnosis = run_prediction(patient_id, doctor_id, disease_type, filename, upload)
+        return jsonify(serialize_prediction(diagnosis, base_url))
+
+    except ModelNotReady:
+        db.session.rollback()
+        upload.discard()
+        return _warming_up_response()
+
+    except InvalidImage as e:
+        db.session.rollback()
+        upload.discard()
+        return {"error": str(e)}, 400
+
+    except Exception:
+        db.session.rollback()
+        upload.discard()
+        current_app.logger.exception("Error en predicción")
+        return {"error": "Error interno durante el procesamiento"}, 500
+
+
+def _predict_chunk(chunk, disease_type):
+    # Devuelve [(label, confidence, db_heatmap_path)] en el orden de chunk
+    results = {}
+    pending = {}
+
+    for item in chunk:
+        db_heatmap_path = _heatmap_key(item.filename, disease_type)
+
+        if disease_type == "COVID" and TF_AVAILABLE:
+            cached = prediction_cache.lookup(_content_hash(item.filename), model_version())
+            if cached:
+                results[item.filename] = (cached["result"], cached["confidence"], cached["heatmap_path"])
+            elif item.filename not in results:
+                # Imágenes repetidas dentro del mismo estudio se infieren una vez
+                pending[item.filename] = db_heatmap_path
         else:
-            return {"error": f"Tipo de enfermedad '{disease_type}' no soportado"}, 400
-
-        # Guardamos el resultado. Si es COVID, guardamos solo "COVID" o "NORMAL" según el label.
-        # Si es otro, quizás queramos guardar el tipo. Pero para cumplir la spec, el output es 'result'.
-        # Guardaremos el label directo.
-        final_result = label
-
-        #  Guardar en BD
-        diagnosis = Diagnosis(
-            patient_id=patient_id,
-            doctor_id=doctor_id,
-            image_path=db_image_path,
-            heatmap_path=db_heatmap_path,
-            result=final_result,
-            confidence=confidence
+            label, confidence = mock_prediction(disease_type, storage.upload_key(item.filename), db_heatmap_path)
+            results[item.filename] = (label, confidence, db_heatmap_path)
+
+    if pending:
+        filenames = list(pending)
+        predictions = predict_batch(
+            [storage.upload_key(filename) for filename in filenames],
+            None if heatmaps.DEFERRED else [pending[filename] for filename in filenames]
         )
+        for filename, (label, confidence) in zip(filenames, predictions):
+            db_heatmap_path = pending[filename]
+            prediction_cache.store(
+                _content_hash(filename), model_version(), label, confidence,
+                storage.upload_key(filename), db_heatmap_path
+            )
+            results[filename] = (label, confidence, db_heatmap_path)
 
-        db.session.add(diagnosis)
-        db.session.commit()
+    return [results[item.filename] for item in chunk]
 
-        base_url = request.host_url.rstrip("/")
 
-        return jsonify({
-            "result": final_result,
-            "confidence": float(confidence),
-            "image_url": f"{base_url}/media/{db_image_path}",
-            "heatmap_url": f"{base_url}/media/{db_heatmap_path}"
-        })
+@diagnosis_bp.route("/predict/batch", methods=["POST"])
+@jwt_required()
+def predict_batch_route():
+    doctor_id = get_jwt_identity()
 
-    except Exception as e:
-        print(f"Error en predicción: {e}")
-        return {"error": "Error interno durante el procesamiento"}, 500
+    # Las imágenes van directo a disco mientras se lee el body
+    try:
+        form, items = receive_batch(
+            request.environ,
+            current_app.config["PREDICT_BATCH_MAX_FILES"],
+            current_app.config["PREDICT_BATCH_MAX_BYTES"],
+            current_app.config["UPLOAD_MAX_BYTES"]
+        )
+    except BatchUploadError as e:
+        return {"error": str(e)}, 400
+
+    if not items:
+        return {"error": "No images provided"}, 400
+
+    disease_type = form.get("disease_type", request.args.get("disease_type", "COVID")).upper()
+    if disease_type not in DISEASE_TYPES:
+        discard(items)
+        return {"error": f"Tipo de enfermedad '{disease_type}' no soportado"}, 400
+
+    if disease_type == "COVID" and TF_AVAILABLE and not MODELS.ready:
+        discard(items)
+        return _warming_up_response()
+
+    # Validar todos los pacientes con una sola consulta
+    patient_ids = {item.patient_id for item in items if item.patient_id}
+    existing = {
+        str(pid) for (pid,) in
+        db.session.query(Patient.id).filter(Patient.id.in_(patient_ids)).all()
+    } if patient_ids else set()
+
+    batch_size = current_app.config["PREDICT_MAX_BATCH_SIZE"]
+    base_url = request.host_url.rstrip("/")
+
+    def generate():
+        rows = []
+        valid = [item for item in items if item.patient_id in existing]
+        rejected = [item for item in items if item.patient_id not in existing]
+
+        # Un archivo rechazado puede ser el mismo (por contenido) que uno válido
+        discard(rejected, keep=valid)
+        for item in rejected:
+            yield json.dumps({
+                "file": item.original_name,
+                "patient_id": item.patient_id,
+                "error": "Paciente no encontrado"
+            }) + "\n"
+
+        for start in range(0, len(valid), batch_size):
+            chunk = valid[start:start + batch_size]
+
+            try:
+                results = _predict_chunk(chunk, disease_type)
+            except Exception:
+                current_app.logger.exception("Error en predicción")
+                for item in chunk:
+                    yield json.dumps({
+                        "file": item.original_name,
+                        "patient_id": item.patient_id,
+                        "error": "Error interno durante el procesamiento"
+                    }) + "\n"
+                continue
+
+            for item, (label, confidence, db_heatmap_path) in zip(chunk, results):
+                rows.append({
+                    "patient_id": int(item.patient_id),
+                    "doctor_id": int(doctor_id),
+                    "image_path": storage.upload_key(item.filename),
+                    "heatmap_path": db_heatmap_path,
+                    "result": label,
+                    "confidence": confidence
+                })
+                yield json.dumps({
+                    "file": item.original_name,
+                    "patient_id": item.patient_id,
+                    "result": label,
+                    "confidence": float(confidence),
+                    "image_url": f"{base_url}/media/{storage.upload_key(item.filename)}",
+                    "heatmap_url": f"{base_url}/media/{db_heatmap_path}",
+                    "heatmap_pending": heatmaps.is_pending(db_heatmap_path)
+                }) + "\n"
+
+        #  Guardar en BD: un solo INSERT masivo y un commit
+        try:
+            db.session.bulk_insert_mappings(Diagnosis, rows)
+            stats.apply_deltas(db.session.connection(), *stats.diagnosis_rows_deltas(rows))
+            with metrics.stage("db_commit"):
+                db.session.commit()
+            dashboard.invalidate(doctor_id)
+            for heatmap_path in {row["heatmap_path"] for row in rows}:
+                heatmaps.schedule(heatmap_path)
+            yield json.dumps({"status": "done", "saved": len(rows), "total": len(items)}) + "\n"
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Error guardando diagnósticos")
+            yield json.dumps({"status": "error", "error": "No se pudieron guardar los diagnósticos"}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+def _warming_up_response():
+    MODELS.start_background()
+    response = jsonify({"error": "Modelo cargando (warming up), intente más tarde", "model": MODELS.status()})
+    response.headers["Retry-After"] = "10"
+    return response, 503
+
+
+def _queue_full_response():
+    response = jsonify({"error": "Cola de predicciones llena, intente más tarde"})
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+
+@diagnosis_bp.route("/jobs/<job_id>", methods=["GET"])
+@jwt_required()
+def get_job(job_id):
+    job = job_queue.get(job_id)
+
+    # Un doctor solo puede consultar sus propios jobs
+    if not job or job.owner_id != get_jwt_identity():
+        return {"error": "Job no encontrado"}, 404
+
+    return jsonify(job.to_dict()), 200
 
 @diagnosis_bp.route("/patient/<int:patient_id>", methods=["GET"])
 @jwt_required()
+@read_only
 def get_patient_history(patient_id):
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     
-    pagination = Diagnosis.query.filter_by(patient_id=patient_id).order_by(Diagnosis.id.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
-    diagnoses = pagination.items
+    query = db.session.query(
+        Diagnosis.id,
+        Diagnosis.result,
+        Diagnosis.confidence,
+        Diagnosis.image_path,
+        Diagnosis.heatmap_path
+    ).filter(Diagnosis.patient_id == patient_id)
+
+    if "cursor" in request.args:
+        try:
+            diagnoses, meta = cursor_page(query, [Diagnosis.id], request.args, per_page)
+        except InvalidCursor as e:
+            return {"error": str(e)}, 400
+    else:
+        pagination = query.order_by(Diagnosis.id.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+        diagnoses = pagination.items
+        meta = {
+            "total": pagination.total,
+            "pages": pagination.pages,
+            "current_page": pagination.page
+        }
     
     base_url = request.host_url.rstrip("/")
     result = []
@@ -195,12 +499,8 @@ def get_patient_history(patient_id):
             "result": d.result,
             "confidence": float(d.confidence),
             "image_url": f"{base_url}/media/{d.image_path}",
+            "thumbnail_url": f"{base_url}/media/{d.image_path}?size=thumb",
             "heatmap_url": f"{base_url}/media/{d.heatmap_path}"
         })
         
-    return jsonify({
-        "items": result,
-        "total": pagination.total,
-        "pages": pagination.pages,
-        "current_page": pagination.page
-    }), 200
\ No newline at end of file
+    return jsonify({"items": result, **meta}), 200
\ No newline at end of file
@@ -0,0 +1,19 @@
+from flask import Blueprint, jsonify
+from app.ml.covid_predictor import MODELS, MODELS_AVAILABLE
+
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('', methods=['GET'])
+def health():
+    # Liveness: responde siempre, sin tocar la BD ni el modelo
+    return jsonify({
+        "status": "ok",
+        "model": MODELS.status() if MODELS_AVAILABLE else {"state": "unavailable"}
+    }), 200
+
+@health_bp.route('/ready', methods=['GET'])
+def ready():
+    # Readiness: 503 mientras el modelo se está cargando
+    if MODELS_AVAILABLE and not MODELS.ready:
+        return jsonify({"status": "warming_up", "model": MODELS.status()}), 503
+    return jsonify({"status": "ready"}), 200
@@ -0,0 +1,69 @@
+import mimetypes
+import os
+from flask import Blueprint, Response, abort, current_app, jsonify, redirect, request, send_from_directory
+
+from app.ml.model_loader import ModelNotReady
+from app.services import heatmaps, storage, thumbnails
+
+media_bp = Blueprint("media", __name__)
+
+# Con MEDIA_SENDFILE = "x-accel", nginx sirve los bytes. Ejemplo:
+#
+#   location /protected-media/ {
+#       internal;
+#       alias /ruta/al/backend/media/;
+#   }
+#
+# Con "x-sendfile" Flask responde con la cabecera X-Sendfile (USE_X_SENDFILE).
+# Con STORAGE_BACKEND = "s3" se redirige a una URL firmada del bucket.
+
+
+def _retry_later(message, seconds):
+    response = jsonify({"error": message})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(seconds)
+    return response
+
+
+@media_bp.route("/<path:filename>")
+def media_files(filename):
+    # Heatmap diferido: el primer request lo genera y los demás esperan
+    if heatmaps.DEFERRED:
+        try:
+            heatmaps.ensure(filename)
+        except (ModelNotReady, heatmaps.HeatmapPending):
+            return _retry_later("El heatmap se está generando, intente nuevamente", 5)
+
+    size = request.args.get("size")
+    if size == "thumb":
+        filename = thumbnails.ensure(filename)
+        if filename is None:
+            abort(404)
+    elif size is not None:
+        return {"error": f"size '{size}' no soportado (usar 'thumb')"}, 400
+
+    try:
+        path = storage.media.local_path(filename)
+    except KeyError:
+        abort(404)
+
+    if path is None:
+        # Backend remoto: el bucket sirve los bytes
+        if not storage.media.exists(filename):
+            abort(404)
+        return redirect(storage.media.url(filename))
+
+    max_age = current_app.config["MEDIA_CACHE_MAX_AGE"]
+
+    if current_app.config["MEDIA_SENDFILE"] == "x-accel":
+        if not os.path.isfile(path):
+            abort(404)
+        response = Response(mimetype=mimetypes.guess_type(path)[0] or "application/octet-stream")
+        response.headers["X-Accel-Redirect"] = current_app.config["MEDIA_ACCEL_PREFIX"] + filename
+    else:
+        # ETag/Last-Modified (304) y Range (206) los resuelve send_file
+        response = send_from_directory(storage.media.root, filename, max_age=max_age)
+
+    # Los nombres son por contenido: el archivo de una URL nunca cambia
+    response.headers["Cache-Control"] = f"public, max-age={max_age}, immutable"
+    return response
@@ -0,0 +1,9 @@
+from flask import Blueprint, Response
+from app.services import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('', methods=['GET'])
+def get_metrics():
+    # Formato de texto de Prometheus; sin JWT, como /api/health (restringir en el proxy)
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -1,24 +1,45 @@
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models.patient import Patient
 from app.extensions import db
+from app.services import patient_import
+from app.services.pagination import InvalidCursor, cursor_page
+from app.services.db_routing import read_only
 
 patient_bp = Blueprint('patients', __name__)
 
 @patient_bp.route('/', methods=['GET'])
 @jwt_required()
+@read_only
 def get_patients():
     doctor_id = get_jwt_identity()
 
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
 
-    pagination = Patient.query \
-        .filter_by(doctor_id=doctor_id) \
-        .order_by(Patient.created_at.desc()) \
-        .paginate(page=page, per_page=per_page, error_out=False)
-
-    patients = pagination.items
+    query = db.session.query(Patient.id, Patient.full_name, Patient.age, Patient.gender) \
+        .filter(Patient.doctor_id == doctor_id)
+
+    if "cursor" in request.args:
+        # Paginación por cursor sobre id: created_at lo asigna la BD al insertar,
+        # así que el orden por id coincide con el de created_at
+        try:
+            patients, meta = cursor_page(query, [Patient.id], request.args, per_page)
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+    else:
+        pagination = query \
+            .order_by(Patient.created_at.desc()) \
+            .paginate(page=page, per_page=per_page, error_out=False)
+
+        patients = pagination.items
+        meta = {
+            "page": pagination.page,
+            "per_page": per_page,
+            "total": pagination.total,
+            "pages": pagination.pages
+        }
 
     data = []
     for p in patients:
@@ -29,13 +50,7 @@ def get_patients():
             "gender": p.gender
         })
 
-    return jsonify({
-        "page": pagination.page,
-        "per_page": per_page,
-        "total": pagination.total,
-        "pages": pagination.pages,
-        "data": data
-    }), 200
+    return jsonify({**meta, "data": data}), 200
 
 
 @patient_bp.route('/', methods=['POST'])
@@ -70,6 +85,28 @@ def create_patient():
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+@patient_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def bulk_create_patients():
+    # Body CSV (text/csv) o NDJSON (application/x-ndjson) con full_name, age,
+    # gender y dni opcional. ?upsert=1 actualiza por dni; ?chunk_size=N filas por lote
+    doctor_id = get_jwt_identity()
+    upsert = request.args.get('upsert', '0') in ('1', 'true')
+    chunk_size = request.args.get('chunk_size', current_app.config["PATIENT_IMPORT_CHUNK_SIZE"], type=int)
+    if not 1 <= chunk_size <= patient_import.MAX_CHUNK_SIZE:
+        return jsonify({"error": f"chunk_size debe estar entre 1 y {patient_import.MAX_CHUNK_SIZE}"}), 400
+
+    try:
+        rows = patient_import.read_rows(request.stream, request.mimetype)
+    except patient_import.ImportFormatError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate():
+        for entry in patient_import.import_patients(rows, doctor_id, chunk_size, upsert):
+            yield json.dumps(entry) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 @patient_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
 def get_patient(id):
@@ -0,0 +1,141 @@
+# app/services/batch_upload.py
+import os
+import tarfile
+import zipfile
+
+from werkzeug.formparser import parse_form_data
+
+from app.services import storage
+from app.services.uploads import InvalidImage, commit_upload, discard_unreferenced, new_part, store_hashed
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+
+
+class BatchUploadError(Exception):
+    pass
+
+
+class UploadedImage:
+    def __init__(self, patient_id, filename, original_name, created=True):
+        self.patient_id = patient_id
+        self.filename = filename
+        self.original_name = original_name
+        # False si el mismo contenido ya estaba en disco (no se debe borrar)
+        self.created = created
+
+
+def _is_image(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def _is_archive(name):
+    return name.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def _patient_from_member(member_name, default_patient_id):
+    # Dentro de un archivo, "<patient_id>/imagen.png" asigna la imagen a ese paciente
+    parts = member_name.replace("\\", "/").split("/")
+    if len(parts) > 1 and parts[0].isdigit():
+        return parts[0]
+    return default_patient_id
+
+
+def _iter_archive(path, original_name, check_size):
+    # Devuelve (nombre, fileobj) de cada imagen sin extraer el archivo completo.
+    # check_size(nombre, bytes) valida el tamaño declarado antes de abrir el
+    # miembro; zipfile y tarfile no leen más allá de ese tamaño
+    if original_name.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_image(info.filename):
+                    check_size(info.filename, info.file_size)
+                    with archive.open(info) as member:
+                        yield info.filename, member
+    else:
+        with tarfile.open(path, "r:*") as archive:
+            for info in archive:
+                if info.isfile() and _is_image(info.name):
+                    check_size(info.name, info.size)
+                    yield info.name, archive.extractfile(info)
+
+
+def discard(items, keep=()):
+    # Borra los archivos creados por esta solicitud, salvo los que comparte
+    # (mismo contenido) con una imagen de keep que sigue en proceso
+    kept = {item.filename for item in keep}
+    discard_unreferenced(
+        storage.upload_key(item.filename) for item in items
+        if item.created and item.filename not in kept
+    )
+
+
+# Lee el multipart en streaming y guarda cada imagen en el storage: los archivos
+# del formulario se escriben directo a disco, sin pasar por memoria. Se aceptan
+# varios campos "images" y/o archivos zip/tar ("images" o "archive"). El paciente
+# de cada imagen sale de "patient_ids" (mismo orden que "images"), de la carpeta
+# dentro del archivo o de "patient_id". Devuelve (form, lista de UploadedImage).
+# max_image_bytes y max_bytes limitan cada imagen y el total ya descomprimido:
+# MAX_CONTENT_LENGTH solo acota el body comprimido.
+def receive_batch(environ, max_files, max_bytes, max_image_bytes):
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        # Cada parte se hashea mientras se escribe (nombre por contenido)
+        return new_part()
+
+    _, form, files = parse_form_data(environ, stream_factory=stream_factory)
+
+    default_patient_id = form.get("patient_id")
+    patient_ids = form.getlist("patient_ids")
+    uploads = files.getlist("images") + files.getlist("archive")
+
+    items = []
+    total = 0
+
+    def check_size(name, size):
+        nonlocal total
+        if size > max_image_bytes:
+            raise BatchUploadError(f"{name} supera el máximo de {max_image_bytes} bytes por imagen")
+        total += size
+        if total > max_bytes:
+            raise BatchUploadError(f"La solicitud supera el máximo de {max_bytes} bytes descomprimidos")
+
+    try:
+        for index, part in enumerate(uploads):
+            part_path = part.stream.name
+            part.stream.close()
+            name = part.filename or ""
+
+            if _is_archive(name):
+                for member_name, member in _iter_archive(part_path, name, check_size):
+                    if len(items) >= max_files:
+                        raise BatchUploadError(f"Máximo {max_files} imágenes por solicitud")
+                    filename, _, created = store_hashed(member)
+                    items.append(UploadedImage(
+                        _patient_from_member(member_name, default_patient_id),
+                        filename,
+                        member_name,
+                        created
+                    ))
+                os.remove(part_path)
+
+            elif _is_image(name):
+                if len(items) >= max_files:
+                    raise BatchUploadError(f"Máximo {max_files} imágenes por solicitud")
+                check_size(name, os.path.getsize(part_path))
+                patient_id = patient_ids[index] if index < len(patient_ids) else default_patient_id
+                filename, created = commit_upload(part_path, part.stream.hexdigest())
+                items.append(UploadedImage(patient_id, filename, name, created))
+
+            else:
+                os.remove(part_path)
+                raise BatchUploadError(f"Formato no soportado: {name}")
+
+    except (BatchUploadError, InvalidImage, zipfile.BadZipFile, tarfile.TarError) as e:
+        # Limpiar lo que ya se escribió
+        for part in uploads:
+            if os.path.exists(part.stream.name):
+                os.remove(part.stream.name)
+        discard(items)
+        raise BatchUploadError(str(e))
+
+    return form, items
@@ -0,0 +1,85 @@
+# app/services/dashboard.py
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.patient import Patient
+from app.models.diagnosis import Diagnosis
+from app.services import stats
+from app.services.cache import TTLCache
+
+# Resumen del dashboard por doctor (clave: str(doctor_id))
+summary_cache = TTLCache()
+
+
+def init_app(app):
+    summary_cache.ttl = app.config.get("DASHBOARD_CACHE_TTL", 30)
+    summary_cache.max_size = app.config.get("DASHBOARD_CACHE_SIZE", 1024)
+
+
+def compute_summary(doctor_id):
+    # Lee los contadores materializados en doctor_stats (ver app/services/stats.py)
+    counts = stats.read_summary(doctor_id)
+
+    average_age = int(counts["age_sum"] / counts["age_count"]) if counts["age_count"] else 0
+    total_diagnoses = counts["total_diagnoses"]
+
+    if total_diagnoses > 0:
+        positive_rate = round((counts["covid_positive"] / total_diagnoses) * 100, 1)
+    else:
+        positive_rate = 0
+
+    return {
+        "patients": {
+            "total": counts["total_patients"],
+            "male": counts["male_patients"],
+            "female": counts["female_patients"],
+            "other": counts["other_patients"],
+            "average_age": average_age
+        },
+        "diagnoses": {
+            "total": total_diagnoses,
+            "covid_positive": counts["covid_positive"],
+            "covid_negative": counts["covid_negative"],
+            "positive_rate": positive_rate
+        },
+        "recent_activity": {
+            "diagnoses_last_7_days": counts["recent_diagnoses"]
+        }
+    }
+
+
+def get_summary(doctor_id):
+    key = str(doctor_id)
+    summary = summary_cache.get(key)
+    if summary is None:
+        summary = compute_summary(doctor_id)
+        summary_cache.set(key, summary)
+    return summary
+
+
+def invalidate(doctor_id):
+    summary_cache.invalidate(str(doctor_id))
+
+
+# ---------- INVALIDACIÓN AUTOMÁTICA ----------
+# Se anotan los doctores afectados en cada flush y se invalida al hacer commit,
+# así un rollback no deja la caché vacía sin motivo. Las escrituras masivas
+# (bulk_insert_mappings) no pasan por aquí y deben llamar a invalidate().
+
+@event.listens_for(Session, "after_flush")
+def _collect_dirty_doctors(session, flush_context):
+    doctors = session.info.setdefault("dashboard_dirty_doctors", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Patient, Diagnosis)) and obj.doctor_id is not None:
+            doctors.add(str(obj.doctor_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_dirty_doctors(session):
+    for doctor_id in session.info.pop("dashboard_dirty_doctors", ()):
+        summary_cache.invalidate(doctor_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_dirty_doctors(session):
+    session.info.pop("dashboard_dirty_doctors", None)
@@ -0,0 +1,110 @@
+# app/services/db_routing.py
+#
+# Pool de conexiones configurable (DB_POOL_*) y enrutamiento de lecturas a
+# una réplica opcional (DATABASE_REPLICA_URL).
+#
+# Las vistas marcadas con @read_only leen de la réplica; todo lo demás, y
+# cualquier INSERT/UPDATE/DELETE o flush aunque ocurra en una vista de
+# lectura, va al primario. Sin réplica configurada no cambia nada.
+#
+# Para probarlo en local alcanzan dos archivos SQLite (la réplica es una copia):
+#   cp /tmp/app.db /tmp/replica.db
+#   DATABASE_URL=sqlite:////tmp/app.db DATABASE_REPLICA_URL=sqlite:////tmp/replica.db flask run
+import time
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.services import metrics
+
+REPLICA_BIND = "replica"
+
+
+def _timed_pool(base, bind):
+    # Mide la espera de cada checkout (conexión libre, nueva o en cola hasta
+    # pool_timeout). La subclase sobrevive a engine.dispose()/recreate()
+    class TimedPool(base):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                metrics.observe_pool_wait(bind, time.perf_counter() - start)
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def engine_options(uri, config, bind):
+    url = sa.engine.make_url(uri)
+    if url.get_backend_name() == "sqlite":
+        # SQLite en memoria usa StaticPool (lo pone Flask-SQLAlchemy); en
+        # archivo, SQLAlchemy 1.4 abre una conexión por checkout (NullPool)
+        if url.database in (None, "", ":memory:"):
+            return {}
+        return {"poolclass": _timed_pool(NullPool, bind)}
+
+    return {
+        "poolclass": _timed_pool(QueuePool, bind),
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        # Por debajo del wait_timeout de MySQL: nunca se usa una conexión que
+        # el servidor ya cerró
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+
+
+def configure(app):
+    # Antes de db.init_app: Flask-SQLAlchemy crea los engines ahí
+    config = app.config
+    uri = config.get("SQLALCHEMY_DATABASE_URI")
+    if uri:
+        config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            **engine_options(uri, config, "primary"),
+            **config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+        }
+
+    replica_uri = config.get("SQLALCHEMY_REPLICA_URI")
+    if replica_uri:
+        config["SQLALCHEMY_BINDS"] = {
+            **config.get("SQLALCHEMY_BINDS", {}),
+            REPLICA_BIND: {"url": replica_uri, **engine_options(replica_uri, config, REPLICA_BIND)},
+        }
+
+
+def init_app(app, db):
+    with app.app_context():
+        engines = {"primary": db.engines[None]}
+        if REPLICA_BIND in db.engines:
+            engines[REPLICA_BIND] = db.engines[REPLICA_BIND]
+    metrics.watch_pools(engines)
+
+
+def read_only(view):
+    # Debajo de @jwt_required: la identidad del token se sigue resolviendo en
+    # el primario, solo las consultas de la vista van a la réplica
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica(clause):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self, clause):
+        if self._flushing or not has_app_context() or not g.get("db_read_only"):
+            return False
+        return not getattr(clause, "is_dml", False)
@@ -0,0 +1,119 @@
+# app/services/heatmaps.py
+import os
+import re
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from app.config import Config
+from app.extensions import db, job_queue
+from app.ml import gradcam_overlay
+from app.ml.covid_predictor import model_version, render_gradcam
+from app.models.prediction_cache import PredictionCache
+from app.services.jobs import QueueFullError
+from app.services import storage
+from app.services.uploads import find_upload
+
+# "eager": el Grad-CAM se genera en cada predicción
+# "lazy": predict solo clasifica; el heatmap queda pendiente hasta que se pide
+#         por /media (o lo genera `flask heatmaps render`)
+# "background": como "lazy", y además se encola su generación en la JobQueue
+MODE = Config.HEATMAP_MODE
+DEFERRED = MODE in ("lazy", "background")
+
+# <sha256 de la radiografía>_<versión del modelo>.<ext>
+_NAME = re.compile(r"^([0-9a-f]{64})_(.+)(\.[a-z]+)$")
+
+_lock = threading.Lock()
+_inflight = {}  # heatmap -> Future de la generación en curso
+
+
+class HeatmapPending(Exception):
+    pass
+
+
+def filename_for(content_hash):
+    return f"{content_hash}_{model_version()}{gradcam_overlay.extension()}"
+
+
+def key_for(content_hash):
+    return storage.heatmap_key(filename_for(content_hash))
+
+
+def _source(key):
+    # Clave de la radiografía a partir de la cual se puede generar el heatmap, o None
+    match = _NAME.match(os.path.basename(key))
+    if match is None or storage.heatmap_key(match.group(0)) != key:
+        return None
+
+    content_hash, version, ext = match.groups()
+    if version != model_version() or ext != gradcam_overlay.extension():
+        return None
+
+    return find_upload(content_hash)
+
+
+def is_pending(key):
+    return _NAME.match(os.path.basename(key)) is not None and not storage.media.exists(key) and _source(key) is not None
+
+
+def ensure(key, timeout=None):
+    # Deja el heatmap guardado si está pendiente. El primer llamador lo genera
+    # y los concurrentes esperan ese mismo resultado. Devuelve False si no
+    # existe ni se puede generar.
+    if storage.media.exists(key):
+        return True
+
+    source = _source(key)
+    if source is None:
+        return False
+
+    with _lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = _inflight[key] = Future()
+
+    if not owner:
+        try:
+            return future.result(timeout=timeout or Config.HEATMAP_WAIT_TIMEOUT)
+        except FutureTimeout:
+            raise HeatmapPending(key)
+
+    try:
+        # Otro hilo pudo terminarlo entre la verificación y el lock
+        if not storage.media.exists(key):
+            render_gradcam(source, key)
+        future.set_result(True)
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+    return True
+
+
+def schedule(key):
+    # Modo "background": se genera fuera del request, si la cola tiene lugar
+    if MODE != "background" or not is_pending(key):
+        return
+    try:
+        job_queue.submit(None, ensure, key)
+    except QueueFullError:
+        pass
+
+
+def pending(limit=None):
+    # Heatmaps pendientes de la versión actual del modelo
+    rows = (
+        db.session.query(PredictionCache.heatmap_path)
+        .filter(PredictionCache.model_version == model_version())
+        .yield_per(500)
+    )
+    found = 0
+    for (heatmap_path,) in rows:
+        if limit is not None and found >= limit:
+            return
+        if is_pending(heatmap_path):
+            found += 1
+            yield heatmap_path
@@ -0,0 +1,55 @@
+# app/services/identity.py
+from collections import namedtuple
+
+from flask import jsonify
+
+from app.extensions import db, jwt
+from app.models.doctor import Doctor
+from app.services.cache import TTLCache
+
+# Lo mínimo que necesita cada request autenticado; no es una instancia ORM,
+# así se puede compartir entre requests y sesiones
+DoctorIdentity = namedtuple("DoctorIdentity", "id email full_name specialty is_active")
+
+# Resuelve el doctor del JWT sin ir a la BD en cada request. Se invalida al
+# actualizar o desactivar el perfil; en los demás workers el TTL acota cuánto
+# tarda en verse una desactivación.
+identity_cache = TTLCache(ttl=60, max_size=4096)
+
+
+def lookup(doctor_id):
+    key = str(doctor_id)
+    identity = identity_cache.get(key)
+    if identity is None:
+        row = (
+            db.session.query(Doctor.id, Doctor.email, Doctor.full_name, Doctor.specialty, Doctor.is_active)
+            .filter(Doctor.id == doctor_id)
+            .first()
+        )
+        if row is None:
+            return None
+        identity = DoctorIdentity(*row)
+        identity_cache.set(key, identity)
+    return identity
+
+
+def invalidate(doctor_id):
+    identity_cache.invalidate(str(doctor_id))
+
+
+def init_app(app):
+    identity_cache.ttl = app.config.get("IDENTITY_CACHE_TTL", 60)
+    identity_cache.max_size = app.config.get("IDENTITY_CACHE_SIZE", 4096)
+
+    # Todo @jwt_required pasa por acá: doctores borrados o desactivados
+    # reciben 401 aunque su token siga vigente. current_user es el DoctorIdentity
+    @jwt.user_lookup_loader
+    def _load_doctor(jwt_header, jwt_data):
+        identity = lookup(jwt_data[app.config.get("JWT_IDENTITY_CLAIM", "sub")])
+        if identity is None or not identity.is_active:
+            return None
+        return identity
+
+    @jwt.user_lookup_error_loader
+    def _doctor_unavailable(jwt_header, jwt_data):
+        return jsonify({"error": "La cuenta del doctor no existe o está desactivada"}), 401
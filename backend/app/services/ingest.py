@@ -0,0 +1,160 @@
+# app/services/ingest.py
+import hashlib
+import io
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+
+from app.config import Config
+from app.services import metrics, storage
+from app.services.uploads import SIGNATURE_BYTES, InvalidImage, content_filename, discard_unreferenced, sniff_extension
+
+# Campos del formulario y boundaries, además de la imagen
+FORM_OVERHEAD = 64 * 1024
+
+# La escritura a disco del original corre en paralelo con la inferencia
+_writer = ThreadPoolExecutor(max_workers=Config.UPLOAD_WRITER_THREADS, thread_name_prefix="upload-writer")
+
+
+# Parte del multipart en memoria: se hashea, se limita el tamaño y se valida
+# la firma a medida que llega, así un payload inválido se corta en el primer bloque
+class MemoryUpload(io.BytesIO):
+
+    def __init__(self, max_bytes):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.extension = None
+        self._hash = hashlib.sha256()
+
+    def write(self, data):
+        if self.tell() + len(data) > self.max_bytes:
+            raise RequestEntityTooLarge(f"La imagen supera el máximo de {self.max_bytes} bytes")
+        self._hash.update(data)
+        written = super().write(data)
+        if self.extension is None and self.tell() >= SIGNATURE_BYTES:
+            with self.getbuffer() as view:
+                self.extension = sniff_extension(view[:SIGNATURE_BYTES].tobytes())
+        return written
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def _png_size(data):
+    # IHDR va primero: ancho y alto (big-endian) después de la firma
+    if len(data) < 24 or data[12:16].tobytes() != b"IHDR":
+        raise InvalidImage("PNG sin encabezado IHDR")
+    return struct.unpack(">II", data[16:24])
+
+
+def _jpeg_size(data):
+    # Recorre los segmentos hasta el SOF (Start Of Frame), que trae alto y ancho
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            break
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        i += 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+    raise InvalidImage("JPEG sin encabezado de tamaño")
+
+
+def _write(data, key):
+    # Escritura atómica; devuelve False si el mismo contenido ya estaba guardado
+    with metrics.stage("upload_save"):
+        if storage.media.exists(key):
+            return False
+        storage.media.write(key, data)
+        return True
+
+
+class IngestedImage:
+
+    def __init__(self, data, digest, extension, width, height, original_name):
+        self.data = data
+        self.digest = digest
+        self.extension = extension
+        self.width = width
+        self.height = height
+        self.original_name = original_name
+        self.filename = content_filename(digest, extension)
+        self.key = storage.upload_key(self.filename)
+        self.saved = None
+        self._image = None
+        self._lock = threading.Lock()
+
+    @property
+    def image(self):
+        # Se decodifica una sola vez (BGR, resolución original) y la comparten
+        # el modelo y el overlay del Grad-CAM. Un hit de caché no la decodifica.
+        with self._lock:
+            if self._image is None:
+                from app.ml import gradcam_overlay
+
+                try:
+                    with metrics.stage("decode"):
+                        self._image = gradcam_overlay.decode(self.data)
+                except ValueError as e:
+                    raise InvalidImage(str(e))
+        return self._image
+
+    def persist(self):
+        self.saved = _writer.submit(_write, self.data, self.key)
+        return self.saved
+
+    def wait_saved(self):
+        # True si este request creó el archivo. "upload_wait" es lo que la
+        # escritura en paralelo no llegó a esconder detrás de la inferencia
+        with metrics.stage("upload_wait"):
+            return self.saved.result()
+
+    def discard(self):
+        # Borra el archivo solo si lo creó este request y ningún diagnóstico
+        # guardado por otro request con la misma imagen lo usa
+        if self.saved is not None and self.wait_saved():
+            discard_unreferenced([self.key])
+
+
+def validate(upload, original_name):
+    data = upload.getbuffer()
+    extension = upload.extension or sniff_extension(data[:SIGNATURE_BYTES].tobytes())
+    width, height = _png_size(data) if extension == ".png" else _jpeg_size(data)
+
+    if min(width, height) < Config.UPLOAD_MIN_DIMENSION or max(width, height) > Config.UPLOAD_MAX_DIMENSION:
+        raise InvalidImage(
+            f"Dimensiones no soportadas: {width}x{height} (entre "
+            f"{Config.UPLOAD_MIN_DIMENSION} y {Config.UPLOAD_MAX_DIMENSION} px por lado)"
+        )
+    return IngestedImage(data, upload.hexdigest(), extension, width, height, original_name)
+
+
+# Lee el multipart una sola vez: la imagen queda en memoria, hasheada y
+# validada (tamaño, formato y dimensiones) antes de tocar el modelo o el disco.
+# Devuelve (form, IngestedImage o None si no vino el campo).
+def receive_image(environ, field="image"):
+    max_bytes = Config.UPLOAD_MAX_BYTES
+
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        return MemoryUpload(max_bytes)
+
+    _, form, files = parse_form_data(
+        environ,
+        stream_factory=stream_factory,
+        max_content_length=max_bytes + FORM_OVERHEAD
+    )
+
+    part = files.get(field)
+    if part is None:
+        return form, None
+    return form, validate(part.stream, part.filename)
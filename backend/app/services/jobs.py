@@ -0,0 +1,123 @@
+# app/services/jobs.py
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, owner_id):
+        self.id = uuid.uuid4().hex
+        self.owner_id = owner_id
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+# Pool de hilos acotado para tareas largas (predicciones). Las tareas corren
+# dentro de un app context propio. Con JOB_QUEUE_MODE = "inline" se ejecutan en
+# el mismo hilo que las encola, útil para pruebas sin hilos ni broker.
+class JobQueue:
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = None
+        self._workers = []
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.mode = app.config.get("JOB_QUEUE_MODE", "thread")
+        self.num_workers = app.config.get("JOB_QUEUE_WORKERS", 2)
+        self.max_history = app.config.get("JOB_QUEUE_HISTORY", 1000)
+        self._queue = queue.Queue(maxsize=app.config.get("JOB_QUEUE_SIZE", 16))
+        app.extensions["job_queue"] = self
+
+    def _start_workers(self):
+        # Los hilos se crean con el primer job para no cargar migraciones ni CLI
+        if self._workers:
+            return
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, owner_id, fn, *args, **kwargs):
+        job = Job(owner_id)
+        self._remember(job)
+
+        if self.mode == "inline":
+            self._run(job, fn, args, kwargs)
+            return job
+
+        with self._lock:
+            self._start_workers()
+        try:
+            self._queue.put_nowait((job, fn, args, kwargs))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            raise QueueFullError()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pending(self):
+        return self._queue.qsize() if self._queue else 0
+
+    def is_full(self):
+        return self.mode != "inline" and self._queue.full()
+
+    def _remember(self, job):
+        with self._lock:
+            self._jobs[job.id] = job
+            # Historial acotado: se descartan los jobs terminados más antiguos
+            while len(self._jobs) > self.max_history:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest.status in ("queued", "running"):
+                    break
+                self._jobs.pop(oldest_id)
+
+    def _worker_loop(self):
+        while True:
+            job, fn, args, kwargs = self._queue.get()
+            try:
+                self._run(job, fn, args, kwargs)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = "running"
+        with self.app.app_context():
+            try:
+                job.result = fn(*args, **kwargs)
+                job.status = "finished"
+            except Exception as e:
+                current_app.logger.exception("Error en job %s", job.id)
+                job.error = str(e)
+                job.status = "failed"
+        job.finished_at = datetime.utcnow()
@@ -0,0 +1,83 @@
+# app/services/media_migration.py
+#
+# Pasa los archivos guardados con el esquema plano anterior
+# ("uploads/x-ray/<nombre>", "heatmap/<nombre>") a claves particionadas del
+# storage en uso y reescribe image_path / heatmap_path. Es idempotente: las
+# rutas ya particionadas se saltean, así que se puede cortar y relanzar.
+import os
+
+from app.config import Config
+from app.extensions import db
+from app.models.diagnosis import Diagnosis
+from app.models.prediction_cache import PredictionCache
+from app.services import storage
+
+PREFIXES = {
+    storage.UPLOAD_PREFIX: storage.upload_key,
+    storage.HEATMAP_PREFIX: storage.heatmap_key,
+}
+
+COLUMNS = (
+    Diagnosis.image_path, Diagnosis.heatmap_path,
+    PredictionCache.image_path, PredictionCache.heatmap_path,
+)
+
+
+def new_key(path):
+    # Clave particionada para una ruta plana; None si no corresponde migrarla
+    prefix, _, filename = path.rpartition("/")
+    to_key = PREFIXES.get(prefix)
+    if to_key is None or not filename:
+        return None
+    return to_key(filename)
+
+
+def legacy_paths():
+    paths = set()
+    for column in COLUMNS:
+        for (path,) in db.session.query(column).distinct():
+            if path and new_key(path) is not None:
+                paths.add(path)
+    return sorted(paths)
+
+
+def move(path, key, media_root=None):
+    # Devuelve "moved", "existing" (el destino ya estaba) o "missing"
+    source = os.path.join(media_root or Config.MEDIA_ROOT, path)
+    if storage.media.exists(key):
+        if os.path.isfile(source):
+            os.remove(source)
+        return "existing"
+    if not os.path.isfile(source):
+        return "missing"
+    storage.media.put_file(key, source)
+    return "moved"
+
+
+def rewrite(path, key):
+    for column in COLUMNS:
+        db.session.query(column.class_).filter(column == path).update(
+            {column: key}, synchronize_session=False
+        )
+
+
+def migrate(dry_run=False, batch_size=200, media_root=None):
+    # Genera (ruta, clave, estado) por cada ruta plana encontrada
+    done = 0
+    for path in legacy_paths():
+        key = new_key(path)
+        if dry_run:
+            yield path, key, "pending"
+            continue
+
+        status = move(path, key, media_root)
+        # Sin archivo no se toca la fila: el registro queda como estaba
+        if status != "missing":
+            rewrite(path, key)
+            done += 1
+            if done % batch_size == 0:
+                db.session.commit()
+        yield path, key, status
+
+    if not dry_run:
+        db.session.commit()
@@ -0,0 +1,236 @@
+# app/services/metrics.py
+#
+# Métricas en formato de texto de Prometheus (GET /metrics), sin dependencias.
+# Registrar una observación cuesta un bisect y una suma bajo un lock, así que
+# quedan activas en producción.
+#
+# - prediction_stage_seconds{stage}: cada etapa del pipeline (metrics.stage)
+# - http_request_duration_seconds{endpoint,method,status}
+# - http_request_sql_queries{endpoint}: sentencias SQL por request
+# - sql_query_duration_seconds{endpoint}: duración de cada sentencia
+# - db_pool_checkout_wait_seconds{bind}: espera por una conexión del pool
+# - db_pool_connections{bind,state}: conexiones en uso / libres / overflow
+#
+# Con SERVER_TIMING_HEADER = True cada respuesta trae además la cabecera
+# Server-Timing con las etapas de ese request (visible en las DevTools).
+#
+# Cada proceso lleva sus propias métricas: con varios workers Prometheus
+# debe scrapear cada uno. En modo sidecar las etapas del modelo (densenet,
+# xgboost, ...) se registran en el proceso del servidor de modelos.
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.services.query_counter import current_count
+
+# Segundos: de 1 ms a 10 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # valores de las etiquetas -> [conteo por bucket, suma]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *labels):
+        # Cuenta solo en el bucket propio; se acumulan al exportar
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self):
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, counts, total in sorted(snapshot):
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                bucket_labels = ",".join(pairs + [f'le="{_format(bound)}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            series_labels = "{" + ",".join(pairs) + "}" if pairs else ""
+            lines.append(f"{self.name}_sum{series_labels} {_format(total)}")
+            lines.append(f"{self.name}_count{series_labels} {cumulative}")
+        return lines
+
+
+# Valor leído al exportar: fn() devuelve {(valores de etiquetas): valor}
+class Gauge:
+
+    def __init__(self, name, documentation, labelnames, fn):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        REGISTRY.append(self)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(self.fn().items()):
+            pairs = ",".join(f'{name}="{_escape(v)}"' for name, v in zip(self.labelnames, labels))
+            lines.append(f"{self.name}{{{pairs}}} {_format(value)}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "prediction_stage_seconds", "Duración de cada etapa del pipeline de predicción.", ("stage",)
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Duración de los requests HTTP.", ("endpoint", "method", "status")
+)
+REQUEST_SQL_QUERIES = Histogram(
+    "http_request_sql_queries", "Sentencias SQL por request.", ("endpoint",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+)
+SQL_SECONDS = Histogram(
+    "sql_query_duration_seconds", "Duración de cada sentencia SQL.", ("endpoint",),
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+
+
+POOL_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds", "Espera para obtener una conexión del pool.", ("bind",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+
+
+def observe_pool_wait(bind, elapsed):
+    POOL_WAIT_SECONDS.observe(elapsed, bind)
+    _record("db_pool_wait", elapsed)
+
+
+_POOLS = {}  # bind -> Engine, lo carga watch_pools
+
+
+def _pool_state():
+    # Solo los QueuePool llevan contadores (SQLite usa NullPool/StaticPool)
+    values = {}
+    for bind, engine in _POOLS.items():
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            continue
+        values[(bind, "checked_out")] = pool.checkedout()
+        values[(bind, "idle")] = pool.checkedin()
+        values[(bind, "overflow")] = max(pool.overflow(), 0)
+    return values
+
+
+POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Conexiones del pool por estado.", ("bind", "state"), _pool_state
+)
+
+
+def watch_pools(engines):
+    # engines: {"primary": Engine, "replica": Engine}
+    _POOLS.clear()
+    _POOLS.update(engines)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+def _endpoint():
+    # Sin regla (404) se agrupa en "unmatched": las URLs no son etiquetas
+    return request.endpoint or "unmatched"
+
+
+def _record(name, elapsed):
+    if has_request_context():
+        g.setdefault("server_timing", []).append((name, elapsed))
+
+
+@contextmanager
+def stage(name):
+    # Uso: with metrics.stage("db_commit"): ...
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, name)
+        _record(name, elapsed)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_query(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_metrics_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    if has_request_context():
+        SQL_SECONDS.observe(elapsed, _endpoint())
+        g.sql_seconds = g.get("sql_seconds", 0.0) + elapsed
+    else:
+        SQL_SECONDS.observe(elapsed, "-")
+
+
+def server_timing():
+    # Etapas repetidas (p. ej. en /predict/batch) se suman
+    totals = {}
+    for name, elapsed in g.get("server_timing", ()):
+        totals[name] = totals.get(name, 0.0) + elapsed
+
+    entries = [f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in totals.items()]
+    entries.append(f'sql;desc="{current_count()} queries";dur={g.get("sql_seconds", 0.0) * 1000:.1f}')
+    entries.append(f"total;dur={(time.perf_counter() - g.request_start) * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def init_app(app):
+    @app.before_request
+    def _start_request():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        start = g.get("request_start")
+        if start is None:
+            return response
+
+        endpoint = _endpoint()
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint, request.method, str(response.status_code))
+        REQUEST_SQL_QUERIES.observe(current_count(), endpoint)
+
+        if app.config.get("SERVER_TIMING_HEADER"):
+            response.headers["Server-Timing"] = server_timing()
+        return response
@@ -0,0 +1,69 @@
+# app/services/pagination.py
+import base64
+import json
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, columns):
+    # Un cursor vacío ("?cursor=") pide la primera página en modo cursor
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Cursor inválido")
+
+    if not isinstance(values, list) or len(values) != len(columns) \
+            or not all(isinstance(v, int) for v in values):
+        raise InvalidCursor("Cursor inválido")
+    return values
+
+
+def _after(columns, values):
+    # (c1, c2, ...) < (v1, v2, ...) en orden descendente, expandido para que
+    # funcione igual en SQLite y MySQL y aproveche el índice
+    conditions = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        equal_prefix = [c == v for c, v in zip(columns[:i], values[:i])]
+        conditions.append(and_(*equal_prefix, column < value))
+    return or_(*conditions)
+
+
+def keyset_page(query, columns, token, per_page):
+    # Página descendente por `columns` (enteros; la última debe ser única, p. ej. id).
+    # Devuelve (filas, next_cursor); next_cursor es None en la última página.
+    values = decode_cursor(token, columns)
+    if values is not None:
+        query = query.filter(_after(columns, values))
+
+    rows = query.order_by(*[c.desc() for c in columns]).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+
+    return rows, next_cursor
+
+
+def cursor_page(query, columns, args, per_page):
+    # Modo cursor para los listados (?cursor=...). El total (COUNT(*)) solo se
+    # calcula con ?include_total=1
+    items, next_cursor = keyset_page(query, columns, args.get("cursor"), per_page)
+
+    meta = {"per_page": per_page, "next_cursor": next_cursor}
+    if args.get("include_total") in ("1", "true"):
+        meta["total"] = query.order_by(None).count()
+    return items, meta
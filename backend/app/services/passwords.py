@@ -0,0 +1,58 @@
+# app/services/passwords.py
+#
+# Hash y verificación de contraseñas en un pool acotado de hilos: una ráfaga
+# de logins no puede ocupar más de PASSWORD_HASH_WORKERS núcleos (hashlib
+# libera el GIL durante scrypt/pbkdf2). Con más de PASSWORD_HASH_MAX_PENDING
+# esperando se rechaza de inmediato (PasswordHashBusy -> 503).
+#
+# PASSWORD_HASH_METHOD es el método de werkzeug ("scrypt", "scrypt:16384:8:1",
+# "pbkdf2:sha256:600000", ...). Si se cambia, los hashes viejos se siguen
+# aceptando y se regeneran con el método nuevo en el próximo login.
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.config import Config
+
+_executor = ThreadPoolExecutor(max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_slots = threading.BoundedSemaphore(Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_MAX_PENDING)
+
+
+class PasswordHashBusy(Exception):
+    pass
+
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise PasswordHashBusy()
+    try:
+        future = _executor.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=Config.PASSWORD_HASH_TIMEOUT)
+    except FutureTimeout:
+        raise PasswordHashBusy()
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, Config.PASSWORD_HASH_METHOD)
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+@lru_cache(maxsize=None)
+def _method_prefix():
+    # "scrypt" -> "scrypt:32768:8:1": se obtiene de un hash real con los
+    # parámetros por defecto que aplique werkzeug
+    return generate_password_hash("", Config.PASSWORD_HASH_METHOD).split("$", 1)[0]
+
+
+def needs_rehash(password_hash):
+    return password_hash.split("$", 1)[0] != _method_prefix()
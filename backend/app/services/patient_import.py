@@ -0,0 +1,232 @@
+# app/services/patient_import.py
+#
+# Alta masiva de pacientes (POST /api/patients/bulk) desde CSV o NDJSON.
+# El body se lee línea a línea y se procesa en lotes de chunk_size filas:
+# cada lote se valida, se guarda con un INSERT masivo y un commit, y sus
+# errores se devuelven en cuanto se conocen. Ni el archivo ni el reporte se
+# arman completos en memoria.
+#
+# Con upsert, una fila cuyo dni ya existe para el doctor actualiza ese
+# paciente (nombre, edad y sexo) en lugar de crear otro.
+import codecs
+import csv
+import json
+
+from flask import current_app
+
+from app.extensions import db
+from app.models.patient import Patient
+from app.services import dashboard, metrics, stats
+
+CSV_TYPES = ("text/csv", "application/csv")
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines")
+
+REQUIRED_FIELDS = ("full_name", "age", "gender")
+GENDERS = ("M", "F", "O")
+MAX_CHUNK_SIZE = 5000
+
+# Largo de las columnas de Patient
+FULL_NAME_LENGTH = 100
+DNI_LENGTH = 20
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+# ---------- LECTURA ----------
+# Cada lector produce (línea, fila, error de formato)
+
+def _read_csv(stream):
+    lines = codecs.iterdecode(stream, "utf-8-sig")
+    reader = csv.DictReader(lines)
+    try:
+        header = reader.fieldnames
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ImportFormatError(f"CSV inválido: {e}")
+    if not header:
+        raise ImportFormatError("El CSV está vacío")
+
+    missing = [field for field in REQUIRED_FIELDS if field not in header]
+    if missing:
+        raise ImportFormatError(f"Faltan columnas en el CSV: {', '.join(missing)}")
+
+    def rows():
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except (csv.Error, UnicodeDecodeError) as e:
+                # El lector no puede seguir después de un error de formato
+                yield reader.line_num, None, f"CSV inválido, se detiene la importación: {e}"
+                return
+            yield reader.line_num, row, None
+
+    return rows()
+
+
+def _read_ndjson(stream):
+    def rows():
+        for number, raw in enumerate(stream, start=1):
+            try:
+                line = raw.decode("utf-8-sig").strip()
+            except UnicodeDecodeError:
+                yield number, None, "La línea no es UTF-8"
+                continue
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield number, None, "JSON inválido"
+                continue
+            if not isinstance(row, dict):
+                yield number, None, "Cada línea debe ser un objeto JSON"
+                continue
+            yield number, row, None
+
+    return rows()
+
+
+def read_rows(stream, mimetype):
+    if mimetype in CSV_TYPES:
+        return _read_csv(stream)
+    if mimetype in NDJSON_TYPES:
+        return _read_ndjson(stream)
+    raise ImportFormatError("Formato no soportado: enviar text/csv o application/x-ndjson")
+
+
+# ---------- VALIDACIÓN ----------
+
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+
+def validate(row, doctor_id):
+    # Devuelve (valores para Patient, errores por campo)
+    errors = {}
+
+    full_name = _text(row.get("full_name"))
+    if not full_name:
+        errors["full_name"] = "Campo requerido"
+    elif len(full_name) > FULL_NAME_LENGTH:
+        errors["full_name"] = f"Máximo {FULL_NAME_LENGTH} caracteres"
+
+    age = row.get("age")
+    if isinstance(age, str):
+        age = age.strip()
+    if age is None or age == "":
+        errors["age"] = "Campo requerido"
+    else:
+        try:
+            if isinstance(age, bool) or (isinstance(age, float) and not age.is_integer()):
+                raise ValueError
+            age = int(age)
+        except (TypeError, ValueError):
+            errors["age"] = "Debe ser un número entero"
+        else:
+            if not 0 <= age <= 150:
+                errors["age"] = "Debe estar entre 0 y 150"
+
+    gender = _text(row.get("gender")).upper()
+    if not gender:
+        errors["gender"] = "Campo requerido"
+    elif gender not in GENDERS:
+        errors["gender"] = f"Debe ser uno de {', '.join(GENDERS)}"
+
+    dni = _text(row.get("dni")) or None
+    if dni and len(dni) > DNI_LENGTH:
+        errors["dni"] = f"Máximo {DNI_LENGTH} caracteres"
+
+    if errors:
+        return None, errors
+    return {"doctor_id": doctor_id, "full_name": full_name, "dni": dni, "age": age, "gender": gender}, None
+
+
+# ---------- ESCRITURA ----------
+
+def _existing_by_dni(doctor_id, dnis):
+    # Si el doctor ya tiene el dni repetido se actualiza el paciente más antiguo
+    existing = {}
+    rows = db.session.query(Patient.id, Patient.dni, Patient.age, Patient.gender).filter(
+        Patient.doctor_id == doctor_id, Patient.dni.in_(dnis)
+    ).order_by(Patient.id.desc())
+    for patient_id, dni, age, gender in rows:
+        existing[dni] = {"id": patient_id, "doctor_id": doctor_id, "age": age, "gender": gender}
+    return existing
+
+
+def save_chunk(doctor_id, chunk, upsert):
+    # chunk: [(línea, valores)]; devuelve (insertados, actualizados)
+    inserts, updates, replaced = [], [], []
+    existing = _existing_by_dni(doctor_id, [v["dni"] for _, v in chunk if v["dni"]]) if upsert else {}
+
+    for _, values in chunk:
+        previous = existing.get(values["dni"]) if values["dni"] else None
+        if previous is None:
+            inserts.append(values)
+        else:
+            updates.append({"id": previous["id"], **values})
+            replaced.append(previous)
+
+    db.session.bulk_insert_mappings(Patient, inserts)
+    db.session.bulk_update_mappings(Patient, updates)
+    # Las escrituras masivas no disparan los listeners de stats ni del dashboard
+    stats.apply_deltas(db.session.connection(), *stats.patient_rows_deltas(inserts + updates, replaced))
+    with metrics.stage("db_commit"):
+        db.session.commit()
+    dashboard.invalidate(doctor_id)
+    return len(inserts), len(updates)
+
+
+def import_patients(rows, doctor_id, chunk_size, upsert=False):
+    # Genera el reporte: un objeto por fila rechazada, uno de progreso por lote
+    # y uno final con los totales
+    doctor_id = int(doctor_id)
+    totals = {"total": 0, "inserted": 0, "updated": 0, "failed": 0}
+    chunk = []
+    chunk_dnis = set()
+
+    def flush():
+        try:
+            inserted, updated = save_chunk(doctor_id, chunk, upsert)
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Error guardando pacientes")
+            totals["failed"] += len(chunk)
+            for line, _ in chunk:
+                yield {"line": line, "error": "No se pudo guardar el lote de esta fila"}
+        else:
+            totals["inserted"] += inserted
+            totals["updated"] += updated
+        chunk.clear()
+        chunk_dnis.clear()
+        yield {"status": "progress", **totals}
+
+    for line, row, error in rows:
+        totals["total"] += 1
+        if error is not None:
+            totals["failed"] += 1
+            yield {"line": line, "error": error}
+            continue
+
+        values, errors = validate(row, doctor_id)
+        if errors:
+            totals["failed"] += 1
+            yield {"line": line, "errors": errors}
+            continue
+
+        # Con upsert, un dni repetido dentro del lote pasa al lote siguiente:
+        # así la segunda aparición actualiza la fila recién insertada
+        if upsert and values["dni"] in chunk_dnis:
+            yield from flush()
+        chunk.append((line, values))
+        if values["dni"]:
+            chunk_dnis.add(values["dni"])
+        if len(chunk) >= chunk_size:
+            yield from flush()
+
+    if chunk:
+        yield from flush()
+    yield {"status": "done", **totals}
@@ -0,0 +1,61 @@
+# app/services/prediction_cache.py
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.prediction_cache import PredictionCache
+from app.services import heatmaps, storage
+from app.services.cache import TTLCache
+
+# Primer nivel en memoria (LRU sin vencimiento: el resultado de un contenido
+# para una versión de modelo no cambia); segundo nivel en la tabla prediction_cache
+memory = TTLCache(ttl=None)
+
+
+def init_app(app):
+    memory.max_size = app.config.get("PREDICTION_CACHE_SIZE", 4096)
+
+
+def lookup(content_hash, model_version):
+    # Devuelve {result, confidence, image_path, heatmap_path} o None
+    key = (content_hash, model_version)
+    entry = memory.get(key)
+
+    if entry is None:
+        row = db.session.get(PredictionCache, key)
+        if row is None:
+            return None
+        entry = {
+            "result": row.result,
+            "confidence": float(row.confidence) if row.confidence is not None else None,
+            "image_path": row.image_path,
+            "heatmap_path": row.heatmap_path
+        }
+
+    # Si el heatmap ya no está guardado (y no es uno diferido que se pueda
+    # generar), se vuelve a calcular
+    heatmap_path = entry["heatmap_path"]
+    if not storage.media.exists(heatmap_path) and not heatmaps.is_pending(heatmap_path):
+        memory.invalidate(key)
+        return None
+
+    memory.set(key, entry)
+    return entry
+
+
+def store(content_hash, model_version, result, confidence, image_path, heatmap_path):
+    # Se agrega a la transacción en curso; si otro request guardó el mismo
+    # contenido a la vez, el SAVEPOINT evita que falle el diagnóstico
+    entry = {
+        "result": result,
+        "confidence": confidence,
+        "image_path": image_path,
+        "heatmap_path": heatmap_path
+    }
+    try:
+        with db.session.begin_nested():
+            db.session.add(PredictionCache(
+                content_hash=content_hash, model_version=model_version, **entry
+            ))
+    except IntegrityError:
+        pass
+    memory.set((content_hash, model_version), entry)
@@ -0,0 +1,54 @@
+# app/services/query_counter.py
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Cuenta las sentencias SQL ejecutadas durante cada request (g.sql_query_count).
+# Con SQL_QUERY_COUNT_HEADER = True se devuelve en la cabecera X-SQL-Queries.
+# Si g.sql_statements es una lista, además se guardan (statement, parameters).
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g.sql_query_count = g.get("sql_query_count", 0) + 1
+        statements = g.get("sql_statements")
+        if statements is not None:
+            statements.append((statement, parameters))
+
+
+def current_count():
+    return g.get("sql_query_count", 0)
+
+
+@contextmanager
+def count_queries():
+    # Uso (pruebas): with count_queries() as counter: client.get(...)
+    # counter["count"] y counter["statements"] incluyen toda sentencia
+    # ejecutada dentro del bloque, en cualquier app context
+    counter = {"count": 0, "statements": []}
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counter["count"] += 1
+        counter["statements"].append(statement)
+
+    event.listen(Engine, "before_cursor_execute", count)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, "before_cursor_execute", count)
+
+
+def init_app(app):
+    @app.before_request
+    def _start_statement_capture():
+        # Solo para diagnóstico (p. ej. `flask plans check`)
+        if app.config.get("SQL_CAPTURE_STATEMENTS"):
+            g.sql_statements = []
+
+    @app.after_request
+    def _query_count_header(response):
+        if app.config.get("SQL_QUERY_COUNT_HEADER"):
+            response.headers["X-SQL-Queries"] = str(current_count())
+        return response
@@ -0,0 +1,99 @@
+# app/services/query_plans.py
+from flask import g, request_finished
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.services import dashboard
+
+# Endpoints de lectura cuyo SQL se revisa ({patient_id} se reemplaza)
+ENDPOINTS = [
+    "/api/dashboard/summary",
+    "/api/patients/",
+    "/api/patients/?cursor=",
+    "/api/diagnoses/",
+    "/api/diagnoses/?cursor=",
+    "/api/diagnoses/?patient_id={patient_id}",
+    "/api/diagnoses/?result=COVID",
+    "/api/diagnoses/patient/{patient_id}",
+    "/api/diagnoses/patient/{patient_id}?cursor=",
+]
+
+
+def _explain(statement, parameters):
+    # Devuelve [(detalle, es_full_scan)] según el dialecto
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+
+    if dialect == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        plan = []
+        for row in rows:
+            detail = row[-1]
+            # "SCAN tabla" sin índice es recorrer la tabla completa
+            full_scan = detail.startswith("SCAN") and "INDEX" not in detail
+            plan.append((detail, full_scan))
+        return plan
+
+    if dialect == "mysql":
+        result = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        keys = list(result.keys())
+        plan = []
+        for row in result.fetchall():
+            row = dict(zip(keys, row))
+            detail = f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']}"
+            plan.append((detail, row["type"] == "ALL"))
+        return plan
+
+    raise RuntimeError(f"Dialecto no soportado: {dialect}")
+
+
+def check_endpoints(app, doctor_id=None):
+    # Ejecuta cada endpoint con el test client, captura su SQL y lo pasa por
+    # EXPLAIN. Devuelve [(url, statement, plan)]. Si algún endpoint no responde
+    # 200 el reporte no sirve (solo tendría la consulta del JWT): RuntimeError.
+    with app.app_context():
+        doctor = db.session.get(Doctor, doctor_id) if doctor_id else Doctor.query.first()
+        if doctor is None:
+            raise RuntimeError("No hay doctores en la base")
+        doctor_id = doctor.id
+        patient = Patient.query.filter_by(doctor_id=doctor_id).first()
+        token = create_access_token(identity=str(doctor_id))
+
+    captured = []
+
+    def _capture(sender, response, **extra):
+        captured.extend(g.get("sql_statements") or [])
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    report = []
+    failures = []
+
+    app.config["SQL_CAPTURE_STATEMENTS"] = True
+    try:
+        with request_finished.connected_to(_capture, app):
+            for endpoint in ENDPOINTS:
+                url = endpoint.format(patient_id=patient.id if patient else 0)
+                # Con el resumen en caché el dashboard no ejecuta SQL
+                dashboard.summary_cache.clear()
+                captured.clear()
+                response = client.get(url, headers=headers)
+                if response.status_code != 200:
+                    failures.append(f"{url}: HTTP {response.status_code} {response.get_data(as_text=True).strip()[:200]}")
+                    continue
+
+                with app.app_context():
+                    for statement, parameters in list(captured):
+                        if statement.lstrip().upper().startswith("SELECT"):
+                            report.append((url, statement, _explain(statement, parameters)))
+    finally:
+        app.config["SQL_CAPTURE_STATEMENTS"] = False
+
+    if failures:
+        raise RuntimeError(
+            f"Doctor {doctor_id}: endpoints sin respuesta 200, el reporte estaría incompleto\n  "
+            + "\n  ".join(failures)
+        )
+    return report
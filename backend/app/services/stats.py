@@ -0,0 +1,282 @@
+# app/services/stats.py
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, event, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from app.extensions import db
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.diagnosis import Diagnosis
+from app.models.doctor_stats import DoctorStats, DoctorDailyStats
+
+GENDER_COLUMNS = {"M": "male_patients", "F": "female_patients", "O": "other_patients"}
+RESULT_COLUMNS = {"COVID": "covid_positive", "NORMAL": "covid_negative"}
+
+STATS_COLUMNS = [
+    "total_patients", "male_patients", "female_patients", "other_patients",
+    "age_sum", "age_count", "total_diagnoses", "covid_positive", "covid_negative"
+]
+
+
+def today():
+    # Mismo criterio que el dashboard original: fechas en UTC
+    return datetime.utcnow().date()
+
+
+# ---------- DELTAS ----------
+
+def _patient_delta(delta, gender, age, sign):
+    delta["total_patients"] += sign
+    if gender in GENDER_COLUMNS:
+        delta[GENDER_COLUMNS[gender]] += sign
+    if age is not None and age != "":
+        delta["age_sum"] += sign * int(age)
+        delta["age_count"] += sign
+
+
+def _diagnosis_delta(delta, result, sign):
+    delta["total_diagnoses"] += sign
+    if result in RESULT_COLUMNS:
+        delta[RESULT_COLUMNS[result]] += sign
+
+
+def _created_day(obj):
+    # created_at lo pone la BD (server_default); no se recarga dentro del flush
+    created_at = obj.__dict__.get("created_at")
+    return created_at.date() if created_at else today()
+
+
+def _old_value(obj, attr):
+    history = get_history(obj, attr)
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+
+def collect_deltas(new, dirty, deleted):
+    stats = defaultdict(Counter)
+    daily = Counter()
+
+    for obj in new:
+        if isinstance(obj, Patient):
+            _patient_delta(stats[obj.doctor_id], obj.gender, obj.age, +1)
+        elif isinstance(obj, Diagnosis):
+            _diagnosis_delta(stats[obj.doctor_id], obj.result, +1)
+            daily[(obj.doctor_id, _created_day(obj))] += 1
+
+    for obj in dirty:
+        if isinstance(obj, Patient):
+            _patient_delta(stats[obj.doctor_id], _old_value(obj, "gender"), _old_value(obj, "age"), -1)
+            _patient_delta(stats[obj.doctor_id], obj.gender, obj.age, +1)
+        elif isinstance(obj, Diagnosis):
+            _diagnosis_delta(stats[obj.doctor_id], _old_value(obj, "result"), -1)
+            _diagnosis_delta(stats[obj.doctor_id], obj.result, +1)
+
+    for obj in deleted:
+        if isinstance(obj, Patient):
+            _patient_delta(stats[obj.doctor_id], _old_value(obj, "gender"), _old_value(obj, "age"), -1)
+        elif isinstance(obj, Diagnosis):
+            _diagnosis_delta(stats[obj.doctor_id], _old_value(obj, "result"), -1)
+            daily[(obj.doctor_id, _created_day(obj))] -= 1
+
+    return stats, daily
+
+
+def diagnosis_rows_deltas(rows):
+    # Para escrituras masivas (bulk_insert_mappings) que no disparan eventos ORM
+    stats = defaultdict(Counter)
+    daily = Counter()
+    for row in rows:
+        _diagnosis_delta(stats[row["doctor_id"]], row["result"], +1)
+        daily[(row["doctor_id"], today())] += 1
+    return stats, daily
+
+
+def patient_rows_deltas(rows, replaced=()):
+    # Idem para pacientes: rows entran (+1), replaced son los valores previos
+    # de las filas actualizadas (-1)
+    stats = defaultdict(Counter)
+    for row in rows:
+        _patient_delta(stats[row["doctor_id"]], row["gender"], row["age"], +1)
+    for row in replaced:
+        _patient_delta(stats[row["doctor_id"]], row["gender"], row["age"], -1)
+    return stats, Counter()
+
+
+def _increment(connection, table, key, increments):
+    # INSERT de la fila con los deltas o, si ya existe, UPDATE col = col + delta
+    # en una sola sentencia: dos transacciones que crean la misma fila a la vez
+    # (primer diagnóstico del día) no chocan en la clave primaria
+    row = {**key, **increments}
+    values = {col: table.c[col] + d for col, d in increments.items() if d}
+    dialect = connection.dialect.name
+
+    if dialect == "mysql":
+        connection.execute(mysql_insert(table).values(**row).on_duplicate_key_update(**values))
+    elif dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        connection.execute(insert(table).values(**row).on_conflict_do_update(
+            index_elements=list(key), set_=values
+        ))
+    else:
+        # Sin upsert nativo: el INSERT va en un SAVEPOINT y si otra transacción
+        # creó la fila primero se reintenta el UPDATE
+        where = and_(*(table.c[col] == value for col, value in key.items()))
+        if connection.execute(table.update().where(where).values(**values)).rowcount:
+            return
+        try:
+            with connection.begin_nested():
+                connection.execute(table.insert().values(**row))
+        except IntegrityError:
+            connection.execute(table.update().where(where).values(**values))
+
+
+def apply_deltas(connection, stats, daily):
+    # col = col + delta es atómico en la BD: no se pierden incrementos entre
+    # transacciones concurrentes
+    table = DoctorStats.__table__
+    for doctor_id, delta in stats.items():
+        if not any(delta.values()):
+            continue
+        increments = {col: delta.get(col, 0) for col in STATS_COLUMNS}
+        _increment(connection, table, {"doctor_id": int(doctor_id)}, increments)
+
+    table = DoctorDailyStats.__table__
+    for (doctor_id, day), count in daily.items():
+        if not count:
+            continue
+        _increment(connection, table, {"doctor_id": int(doctor_id), "day": day}, {"diagnoses": count})
+
+
+# ---------- MANTENIMIENTO INCREMENTAL ----------
+# after_flush todavía ve new/dirty/deleted y el historial de atributos previos
+# al flush, y corre dentro de la misma transacción que el commit del endpoint.
+
+@event.listens_for(Session, "after_flush")
+def _update_stats(session, flush_context):
+    stats, daily = collect_deltas(session.new, session.dirty, session.deleted)
+
+    # Fila vacía para doctores recién registrados
+    connection = session.connection()
+    for obj in session.new:
+        if isinstance(obj, Doctor):
+            connection.execute(DoctorStats.__table__.insert().values(
+                doctor_id=obj.id, **{col: 0 for col in STATS_COLUMNS}
+            ))
+
+    if stats or daily:
+        apply_deltas(connection, stats, daily)
+
+
+# ---------- LECTURA ----------
+
+def read_summary(doctor_id):
+    # Una fila + a lo sumo 7 buckets, sin importar el volumen histórico.
+    # recent_diagnoses cuenta por días calendario UTC (hoy y los 6 anteriores),
+    # no una ventana móvil de 7x24 h desde ahora como la consulta anterior:
+    # al comienzo del día UTC incluye menos horas del día más viejo
+    stats = db.session.get(DoctorStats, int(doctor_id))
+    counts = {col: getattr(stats, col) if stats else 0 for col in STATS_COLUMNS}
+
+    recent = db.session.query(func.coalesce(func.sum(DoctorDailyStats.diagnoses), 0)).filter(
+        DoctorDailyStats.doctor_id == doctor_id,
+        DoctorDailyStats.day > today() - timedelta(days=7)
+    ).scalar()
+
+    counts["recent_diagnoses"] = int(recent)
+    return counts
+
+
+# ---------- RECONSTRUCCIÓN Y VERIFICACIÓN ----------
+
+def recount():
+    # Recuento completo desde patients/diagnoses: {doctor_id: counts}, {(doctor_id, day): n}
+    stats = defaultdict(lambda: {col: 0 for col in STATS_COLUMNS})
+
+    patient_rows = db.session.query(
+        Patient.doctor_id, Patient.gender,
+        func.count(Patient.id), func.coalesce(func.sum(Patient.age), 0), func.count(Patient.age)
+    ).group_by(Patient.doctor_id, Patient.gender).all()
+
+    for doctor_id, gender, count, age_sum, age_count in patient_rows:
+        counts = stats[doctor_id]
+        counts["total_patients"] += count
+        if gender in GENDER_COLUMNS:
+            counts[GENDER_COLUMNS[gender]] += count
+        counts["age_sum"] += int(age_sum)
+        counts["age_count"] += age_count
+
+    diagnosis_rows = db.session.query(
+        Diagnosis.doctor_id, Diagnosis.result, func.count(Diagnosis.id)
+    ).group_by(Diagnosis.doctor_id, Diagnosis.result).all()
+
+    for doctor_id, result, count in diagnosis_rows:
+        counts = stats[doctor_id]
+        counts["total_diagnoses"] += count
+        if result in RESULT_COLUMNS:
+            counts[RESULT_COLUMNS[result]] += count
+
+    for (doctor_id,) in db.session.query(Doctor.id).all():
+        stats[doctor_id]
+
+    day = func.date(Diagnosis.created_at)
+    daily = {}
+    for doctor_id, bucket, count in db.session.query(
+            Diagnosis.doctor_id, day, func.count(Diagnosis.id)
+    ).filter(Diagnosis.created_at.isnot(None)).group_by(Diagnosis.doctor_id, day).all():
+        if isinstance(bucket, str):
+            bucket = datetime.strptime(bucket, "%Y-%m-%d").date()
+        daily[(doctor_id, bucket)] = count
+
+    return dict(stats), daily
+
+
+def rebuild():
+    DoctorStats.__table__.create(db.engine, checkfirst=True)
+    DoctorDailyStats.__table__.create(db.engine, checkfirst=True)
+
+    stats, daily = recount()
+
+    db.session.query(DoctorDailyStats).delete()
+    db.session.query(DoctorStats).delete()
+    db.session.bulk_insert_mappings(DoctorStats, [
+        {"doctor_id": doctor_id, **counts} for doctor_id, counts in stats.items()
+    ])
+    db.session.bulk_insert_mappings(DoctorDailyStats, [
+        {"doctor_id": doctor_id, "day": day, "diagnoses": count}
+        for (doctor_id, day), count in daily.items()
+    ])
+    db.session.commit()
+    return len(stats), len(daily)
+
+
+def check():
+    # Devuelve una lista de diferencias (vacía si la tabla está consistente)
+    expected_stats, expected_daily = recount()
+    problems = []
+
+    stored = {row.doctor_id: row for row in DoctorStats.query.all()}
+    for doctor_id, counts in expected_stats.items():
+        row = stored.pop(doctor_id, None)
+        for col in STATS_COLUMNS:
+            actual = getattr(row, col) if row else None
+            if actual != counts[col]:
+                problems.append(f"doctor {doctor_id}: {col} = {actual}, esperado {counts[col]}")
+    for doctor_id in stored:
+        problems.append(f"doctor {doctor_id}: fila sobrante en doctor_stats")
+
+    stored_daily = {(row.doctor_id, row.day): row.diagnoses for row in DoctorDailyStats.query.all()}
+    for key in set(expected_daily) | set(stored_daily):
+        expected = expected_daily.get(key, 0)
+        actual = stored_daily.get(key, 0)
+        if expected != actual:
+            problems.append(f"doctor {key[0]} día {key[1]}: diagnoses = {actual}, esperado {expected}")
+
+    return problems
@@ -0,0 +1,182 @@
+# app/services/storage.py
+#
+# Almacenamiento de media (radiografías, heatmaps, miniaturas). Las claves son
+# rutas relativas a /media ("uploads/x-ray/ab/cd/abcd...png") y son lo que se
+# guarda en Diagnosis.image_path / heatmap_path. Los archivos se reparten en
+# subcarpetas por los primeros caracteres del nombre (hash o uuid), así
+# ninguna carpeta llega a cientos de miles de entradas.
+#
+# STORAGE_BACKEND = "local" (MEDIA_ROOT en disco) o "s3" (S3 o compatible,
+# p. ej. MinIO con STORAGE_S3_ENDPOINT_URL).
+import os
+import shutil
+import tempfile
+
+from werkzeug.security import safe_join
+
+from app.config import Config
+
+UPLOAD_PREFIX = "uploads/x-ray"
+HEATMAP_PREFIX = "heatmap"
+
+
+def shard(filename):
+    # abcd1234.png -> ab/cd/abcd1234.png
+    return f"{filename[:2]}/{filename[2:4]}/{filename}"
+
+
+def upload_key(filename):
+    return f"{UPLOAD_PREFIX}/{shard(filename)}"
+
+
+def heatmap_key(filename):
+    return f"{HEATMAP_PREFIX}/{shard(filename)}"
+
+
+def write_atomic(path, data):
+    # Temporal en la misma carpeta + rename: nunca se lee un archivo a medias
+    fd, part_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(part_path, path)
+
+
+class LocalStorage:
+
+    def __init__(self, root):
+        self.root = root
+        # Temporales dentro de la raíz: os.replace al destino es atómico
+        self.tmp_dir = os.path.join(root, ".tmp")
+
+    def path(self, key):
+        path = safe_join(self.root, key)
+        if path is None:
+            raise KeyError(key)
+        return path
+
+    def local_path(self, key):
+        return self.path(key)
+
+    def exists(self, key):
+        try:
+            return os.path.isfile(self.path(key))
+        except KeyError:
+            return False
+
+    def read(self, key):
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    def write(self, key, data):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, data)
+
+    def put_file(self, key, source_path):
+        # Mueve un archivo local (temporal del upload) a su clave
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(source_path, path)
+        except OSError:
+            # Otro sistema de archivos: copia a temporal + rename
+            part_path = f"{path}.{os.getpid()}.part"
+            shutil.copyfile(source_path, part_path)
+            os.replace(part_path, path)
+            os.remove(source_path)
+
+    def copy(self, source_key, key):
+        self.write(key, self.read(source_key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except (KeyError, FileNotFoundError):
+            pass
+
+    def url(self, key):
+        # Lo sirve /media directamente
+        return None
+
+
+class S3Storage:
+
+    def __init__(self, bucket, prefix="", client=None, url_expires=3600, **client_options):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.url_expires = url_expires
+        self.tmp_dir = tempfile.gettempdir()
+        if client is None:
+            # boto3 solo hace falta con este backend
+            import boto3
+            client = boto3.client("s3", **{k: v for k, v in client_options.items() if v})
+        self.client = client
+
+    def _object(self, key):
+        if ".." in key.split("/"):
+            raise KeyError(key)
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def local_path(self, key):
+        return None
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object(key))
+            return True
+        except Exception as e:
+            # botocore.exceptions.ClientError con 404 (o NoSuchKey)
+            if _status(e) in (403, 404):
+                return False
+            raise
+
+    def read(self, key):
+        response = self.client.get_object(Bucket=self.bucket, Key=self._object(key))
+        return response["Body"].read()
+
+    def write(self, key, data):
+        # Un PUT en S3 es atómico: el objeto aparece completo o no aparece
+        self.client.put_object(Bucket=self.bucket, Key=self._object(key), Body=data)
+
+    def put_file(self, key, source_path):
+        self.client.upload_file(source_path, self.bucket, self._object(key))
+        os.remove(source_path)
+
+    def copy(self, source_key, key):
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=self._object(key),
+            CopySource={"Bucket": self.bucket, "Key": self._object(source_key)}
+        )
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object(key))
+
+    def url(self, key):
+        # URL firmada: S3/MinIO resuelven Range y peticiones condicionales
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._object(key)},
+            ExpiresIn=self.url_expires
+        )
+
+
+def _status(error):
+    response = getattr(error, "response", None) or {}
+    return response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+
+
+def create_storage(config=Config):
+    if config.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            config.STORAGE_S3_BUCKET,
+            prefix=config.STORAGE_S3_PREFIX,
+            url_expires=config.STORAGE_S3_URL_EXPIRES,
+            endpoint_url=config.STORAGE_S3_ENDPOINT_URL,
+            region_name=config.STORAGE_S3_REGION
+        )
+    return LocalStorage(config.MEDIA_ROOT)
+
+
+# Backend en uso en todo el proceso
+media = create_storage()
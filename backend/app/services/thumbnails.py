@@ -0,0 +1,55 @@
+# app/services/thumbnails.py
+import os
+
+from flask import current_app
+
+from app.config import Config
+from app.services import storage
+from app.services.cache import TTLCache
+
+THUMB_DIR = "thumbs"
+
+# Originales que no se pudieron decodificar: los nombres son por contenido, así
+# que no cambian y no vale la pena reintentar en cada request
+unreadable = TTLCache(ttl=None, max_size=1024)
+
+
+def thumbnail_key(key):
+    # <clave> -> thumbs/<clave sin extensión>_<lado>.jpg
+    stem = os.path.splitext(key)[0]
+    return f"{THUMB_DIR}/{stem}_{Config.MEDIA_THUMB_SIZE}.jpg"
+
+
+def ensure(key):
+    # Devuelve la clave de la miniatura, generándola la primera vez; None si
+    # el original no existe o no es una imagen legible
+    if unreadable.get(key) or not storage.media.exists(key):
+        return None
+
+    thumb_key = thumbnail_key(key)
+    if not storage.media.exists(thumb_key):
+        try:
+            data = render(storage.media.read(key))
+        except ValueError:
+            current_app.logger.warning("No se pudo generar la miniatura de %s", key)
+            unreadable.set(key, True)
+            return None
+        storage.media.write(thumb_key, data)
+    return thumb_key
+
+
+def render(data):
+    import cv2
+    from app.ml import gradcam_overlay
+
+    img = gradcam_overlay.decode(data)
+
+    height, width = img.shape[:2]
+    scale = Config.MEDIA_THUMB_SIZE / max(height, width)
+    if scale < 1:
+        img = cv2.resize(img, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+    ok, buffer = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, Config.MEDIA_THUMB_QUALITY])
+    if not ok:
+        raise ValueError("No se pudo generar la miniatura")
+    return buffer.tobytes()
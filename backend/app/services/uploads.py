@@ -0,0 +1,120 @@
+# app/services/uploads.py
+import hashlib
+import os
+import tempfile
+
+from app.services import storage
+
+CHUNK_SIZE = 64 * 1024
+
+# Firmas de los formatos aceptados y la extensión con la que se guardan
+SIGNATURES = ((b"\x89PNG\r\n\x1a\n", ".png"), (b"\xff\xd8\xff", ".jpg"))
+UPLOAD_EXTENSIONS = tuple(ext for _, ext in SIGNATURES)
+SIGNATURE_BYTES = 8
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def sniff_extension(header):
+    # Formato real según los primeros bytes, no según el nombre del archivo
+    for signature, ext in SIGNATURES:
+        if header.startswith(signature):
+            return ext
+    raise InvalidImage("El archivo no es una imagen PNG o JPEG")
+
+
+# Archivo temporal que calcula el SHA-256 a medida que se escribe, así el hash
+# sale del mismo recorrido que guarda el upload
+class HashingFile:
+
+    def __init__(self, folder):
+        self._file = tempfile.NamedTemporaryFile("wb+", dir=folder, suffix=".part", delete=False)
+        self._hash = hashlib.sha256()
+        self.name = self._file.name
+
+    def write(self, data):
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def __getattr__(self, attr):
+        # seek/read/close/etc. los resuelve el archivo real
+        return getattr(self._file, attr)
+
+
+def content_filename(digest, ext=".png"):
+    return f"{digest}{ext}"
+
+
+def find_upload(digest):
+    # Clave del upload con ese contenido (cualquier extensión), o None
+    for ext in UPLOAD_EXTENSIONS:
+        key = storage.upload_key(content_filename(digest, ext))
+        if storage.media.exists(key):
+            return key
+    return None
+
+
+def commit_upload(part_path, digest):
+    # Mueve el temporal a su clave por contenido (con la extensión de su
+    # formato real). Si el mismo contenido ya estaba guardado se reutiliza y
+    # se descarta el temporal. Devuelve (filename, created)
+    with open(part_path, "rb") as f:
+        header = f.read(SIGNATURE_BYTES)
+    try:
+        ext = sniff_extension(header)
+    except InvalidImage:
+        os.remove(part_path)
+        raise
+
+    filename = content_filename(digest, ext)
+    key = storage.upload_key(filename)
+    if storage.media.exists(key):
+        os.remove(part_path)
+        return filename, False
+    storage.media.put_file(key, part_path)
+    return filename, True
+
+
+def discard_unreferenced(keys):
+    # Los uploads van por contenido: otro request (o otra imagen del mismo
+    # batch) puede estar usando la clave que creó este. Solo se borran las que
+    # ningún diagnóstico guardado referencia; las que sigue usando el mismo
+    # request las filtra quien llama
+    keys = set(keys)
+    if not keys:
+        return
+    from app.extensions import db
+    from app.models.diagnosis import Diagnosis
+
+    referenced = {
+        key for (key,) in
+        db.session.query(Diagnosis.image_path).filter(Diagnosis.image_path.in_(keys)).distinct()
+    }
+    for key in keys - referenced:
+        storage.media.delete(key)
+
+
+def new_part():
+    # Temporal para un upload, donde el backend lo puede mover sin copiar
+    os.makedirs(storage.media.tmp_dir, exist_ok=True)
+    return HashingFile(storage.media.tmp_dir)
+
+
+def store_hashed(stream):
+    # Copia el stream por bloques calculando el hash en el camino
+    out = new_part()
+    try:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            out.write(chunk)
+    finally:
+        out.close()
+    filename, created = commit_upload(out.name, out.hexdigest())
+    return filename, out.hexdigest(), created
@@ -0,0 +1,107 @@
+# Regresión de exactitud de los backends optimizados de DenseNet169 (graph,
+# tflite) contra el baseline float32 en Keras, sobre un set etiquetado.
+#
+# El set es una carpeta con una subcarpeta por etiqueta:
+#   samples/COVID/*.png
+#   samples/NORMAL/*.png
+#
+# Uso (desde backend/):
+#   python -m benchmarks.accuracy_regression --samples data/labelled --backend graph tflite
+#
+# Cada backend se evalúa por los dos caminos de producción: "infer"
+# (clasificación + Grad-CAM, HEATMAP_MODE=eager, el de por defecto) y
+# "predict" (solo clasificación, heatmaps diferidos).
+#
+# Termina con código 1 si algún backend cambia más etiquetas que --max-flips o
+# si la probabilidad de COVID se aleja más de --tolerance puntos del baseline.
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+from app.ml import covid_predictor
+
+LABELS = ("COVID", "NORMAL")
+PATHS = ("infer", "predict")
+
+
+def load_samples(samples_dir):
+    paths, labels = [], []
+    for label in LABELS:
+        for path in sorted(glob.glob(os.path.join(samples_dir, label, "*"))):
+            if os.path.splitext(path)[1].lower() in (".png", ".jpg", ".jpeg"):
+                paths.append(path)
+                labels.append(label)
+    if not paths:
+        raise SystemExit(f"No hay imágenes en {samples_dir}/{{{','.join(LABELS)}}}/")
+    images = np.stack([covid_predictor.load_image(path) for path in paths])
+    return paths, labels, images
+
+
+def evaluate(models, path, images, batch_size):
+    run = getattr(models, path)
+
+    # Primer batch fuera de la medición (trazado del grafo, asignación de tensores)
+    run(images[:batch_size])
+
+    results = []
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        # infer devuelve además el heatmap
+        results.extend(result[:2] for result in run(images[i:i + batch_size]))
+    elapsed = time.perf_counter() - start
+
+    predicted = [label for label, _ in results]
+    # La confianza es la de la clase elegida: se lleva a P(COVID) para comparar
+    covid_prob = np.array([
+        confidence if label == "COVID" else 100 - confidence
+        for label, confidence in results
+    ])
+    return predicted, covid_prob, elapsed * 1000 / len(images)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exactitud de los backends de inferencia contra Keras float32")
+    parser.add_argument("--samples", required=True, help="Carpeta con subcarpetas COVID/ y NORMAL/")
+    parser.add_argument("--backend", nargs="+", default=["graph", "tflite"], help="Backends a comparar")
+    parser.add_argument("--path", nargs="+", choices=PATHS, default=list(PATHS), help="Caminos a evaluar")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--tolerance", type=float, default=2.0, help="Máxima diferencia de P(COVID), en puntos")
+    parser.add_argument("--max-flips", type=int, default=0, help="Etiquetas distintas al baseline permitidas")
+    args = parser.parse_args()
+
+    paths, labels, images = load_samples(args.samples)
+    print(f"{len(paths)} imágenes ({', '.join(f'{labels.count(l)} {l}' for l in LABELS)})")
+
+    # Baseline: Keras float32 sin Grad-CAM (mismas features que con Grad-CAM)
+    base_pred, base_prob, base_ms = evaluate(covid_predictor.load_local_models("keras"), "predict", images, args.batch_size)
+    base_acc = np.mean([p == l for p, l in zip(base_pred, labels)]) * 100
+    print(f"{'keras':<16} exactitud={base_acc:5.1f}%  {base_ms:7.1f} ms/imagen  (baseline)")
+
+    failed = False
+    for backend in args.backend:
+        models = covid_predictor.load_local_models(backend)
+        for path in args.path:
+            pred, prob, ms = evaluate(models, path, images, args.batch_size)
+            acc = np.mean([p == l for p, l in zip(pred, labels)]) * 100
+            flips = [image for image, p, b in zip(paths, pred, base_pred) if p != b]
+            diff = np.abs(prob - base_prob)
+
+            ok = len(flips) <= args.max_flips and diff.max() <= args.tolerance
+            failed |= not ok
+            print(
+                f"{backend + '/' + path:<16} exactitud={acc:5.1f}%  {ms:7.1f} ms/imagen  x{base_ms / ms:.1f}  "
+                f"cambios={len(flips)}  dif. media={diff.mean():.2f}  máx={diff.max():.2f}  "
+                f"{'OK' if ok else 'FUERA DE TOLERANCIA'}"
+            )
+            for image in flips:
+                print(f"    cambia etiqueta: {image}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
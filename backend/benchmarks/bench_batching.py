@@ -0,0 +1,77 @@
+# Throughput y latencia p99 de la inferencia (DenseNet + XGBoost + Grad-CAM)
+# con y sin micro-batching, a distintos niveles de concurrencia.
+#
+# Uso (desde backend/):
+#   python -m benchmarks.bench_batching --concurrency 1 4 8 16 32 --requests 64
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from app.ml import covid_predictor
+from app.ml.batcher import MicroBatcher
+from app.ml.inference_engine import IMG_SIZE
+
+
+def unbatched(img):
+    return covid_predictor.infer_batch(np.expand_dims(img, axis=0))[0]
+
+
+def run_load(predict_fn, images, concurrency):
+    latencies = []
+    lock = threading.Lock()
+    next_index = [0]
+
+    def worker():
+        while True:
+            with lock:
+                i = next_index[0]
+                next_index[0] += 1
+            if i >= len(images):
+                return
+            start = time.perf_counter()
+            predict_fn(images[i])
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed * 1000)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    return len(images) / wall, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de micro-batching")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    covid_predictor.MODELS.load()
+
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, (*IMG_SIZE, 3)).astype(np.uint8) for _ in range(args.requests)]
+
+    batcher = MicroBatcher(covid_predictor.infer_batch, args.max_batch_size, args.max_wait_ms)
+
+    # Calentamiento de ambos caminos (trazado de grafos)
+    unbatched(images[0])
+    batcher(images[0])
+
+    print(f"{'modo':<10}{'conc':>6}{'img/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for concurrency in args.concurrency:
+        for name, fn in (("single", unbatched), ("batched", batcher)):
+            throughput, p50, p99 = run_load(fn, images, concurrency)
+            print(f"{name:<10}{concurrency:>6}{throughput:>10.1f}{p50:>10.1f}{p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
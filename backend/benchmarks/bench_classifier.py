@@ -0,0 +1,80 @@
+# Latencia de la etapa XGBoost sola, por tamaño de batch: predict +
+# predict_proba del XGBClassifier pickleado (dos pasadas por los árboles)
+# contra una sola llamada a inplace_predict del booster.
+#
+# Uso (desde backend/):
+#   python -m benchmarks.bench_classifier --nthread 1 4 --runs 200
+#   python -m benchmarks.bench_classifier --features features.npy
+import argparse
+import pickle
+import statistics
+import time
+
+import numpy as np
+
+from app.config import Config
+from app.ml import covid_predictor
+
+BATCH_SIZES = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def legacy_classify(model, features):
+    # Réplica del LoadedModels.classify anterior
+    predictions = model.predict(features)
+    confidences = np.max(model.predict_proba(features), axis=1) * 100
+    return list(zip(predictions, confidences))
+
+
+def measure(fn, features, runs):
+    fn(features)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(features)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del clasificador XGBoost")
+    parser.add_argument("--features", help=".npy con features reales de DenseNet (N x 1664); por defecto aleatorias")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(BATCH_SIZES))
+    parser.add_argument("--nthread", type=int, nargs="+", default=[Config.XGB_NTHREAD])
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--skip-legacy", action="store_true", help="No medir el XGBClassifier pickleado")
+    args = parser.parse_args()
+
+    booster = covid_predictor.load_booster()
+    print(f"Modelo: {covid_predictor.booster_path()}")
+
+    if args.features:
+        pool = np.load(args.features).astype(np.float32)
+    else:
+        pool = np.random.default_rng(0).random((max(args.batch_sizes), booster.num_features()), dtype=np.float32) * 4
+    # Se repiten filas si el archivo trae menos que el batch más grande
+    pool = np.resize(pool, (max(args.batch_sizes), pool.shape[1]))
+
+    legacy_model = None
+    if not args.skip_legacy:
+        with open(covid_predictor.MODEL_PATH, "rb") as f:
+            legacy_model = pickle.load(f)
+
+    print(f"{'batch':>6} {'nthread':>8} {'legacy ms':>10} {'inplace ms':>11} {'µs/fila':>8} {'speedup':>8}")
+    for nthread in args.nthread:
+        booster.set_param({"nthread": nthread})
+        if legacy_model is not None:
+            legacy_model.get_booster().set_param({"nthread": nthread})
+
+        for batch_size in args.batch_sizes:
+            features = pool[:batch_size]
+            fast = measure(lambda x: covid_predictor.classify_features(booster, x), features, args.runs)
+            if legacy_model is None:
+                legacy, speedup = float("nan"), ""
+            else:
+                legacy = measure(lambda x: legacy_classify(legacy_model, x), features, args.runs)
+                speedup = f"x{legacy / fast:.1f}"
+            print(f"{batch_size:>6} {nthread:>8} {legacy:>10.3f} {fast:>11.3f} {fast * 1000 / batch_size:>8.1f} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Compara la latencia por request del flujo anterior (DenseNet169 + grad-model
+# reconstruidos en cada llamada, dos pasadas) contra InferenceEngine.
+#
+# Uso (desde backend/):
+#   python -m benchmarks.bench_inference --image media/uploads/x-ray/<archivo>.png --runs 5
+import argparse
+import glob
+import os
+import statistics
+import time
+
+import numpy as np
+import tensorflow as tf
+from keras.applications.densenet import DenseNet169, preprocess_input
+from keras.preprocessing.image import load_img, img_to_array
+
+from app.ml import covid_predictor
+from app.ml.inference_engine import IMG_SIZE, LAST_CONV_LAYER_NAME
+
+
+def legacy_request(image_path):
+    # Réplica del camino original de predict_image + generate_gradcam
+    models = covid_predictor.MODELS.load()
+    img = covid_predictor.load_image(image_path)
+    features = models.dnn_model.predict(np.array([img]), verbose=0)
+    models.classify(features)
+
+    img = load_img(image_path, target_size=IMG_SIZE)
+    img_array = preprocess_input(np.expand_dims(img_to_array(img), axis=0))
+
+    model = DenseNet169(
+        weights="imagenet",
+        include_top=False,
+        input_shape=(*IMG_SIZE, 3),
+        pooling="avg"
+    )
+    grad_model = tf.keras.models.Model(
+        [model.inputs],
+        [model.get_layer(LAST_CONV_LAYER_NAME).output, model.output]
+    )
+
+    with tf.GradientTape() as tape:
+        last_conv_output, preds = grad_model(img_array)
+        class_channel = preds[:, tf.argmax(preds[0])]
+
+    grads = tape.gradient(class_channel, last_conv_output)
+    pooled_grads = tf.reduce_mean(grads, axis=(0, 1, 2))
+    heatmap = tf.squeeze(last_conv_output[0] @ pooled_grads[..., tf.newaxis])
+    return (tf.maximum(heatmap, 0) / (tf.reduce_max(heatmap) + 1e-8)).numpy()
+
+
+def engine_request(image_path):
+    models = covid_predictor.MODELS.load()
+    features, heatmap = models.engine.run_single(covid_predictor.load_image(image_path))
+    models.classify(features)
+    return heatmap
+
+
+def measure(fn, image_path, runs):
+    # Primera llamada fuera de la medición (trazado de grafos, cachés)
+    fn(image_path)
+
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(image_path)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def report(name, times):
+    print(
+        f"{name:<8} media={statistics.mean(times):8.1f} ms  "
+        f"mediana={statistics.median(times):8.1f} ms  "
+        f"min={min(times):8.1f} ms  max={max(times):8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inferencia por request")
+    parser.add_argument("--image", help="Radiografía a usar (por defecto la primera de media/uploads)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    image_path = args.image or sorted(glob.glob(os.path.join("media", "uploads", "x-ray", "**", "*.png"), recursive=True))[0]
+    print(f"Imagen: {image_path}  runs={args.runs}")
+
+    legacy = measure(legacy_request, image_path, args.runs)
+    engine = measure(engine_request, image_path, args.runs)
+
+    report("legacy", legacy)
+    report("engine", engine)
+    print(f"speedup x{statistics.mean(legacy) / statistics.mean(engine):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Compara el render del Grad-CAM original (Keras/PIL + matplotlib, la imagen
+# se vuelve a leer del disco) contra app/ml/gradcam_overlay sobre radiografías
+# a resolución completa.
+#
+# Uso (desde backend/):
+#   python -m benchmarks.bench_overlay --image media/uploads/x-ray/<archivo>.png --runs 10
+#   python -m benchmarks.bench_overlay --size 2500x2048   # radiografía sintética
+import argparse
+import glob
+import os
+import statistics
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from app.ml import gradcam_overlay
+from benchmarks.common import synthetic_xray
+
+
+def legacy_save(img_path, heatmap, output_path, alpha=0.4):
+    # Réplica de save_gradcam antes del renderer vectorizado
+    import matplotlib.cm as cm
+    from tensorflow import keras
+
+    img = keras.preprocessing.image.load_img(img_path)
+    img = keras.preprocessing.image.img_to_array(img)
+
+    heatmap = np.uint8(255 * heatmap)
+    jet = cm.get_cmap("jet")
+    jet_colors = jet(np.arange(256))[:, :3]
+    jet_heatmap = jet_colors[heatmap]
+
+    jet_heatmap = keras.preprocessing.image.array_to_img(jet_heatmap)
+    jet_heatmap = jet_heatmap.resize((img.shape[1], img.shape[0]))
+    jet_heatmap = keras.preprocessing.image.img_to_array(jet_heatmap)
+
+    superimposed_img = jet_heatmap * alpha + img
+    superimposed_img = keras.preprocessing.image.array_to_img(superimposed_img)
+    superimposed_img.save(output_path)
+
+
+def measure(fn, runs):
+    fn()
+
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def report(name, times, size=None):
+    extra = f"  {size / 1024:8.0f} KB" if size is not None else ""
+    print(
+        f"{name:<14} media={statistics.mean(times):8.1f} ms  "
+        f"mediana={statistics.median(times):8.1f} ms  min={min(times):8.1f} ms{extra}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del overlay Grad-CAM")
+    parser.add_argument("--image", help="Radiografía a usar (por defecto la primera de media/uploads)")
+    parser.add_argument("--size", default="2500x2048", help="Alto x ancho de la radiografía sintética")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--skip-legacy", action="store_true", help="No medir el camino Keras/matplotlib")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    image_path = args.image or next(iter(sorted(glob.glob(os.path.join("media", "uploads", "x-ray", "**", "*.png"), recursive=True))), None)
+    if image_path is None:
+        height, width = (int(v) for v in args.size.split("x"))
+        image_path = os.path.join(tmp, "xray.png")
+        cv2.imwrite(image_path, synthetic_xray(height, width))
+
+    img = gradcam_overlay.read_image(image_path)
+    heatmap = np.random.default_rng(1).random((7, 7)).astype(np.float32)
+    print(f"Imagen: {image_path}  {img.shape[1]}x{img.shape[0]}  runs={args.runs}")
+
+    results = {}
+    if not args.skip_legacy:
+        output = os.path.join(tmp, "legacy.png")
+        results["legacy"] = measure(lambda: legacy_save(image_path, heatmap, output), args.runs)
+        report("legacy", results["legacy"], os.path.getsize(output))
+
+    # En la app la imagen ya viene decodificada de la predicción: se mide el
+    # render solo y también decodificación + render + guardado
+    report("render", measure(lambda: gradcam_overlay.render(img, heatmap), args.runs))
+
+    for fmt in gradcam_overlay.EXTENSIONS:
+        output = os.path.join(tmp, "overlay" + gradcam_overlay.extension(fmt))
+        results[fmt] = measure(
+            lambda: gradcam_overlay.save(gradcam_overlay.read_image(image_path), heatmap, output, fmt=fmt),
+            args.runs
+        )
+        report(f"overlay {fmt}", results[fmt], os.path.getsize(output))
+
+    if "legacy" in results:
+        legacy = statistics.mean(results["legacy"])
+        for fmt in gradcam_overlay.EXTENSIONS:
+            print(f"speedup {fmt:<5} x{legacy / statistics.mean(results[fmt]):.1f}")
+
+
+if __name__ == "__main__":
+    main()
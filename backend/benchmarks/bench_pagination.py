@@ -0,0 +1,107 @@
+# Latencia de la página N en /api/diagnoses/ con paginación por OFFSET vs cursor.
+#
+# Siembra (una sola vez) una base SQLite con --rows diagnósticos y consulta
+# varias páginas profundas con ambos modos a través del test client de Flask.
+#
+# Uso (desde backend/):
+#   python -m benchmarks.bench_pagination --db /tmp/bench_pagination.db --rows 1000000
+#   DATABASE_URL=mysql+pymysql://... python -m benchmarks.bench_pagination --rows 1000000
+import argparse
+import os
+import statistics
+import time
+
+
+def seed(db, rows, chunk_size=50000):
+    from app.models.doctor import Doctor
+    from app.models.patient import Patient
+    from app.models.diagnosis import Diagnosis
+
+    db.create_all()
+    existing = db.session.query(Diagnosis.id).count()
+    if existing >= rows:
+        return existing
+
+    doctor = Doctor.query.first()
+    if doctor is None:
+        doctor = Doctor(email="bench@example.com", password="-", full_name="Bench")
+        db.session.add(doctor)
+        db.session.flush()
+        patient = Patient(doctor_id=doctor.id, full_name="Paciente Bench", age=40, gender="O")
+        db.session.add(patient)
+        db.session.commit()
+    patient = Patient.query.filter_by(doctor_id=doctor.id).first()
+
+    table = Diagnosis.__table__
+    results = ["COVID", "NORMAL"]
+    for start in range(existing, rows, chunk_size):
+        db.session.execute(table.insert(), [
+            {
+                "patient_id": patient.id,
+                "doctor_id": doctor.id,
+                "image_path": f"uploads/x-ray/{i:032x}.png",
+                "heatmap_path": f"heatmap/{i:032x}.png",
+                "result": results[i % 2],
+                "confidence": 90.0
+            }
+            for i in range(start, min(start + chunk_size, rows))
+        ])
+        db.session.commit()
+        print(f"  sembradas {min(start + chunk_size, rows)} filas")
+    return rows
+
+
+def timed_get(client, url, headers, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        times.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.data
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de paginación OFFSET vs cursor")
+    parser.add_argument("--db", default="/tmp/bench_pagination.db")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 1000, 5000])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.abspath(args.db)}")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret")
+
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from app.extensions import db
+    from app.models.diagnosis import Diagnosis
+    from app.services.pagination import encode_cursor
+
+    app = create_app()
+    with app.app_context():
+        print(f"Base: {app.config['SQLALCHEMY_DATABASE_URI']}")
+        total = seed(db, args.rows)
+        max_id = db.session.query(db.func.max(Diagnosis.id)).scalar()
+        doctor_id = db.session.query(Diagnosis.doctor_id).first()[0]
+        token = create_access_token(identity=str(doctor_id))
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    print(f"{total} diagnósticos, per_page={args.per_page}")
+    print(f"{'página':>8}{'offset ms':>12}{'cursor ms':>12}")
+    for page in args.pages:
+        offset_url = f"/api/diagnoses/?page={page}&per_page={args.per_page}"
+
+        # El cursor de la página N es el id de la última fila de la página N-1
+        cursor = encode_cursor([max_id - (page - 1) * args.per_page + 1]) if page > 1 else ""
+        cursor_url = f"/api/diagnoses/?cursor={cursor}&per_page={args.per_page}"
+
+        print(f"{page:>8}{timed_get(client, offset_url, headers, args.runs):>12.1f}"
+              f"{timed_get(client, cursor_url, headers, args.runs):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Micro-benchmarks de las funciones del pipeline de predicción
+# (app/ml/covid_predictor.py) sobre radiografías sintéticas de 224x224 y a
+# resolución completa:
+#
+#   predict_image       clasificación sola (camino de HEATMAP_MODE lazy)
+#   predict_image+cam   clasificación + Grad-CAM + overlay (HEATMAP_MODE eager)
+#   generate_gradcam    solo el heatmap
+#   save_gradcam        overlay + codificación + escritura (no necesita el modelo)
+#
+# Sin TensorFlow o sin modelo cargable, las tres primeras se marcan como
+# "skipped" en el JSON.
+#
+# Uso (desde backend/):
+#   python -m benchmarks.bench_pipeline --runs 20 --output pipeline.json
+#   python -m benchmarks.bench_pipeline --sizes 224x224 3000x2500
+import argparse
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import encode_png, parse_size, setup_env, summarize, synthetic_xray, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de predict_image / generate_gradcam / save_gradcam")
+    parser.add_argument("--sizes", nargs="+", default=["224x224", "2500x2048"], help="Alto x ancho")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto stdout)")
+    args = parser.parse_args()
+
+    # Las imágenes y los heatmaps van a un storage temporal
+    setup_env(media_root=tempfile.mkdtemp(prefix="bench-media-"))
+
+    from app.ml import covid_predictor
+    from app.ml.model_loader import ModelNotReady
+    from app.services import storage
+    from benchmarks.common import measure
+
+    model_error = None
+    if not covid_predictor.MODELS_AVAILABLE:
+        model_error = "TensorFlow no disponible"
+    else:
+        try:
+            covid_predictor.MODELS.load()
+        except ModelNotReady as e:
+            model_error = f"No se pudo cargar el modelo: {e}"
+
+    heatmap = np.random.default_rng(1).random((7, 7)).astype(np.float32)
+    results = {}
+
+    for size in args.sizes:
+        height, width = parse_size(size)
+        image_key = storage.upload_key(f"bench_{height}x{width}.png")
+        heatmap_key = storage.heatmap_key(f"bench_{height}x{width}.png")
+        storage.media.write(image_key, encode_png(synthetic_xray(height, width)))
+        img = covid_predictor._read_original(image_key)
+        print(f"{size}: {args.runs} runs")
+
+        cases = {
+            "save_gradcam": lambda: covid_predictor.save_gradcam(img, heatmap, heatmap_key),
+        }
+        if model_error is None:
+            cases = {
+                "predict_image": lambda: covid_predictor.predict_image(image_key),
+                "predict_image+cam": lambda: covid_predictor.predict_image(image_key, heatmap_key),
+                "generate_gradcam": lambda: covid_predictor.generate_gradcam(image_key),
+                **cases,
+            }
+        else:
+            for name in ("predict_image", "predict_image+cam", "generate_gradcam"):
+                results[f"{name}@{size}"] = {"skipped": model_error}
+
+        for name, fn in cases.items():
+            summary = summarize(measure(fn, args.runs))
+            results[f"{name}@{size}"] = summary
+            print(f"  {name:<18} p50={summary['p50_ms']:9.2f} ms  p95={summary['p95_ms']:9.2f} ms")
+
+    if model_error:
+        print(f"Modelo: {model_error}; solo se midió save_gradcam")
+
+    write_results(args.output, "pipeline", {"sizes": args.sizes, "runs": args.runs}, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Tiempo de arranque en frío y memoria (RSS máximo) de un proceso nuevo.
+#
+#   app        -> create_app() tal como arranca ahora cada worker (modelo perezoso)
+#   app+model  -> create_app() + carga síncrona del modelo, equivalente al
+#                 comportamiento anterior (DenseNet169 y XGBoost al importar)
+#
+# Uso (desde backend/):
+#   python -m benchmarks.bench_startup --runs 3
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import json, os, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+app = create_app()
+if sys.argv[1] == "app+model":
+    from app.ml.covid_predictor import MODELS
+    MODELS.load()
+elapsed = time.perf_counter() - start
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({"seconds": elapsed, "rss_mb": rss_mb}))
+"""
+
+
+def run_child(mode):
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    env.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, mode],
+        capture_output=True, text=True, check=True, env=env
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", default=["app", "app+model"])
+    args = parser.parse_args()
+
+    print(f"{'modo':<12}{'segundos':>10}{'RSS MB':>10}")
+    for mode in args.modes:
+        results = [run_child(mode) for _ in range(args.runs)]
+        seconds = statistics.median(r["seconds"] for r in results)
+        rss = statistics.median(r["rss_mb"] for r in results)
+        print(f"{mode:<12}{seconds:>10.2f}{rss:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
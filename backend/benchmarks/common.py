@@ -0,0 +1,116 @@
+# Utilidades compartidas por los benchmarks: imágenes sintéticas, resumen de
+# latencias y salida JSON comparable entre corridas (ver benchmarks.compare).
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BENCH_SECRET_KEY = "benchmark-secret-key-benchmark-secret"
+
+
+def setup_env(db_path=None, media_root=None):
+    # Antes de importar app: Config lee el entorno al importarse
+    if db_path:
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.abspath(db_path)}")
+    os.environ.setdefault("SECRET_KEY", BENCH_SECRET_KEY)
+    if media_root:
+        os.environ.setdefault("MEDIA_ROOT", os.path.abspath(media_root))
+
+
+def synthetic_xray(height, width, seed=0):
+    # Gradiente en gris con ruido: comprime parecido a una radiografía real
+    y, x = np.mgrid[0:height, 0:width]
+    base = 128 + 60 * np.sin(x / width * np.pi) * np.cos(y / height * np.pi)
+    noise = np.random.default_rng(seed).normal(0, 12, (height, width))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def encode_png(img):
+    import cv2
+
+    ok, buffer = cv2.imencode(".png", img)
+    if not ok:
+        raise ValueError("No se pudo codificar la imagen")
+    return buffer.tobytes()
+
+
+def parse_size(text):
+    # "2500x2048" -> (2500, 2048) (alto x ancho)
+    height, width = (int(v) for v in text.lower().split("x"))
+    return height, width
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(times_ms):
+    values = sorted(times_ms)
+    if not values:
+        return {"runs": 0}
+    return {
+        "runs": len(values),
+        "mean_ms": round(statistics.mean(values), 3),
+        "p50_ms": round(statistics.median(values), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "min_ms": round(values[0], 3),
+        "max_ms": round(values[-1], 3),
+    }
+
+
+def measure(fn, runs, warmup=1):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "database": (os.environ.get("DATABASE_URL") or "").split("://")[0] or None,
+    }
+
+
+def write_results(path, benchmark, params, results):
+    # results: {nombre: summarize(...) | {...}}. Sin path se imprime en stdout
+    document = {
+        "benchmark": benchmark,
+        "environment": environment(),
+        "params": params,
+        "results": results,
+    }
+    text = json.dumps(document, indent=2, ensure_ascii=False, default=str)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Resultados en {path}")
+    else:
+        print(text)
+    return document
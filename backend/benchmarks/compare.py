@@ -0,0 +1,54 @@
+# Compara dos corridas guardadas con --output (bench_pipeline, load_test, ...)
+# y marca como regresión toda métrica cuyo p50 empeore más que --threshold.
+#
+# Uso (desde backend/):
+#   python -m benchmarks.compare base.json nuevo.json --threshold 10
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dos resultados JSON de benchmarks")
+    parser.add_argument("base")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Empeoramiento de p50 tolerado, en %%")
+    args = parser.parse_args()
+
+    base, candidate = load(args.base), load(args.candidate)
+    if base["benchmark"] != candidate["benchmark"]:
+        raise SystemExit(f"Benchmarks distintos: {base['benchmark']} vs {candidate['benchmark']}")
+
+    print(f"{base['benchmark']}: {base['environment'].get('git_commit')} -> {candidate['environment'].get('git_commit')}")
+    print(f"{'':<28}" + "".join(f"{metric:>29}" for metric in METRICS))
+
+    regressions = []
+    for name, before in base["results"].items():
+        after = candidate["results"].get(name)
+        if not after or "p50_ms" not in before or "p50_ms" not in after:
+            continue
+
+        cells = []
+        for metric in METRICS:
+            change = (after[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+            cells.append(f"{before[metric]:8.1f} -> {after[metric]:8.1f} {change:+5.0f}%")
+        print(f"{name:<28}" + "".join(f"{cell:>29}" for cell in cells))
+
+        if before["p50_ms"] and (after["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 > args.threshold:
+            regressions.append(name)
+
+    if regressions:
+        print(f"\nRegresiones (p50 > +{args.threshold:.0f}%): {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nSin regresiones")
+
+
+if __name__ == "__main__":
+    main()
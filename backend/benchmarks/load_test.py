@@ -0,0 +1,243 @@
+# Carga concurrente sobre los endpoints principales, contra una base sembrada
+# con benchmarks.seed. Cada worker inicia sesión con un doctor sembrado y
+# repite una mezcla ponderada de requests durante --duration segundos.
+#
+# Por defecto usa el test client de Flask en el mismo proceso (mide la app sin
+# servidor HTTP). Con --url apunta a un servidor ya levantado.
+#
+# Uso (desde backend/):
+#   python -m benchmarks.seed --db /tmp/bench.db
+#   python -m benchmarks.load_test --db /tmp/bench.db --concurrency 8 --duration 30 --output load.json
+#   python -m benchmarks.load_test --url http://localhost:5000 --mix predict=0
+import argparse
+import io
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from benchmarks.common import encode_png, setup_env, summarize, synthetic_xray, write_results
+from benchmarks.seed import BENCH_PASSWORD, doctor_email
+
+# Peso relativo de cada endpoint en la mezcla (--mix nombre=peso lo cambia)
+DEFAULT_MIX = {
+    "login": 1,
+    "patients": 3,
+    "diagnoses": 3,
+    "dashboard": 2,
+    "predict": 1,
+}
+
+
+class TestClientTransport:
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, headers=None, json_body=None, files=None):
+        if files is not None:
+            data = {name: (io.BytesIO(content), filename) for name, (content, filename) in files.items()}
+            data.update(json_body or {})
+            response = self.client.open(path, method=method, headers=headers, data=data,
+                                        content_type="multipart/form-data")
+        else:
+            response = self.client.open(path, method=method, headers=headers, json=json_body)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpTransport:
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, headers=None, json_body=None, files=None):
+        headers = dict(headers or {})
+        body = None
+        if files is not None:
+            boundary = uuid.uuid4().hex
+            parts = []
+            for name, value in (json_body or {}).items():
+                parts.append(
+                    f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+                )
+            for name, (content, filename) in files.items():
+                parts.append(
+                    f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                    f"Content-Type: application/octet-stream\r\n\r\n".encode() + content + b"\r\n"
+                )
+            body = b"".join(parts) + f"--{boundary}--\r\n".encode()
+            headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+        elif json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+
+class Worker:
+
+    def __init__(self, transport, doctor_index, mix, rng, unique_images):
+        self.transport = transport
+        self.email = doctor_email(doctor_index)
+        self.mix_names = list(mix)
+        self.mix_weights = [mix[name] for name in self.mix_names]
+        self.rng = rng
+        self.unique_images = unique_images
+        self.headers = None
+        self.patient_ids = []
+        self.image = encode_png(synthetic_xray(256, 256, seed=doctor_index))
+
+    def login(self):
+        status, body = self.transport.request(
+            "POST", "/api/auth/login", json_body={"email": self.email, "password": BENCH_PASSWORD}
+        )
+        if status == 200:
+            self.headers = {"Authorization": f"Bearer {body['access_token']}"}
+        return status
+
+    def setup(self):
+        if self.login() != 200:
+            raise SystemExit(f"No se pudo iniciar sesión como {self.email} (¿base sembrada con benchmarks.seed?)")
+        _, body = self.transport.request("GET", "/api/patients/?per_page=100", headers=self.headers)
+        self.patient_ids = [patient["id"] for patient in (body or {}).get("data", [])]
+
+    def predict_files(self):
+        if self.unique_images:
+            # Contenido distinto en cada request: sin aciertos de la caché de predicciones
+            image = encode_png(synthetic_xray(256, 256, seed=self.rng.randrange(1 << 30)))
+        else:
+            image = self.image
+        return {"image": (image, "bench.png")}
+
+    def call(self, name):
+        if name == "login":
+            return self.login()
+        if name == "patients":
+            return self.transport.request("GET", f"/api/patients/?page={self.rng.randint(1, 5)}", headers=self.headers)[0]
+        if name == "diagnoses":
+            return self.transport.request("GET", f"/api/diagnoses/?page={self.rng.randint(1, 5)}", headers=self.headers)[0]
+        if name == "dashboard":
+            return self.transport.request("GET", "/api/dashboard/summary", headers=self.headers)[0]
+        if name == "predict":
+            form = {"patient_id": str(self.rng.choice(self.patient_ids)), "disease_type": "COVID"}
+            return self.transport.request(
+                "POST", "/api/diagnoses/predict", headers=self.headers, json_body=form, files=self.predict_files()
+            )[0]
+        raise ValueError(f"Endpoint desconocido: {name}")
+
+    def run(self, deadline, record):
+        while time.perf_counter() < deadline:
+            name = self.rng.choices(self.mix_names, self.mix_weights)[0]
+            start = time.perf_counter()
+            try:
+                status = self.call(name)
+            except Exception as e:
+                status = type(e).__name__
+            record(name, status, (time.perf_counter() - start) * 1000)
+
+
+def parse_mix(values):
+    mix = dict(DEFAULT_MIX)
+    for value in values or ():
+        name, _, weight = value.partition("=")
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"Endpoint desconocido en --mix: {name} ({', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de los endpoints principales")
+    parser.add_argument("--db", default="/tmp/bench.db", help="SQLite sembrada (modo test client)")
+    parser.add_argument("--media-root", help="Carpeta de media (por defecto MEDIA_ROOT)")
+    parser.add_argument("--url", help="Servidor ya levantado, p. ej. http://localhost:5000")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=20, help="Segundos de carga")
+    parser.add_argument("--doctors", type=int, default=10, help="Doctores sembrados a repartir entre workers")
+    parser.add_argument("--mix", nargs="*", help="Pesos nombre=peso, p. ej. predict=0 dashboard=5")
+    parser.add_argument("--unique-images", action="store_true", help="Imagen distinta en cada /predict")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto stdout)")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+
+    if args.url:
+        def make_transport():
+            return HttpTransport(args.url)
+    else:
+        setup_env(args.db, args.media_root)
+        from app import create_app
+
+        app = create_app()
+
+        def make_transport():
+            return TestClientTransport(app)
+
+    workers = [
+        Worker(make_transport(), i % args.doctors, mix, random.Random(args.seed + i), args.unique_images)
+        for i in range(args.concurrency)
+    ]
+    for worker in workers:
+        worker.setup()
+
+    samples = {name: [] for name in mix}
+    statuses = {name: {} for name in mix}
+    lock = threading.Lock()
+
+    def record(name, status, elapsed_ms):
+        with lock:
+            samples[name].append(elapsed_ms)
+            statuses[name][str(status)] = statuses[name].get(str(status), 0) + 1
+
+    print(f"{args.concurrency} workers, {args.duration:.0f} s, mezcla {mix}")
+    start = time.perf_counter()
+    deadline = start + args.duration
+    threads = [threading.Thread(target=worker.run, args=(deadline, record)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    results = {}
+    for name in mix:
+        ok = sum(count for status, count in statuses[name].items() if status.startswith("2"))
+        results[name] = {
+            **summarize(samples[name]),
+            "throughput_rps": round(len(samples[name]) / elapsed, 2),
+            "errors": len(samples[name]) - ok,
+            "statuses": statuses[name],
+        }
+        summary = results[name]
+        if summary["runs"]:
+            print(f"  {name:<10} {summary['runs']:6} req  {summary['throughput_rps']:7.1f} req/s  "
+                  f"p50={summary['p50_ms']:8.1f} ms  p99={summary['p99_ms']:8.1f} ms  errores={summary['errors']}")
+
+    total = sum(len(values) for values in samples.values())
+    results["total"] = {"requests": total, "throughput_rps": round(total / elapsed, 2), "seconds": round(elapsed, 2)}
+
+    params = {
+        "target": args.url or "test_client",
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "mix": mix,
+        "unique_images": args.unique_images,
+    }
+    write_results(args.output, "load_test", params, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# Siembra una base local (SQLite o MySQL) con datos sintéticos para los
+# benchmarks: N doctores, M pacientes y K diagnósticos repartidos en los
+# últimos 90 días, más radiografías y heatmaps de relleno en el storage de media.
+# Las filas se insertan por lotes sobre las tablas de los modelos; al final se
+# reconstruye doctor_stats.
+#
+# Los doctores son doctor<i>@bench.local con contraseña BENCH_PASSWORD.
+#
+# Uso (desde backend/):
+#   python -m benchmarks.seed --db /tmp/bench.db --doctors 10 --patients 2000 --diagnoses 100000
+#   DATABASE_URL=mysql+pymysql://... python -m benchmarks.seed --reset
+import argparse
+import hashlib
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import encode_png, parse_size, setup_env, synthetic_xray
+
+BENCH_PASSWORD = "bench-password"
+RESULTS = ("COVID", "NORMAL", "Positivo", "Negativo", "Riesgo Alto", "Riesgo Bajo")
+
+
+def doctor_email(i):
+    return f"doctor{i}@bench.local"
+
+
+def seed_media(count, size):
+    # Devuelve [(image_key, heatmap_key)] de archivos de relleno por contenido
+    from app.services import storage
+    from app.services.uploads import content_filename
+
+    height, width = size
+    keys = []
+    for i in range(count):
+        data = encode_png(synthetic_xray(height, width, seed=i))
+        filename = content_filename(hashlib.sha256(data).hexdigest(), ".png")
+        image_key, heatmap_key = storage.upload_key(filename), storage.heatmap_key(filename)
+        if not storage.media.exists(image_key):
+            storage.media.write(image_key, data)
+        if not storage.media.exists(heatmap_key):
+            storage.media.write(heatmap_key, data)
+        keys.append((image_key, heatmap_key))
+    return keys
+
+
+def seed(db, doctors, patients, diagnoses, media, media_size=(512, 512), chunk_size=5000, rng_seed=0):
+    from werkzeug.security import generate_password_hash
+
+    from app.models.diagnosis import Diagnosis
+    from app.models.doctor import Doctor
+    from app.models.patient import Patient
+    from app.services import stats
+
+    rng = random.Random(rng_seed)
+    now = datetime.utcnow()
+    timings = {}
+
+    def insert(table, rows):
+        for start in range(0, len(rows), chunk_size):
+            db.session.execute(table.insert(), rows[start:start + chunk_size])
+            db.session.commit()
+
+    # Un solo hash para todos: el costo de generate_password_hash es deliberado
+    password = generate_password_hash(BENCH_PASSWORD)
+    start = time.perf_counter()
+    insert(Doctor.__table__, [
+        {"email": doctor_email(i), "password": password, "full_name": f"Doctor {i}", "specialty": "Neumología"}
+        for i in range(doctors)
+    ])
+    doctor_ids = [
+        doctor_id for (doctor_id,) in
+        db.session.query(Doctor.id).filter(Doctor.email.like("%@bench.local")).order_by(Doctor.id)
+    ]
+    timings["doctors"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    insert(Patient.__table__, [
+        {
+            "doctor_id": doctor_ids[i % len(doctor_ids)],
+            "full_name": f"Paciente {i}",
+            "dni": str(30000000 + i),
+            "age": rng.randint(1, 95),
+            "gender": rng.choice("MFO"),
+            "created_at": now - timedelta(days=rng.uniform(0, 90)),
+        }
+        for i in range(patients)
+    ])
+    patient_doctors = db.session.query(Patient.id, Patient.doctor_id).filter(
+        Patient.doctor_id.in_(doctor_ids)
+    ).all()
+    timings["patients"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    media_keys = seed_media(media, media_size)
+    timings["media"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = []
+    for i in range(diagnoses):
+        patient_id, doctor_id = patient_doctors[rng.randrange(len(patient_doctors))]
+        image_key, heatmap_key = media_keys[i % len(media_keys)]
+        rows.append({
+            "patient_id": patient_id,
+            "doctor_id": doctor_id,
+            "image_path": image_key,
+            "heatmap_path": heatmap_key,
+            "result": rng.choice(RESULTS),
+            "confidence": round(rng.uniform(50, 99.99), 2),
+            "created_at": now - timedelta(days=rng.uniform(0, 90)),
+        })
+        if len(rows) >= chunk_size:
+            insert(Diagnosis.__table__, rows)
+            rows = []
+    insert(Diagnosis.__table__, rows)
+    timings["diagnoses"] = time.perf_counter() - start
+
+    # Los inserts masivos no pasan por los listeners de stats
+    start = time.perf_counter()
+    stats.rebuild()
+    timings["stats"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Siembra de datos sintéticos para benchmarks")
+    parser.add_argument("--db", default="/tmp/bench.db", help="SQLite a usar si no hay DATABASE_URL")
+    parser.add_argument("--media-root", help="Carpeta de media (por defecto MEDIA_ROOT)")
+    parser.add_argument("--doctors", type=int, default=10)
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--diagnoses", type=int, default=20000)
+    parser.add_argument("--media", type=int, default=20, help="Radiografías de relleno distintas")
+    parser.add_argument("--media-size", default="512x512", help="Alto x ancho de las radiografías de relleno")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true", help="Borra y recrea todas las tablas")
+    args = parser.parse_args()
+
+    setup_env(args.db, args.media_root)
+
+    from app import create_app
+    from app.extensions import db
+    from app.models.doctor import Doctor
+
+    app = create_app()
+    with app.app_context():
+        print(f"Base: {app.config['SQLALCHEMY_DATABASE_URI']}")
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+
+        if Doctor.query.filter_by(email=doctor_email(0)).first() is not None:
+            raise SystemExit("La base ya tiene datos sembrados (usar --reset para empezar de cero)")
+
+        timings = seed(
+            db, args.doctors, args.patients, args.diagnoses, args.media,
+            parse_size(args.media_size), rng_seed=args.seed
+        )
+
+    for name, seconds in timings.items():
+        print(f"  {name:<10} {seconds:7.2f} s")
+    print(f"{args.doctors} doctores, {args.patients} pacientes, {args.diagnoses} diagnósticos, "
+          f"{args.media} radiografías. Login: {doctor_email(0)} / {BENCH_PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""initial schema
+
+Tablas existentes antes de usar migraciones. En una base ya creada marcar con
+`flask db stamp 0001_initial_schema` en lugar de ejecutar esta migración.
+
+Revision ID: 0001_initial_schema
+Revises: 
+Create Date: 2026-10-18 05:05:04.682114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_initial_schema'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('doctors',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('password', sa.String(length=255), nullable=False),
+    sa.Column('full_name', sa.String(length=100), nullable=False),
+    sa.Column('specialty', sa.String(length=100), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    op.create_table('patients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('full_name', sa.String(length=100), nullable=False),
+    sa.Column('dni', sa.String(length=20), nullable=True),
+    sa.Column('age', sa.Integer(), nullable=True),
+    sa.Column('gender', sa.Enum('M', 'F', 'O'), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('diagnoses',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('image_path', sa.String(length=255), nullable=False),
+    sa.Column('heatmap_path', sa.String(length=255), nullable=False),
+    sa.Column('result', sa.String(length=50), nullable=False),
+    sa.Column('confidence', sa.Numeric(precision=5, scale=2), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('diagnoses')
+    op.drop_table('patients')
+    op.drop_table('doctors')
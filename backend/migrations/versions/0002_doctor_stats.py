@@ -0,0 +1,53 @@
+"""doctor stats tables
+
+Si las tablas ya se crearon con `flask stats rebuild` no se vuelven a crear.
+Después de migrar, ejecutar `flask stats rebuild` para poblarlas.
+
+Revision ID: 0002_doctor_stats
+Revises: 0001_initial_schema
+Create Date: 2026-10-18 05:10:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_doctor_stats'
+down_revision = '0001_initial_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = sa.inspect(op.get_bind()).get_table_names()
+
+    if 'doctor_stats' not in existing:
+        op.create_table('doctor_stats',
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('total_patients', sa.Integer(), nullable=False),
+        sa.Column('male_patients', sa.Integer(), nullable=False),
+        sa.Column('female_patients', sa.Integer(), nullable=False),
+        sa.Column('other_patients', sa.Integer(), nullable=False),
+        sa.Column('age_sum', sa.BigInteger(), nullable=False),
+        sa.Column('age_count', sa.Integer(), nullable=False),
+        sa.Column('total_diagnoses', sa.Integer(), nullable=False),
+        sa.Column('covid_positive', sa.Integer(), nullable=False),
+        sa.Column('covid_negative', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ),
+        sa.PrimaryKeyConstraint('doctor_id')
+        )
+
+    if 'doctor_daily_stats' not in existing:
+        op.create_table('doctor_daily_stats',
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('diagnoses', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ),
+        sa.PrimaryKeyConstraint('doctor_id', 'day')
+        )
+
+
+def downgrade():
+    op.drop_table('doctor_daily_stats')
+    op.drop_table('doctor_stats')
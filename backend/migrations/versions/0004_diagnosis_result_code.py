@@ -0,0 +1,53 @@
+"""diagnosis result code
+
+Agrega diagnoses.result_code (código indexado de la etiqueta de resultado) y
+lo completa para las filas existentes.
+
+Revision ID: 0004_diagnosis_result_code
+Revises: 0003_hot_filter_indexes
+Create Date: 2026-10-18 05:06:22.976029
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_diagnosis_result_code'
+down_revision = '0003_hot_filter_indexes'
+branch_labels = None
+depends_on = None
+
+# Copia fija de app.models.diagnosis.RESULT_CODES al momento de la migración
+RESULT_CODES = {
+    "COVID": 1,
+    "NORMAL": 2,
+    "Positivo": 3,
+    "Negativo": 4,
+    "Riesgo Alto": 5,
+    "Riesgo Bajo": 6,
+    "MOCK_RESULT": 7,
+}
+
+
+def upgrade():
+    with op.batch_alter_table('diagnoses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('result_code', sa.SmallInteger(), nullable=False, server_default='0'))
+
+    # Backfill: un solo UPDATE con CASE sobre la etiqueta
+    diagnoses = sa.table('diagnoses', sa.column('result', sa.String), sa.column('result_code', sa.SmallInteger))
+    op.execute(
+        diagnoses.update().values(result_code=sa.case(
+            *[(diagnoses.c.result == label, code) for label, code in RESULT_CODES.items()],
+            else_=0
+        ))
+    )
+
+    with op.batch_alter_table('diagnoses', schema=None) as batch_op:
+        batch_op.create_index('ix_diagnoses_result_code', ['result_code', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('diagnoses', schema=None) as batch_op:
+        batch_op.drop_index('ix_diagnoses_result_code')
+        batch_op.drop_column('result_code')
@@ -0,0 +1,63 @@
+# Configuración común de las pruebas: SQLite por prueba, media en un
+# temporal, cola de jobs inline y un hash de contraseñas barato. Las
+# variables se fijan antes de importar la app (Config las lee al importar).
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="covid-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/app.db"
+os.environ["SECRET_KEY"] = "test-secret-key-de-al-menos-32-bytes"
+os.environ["MEDIA_ROOT"] = os.path.join(_tmp, "media")
+os.environ["JOB_QUEUE_MODE"] = "inline"
+os.environ["MODEL_WARMUP"] = "off"
+os.environ["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+
+import pytest
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.services import dashboard, identity, prediction_cache, thumbnails
+from tests.helpers import register
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    # make_app(**config) crea una app sobre una base nueva en tmp_path
+    apps = []
+
+    def factory(**config):
+        monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path}/app.db")
+        for name, value in config.items():
+            monkeypatch.setattr(Config, name, value)
+        app = create_app()
+        app.config["TESTING"] = True
+        with app.app_context():
+            db.create_all()
+        apps.append(app)
+        return app
+
+    # Las cachés son globales al proceso y los ids se repiten entre bases
+    for cache in (dashboard.summary_cache, identity.identity_cache, prediction_cache.memory, thumbnails.unreadable):
+        cache.clear()
+    yield factory
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(client):
+    return register(client)
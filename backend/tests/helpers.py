@@ -0,0 +1,20 @@
+# Utilidades compartidas por las pruebas (import: from tests.helpers import ...)
+import struct
+import zlib
+
+
+def register(client, email="doctor@test.local", password="secret"):
+    client.post("/api/auth/register", json={"email": email, "password": password, "full_name": "Doctor"})
+    response = client.post("/api/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+
+def png_bytes(size=64, gray=0x80):
+    # PNG RGB válido de size x size; cambiar size o gray cambia el contenido
+    raw = b"".join(b"\x00" + bytes([gray]) * 3 * size for _ in range(size))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
@@ -0,0 +1,64 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from app.services import storage
+from tests.helpers import png_bytes, register
+
+
+def archive(kind, members):
+    buffer = io.BytesIO()
+    if kind == "zip":
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, data in members:
+                zf.writestr(name, data)
+    else:
+        with tarfile.open(fileobj=buffer, mode="w:gz") as tf:
+            for name, data in members:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tf.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+
+def uploads_on_disk():
+    root = os.path.join(storage.media.root, "uploads")
+    return {name for _, _, names in os.walk(root) for name in names}
+
+
+@pytest.fixture
+def post_archive(make_app):
+    def post(kind, members, **config):
+        client = make_app(**config).test_client()
+        headers = register(client)
+        data = {"patient_id": "1", "archive": (archive(kind, members), f"estudio.{'zip' if kind == 'zip' else 'tgz'}")}
+        return client.post(
+            "/api/diagnoses/predict/batch", data=data, content_type="multipart/form-data", headers=headers
+        )
+    return post
+
+
+@pytest.mark.parametrize("kind", ["zip", "tar"])
+def test_archive_member_over_image_limit_is_rejected(post_archive, kind):
+    before = uploads_on_disk()
+    # Comprime a unos pocos bytes, pero declara 1 MB descomprimido
+    response = post_archive(kind, [("bomba.png", b"\x00" * 1024 * 1024)], UPLOAD_MAX_BYTES=64 * 1024)
+    assert response.status_code == 400
+    assert "por imagen" in response.get_json()["error"]
+    assert uploads_on_disk() == before
+
+
+@pytest.mark.parametrize("kind", ["zip", "tar"])
+def test_archive_over_total_limit_discards_stored_members(post_archive, kind):
+    before = uploads_on_disk()
+    image = png_bytes(size=60 + (kind == "tar"))
+    members = [("1/rx.png", image), ("1/relleno.png", b"\x00" * 4096)]
+    response = post_archive(kind, members, UPLOAD_MAX_BYTES=8192, PREDICT_BATCH_MAX_BYTES=len(image) + 1024)
+    assert response.status_code == 400
+    assert "descomprimidos" in response.get_json()["error"]
+    # La primera imagen llegó a guardarse y se borra con el rechazo
+    assert uploads_on_disk() == before
@@ -0,0 +1,46 @@
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+import pytest
+
+from app.ml.batcher import MicroBatcher
+
+
+def double(items):
+    return list(items * 2)
+
+
+def test_bad_item_fails_its_batch_and_dispatcher_survives():
+    batcher = MicroBatcher(double, max_batch_size=4, max_wait_ms=200, timeout=5)
+
+    # Mismo batch: el stack falla y todos los llamadores reciben el error
+    bad = batcher.submit(np.zeros(2))
+    good = batcher.submit(np.zeros(3))
+    with pytest.raises(ValueError):
+        bad.result(5)
+    with pytest.raises(ValueError):
+        good.result(5)
+
+    # El despachador sigue vivo para el batch siguiente
+    assert list(batcher(np.ones(3))) == [2, 2, 2]
+
+
+def test_timeout_does_not_hang_the_caller():
+    release = threading.Event()
+
+    def blocked(items):
+        release.wait(5)
+        return list(items)
+
+    batcher = MicroBatcher(blocked, max_batch_size=1, max_wait_ms=1, timeout=0.1)
+    try:
+        with pytest.raises(FutureTimeout):
+            batcher(np.zeros(3))
+        # El segundo espera detrás del primero y se cancela sin llegar a correr
+        with pytest.raises(FutureTimeout):
+            batcher(np.zeros(3))
+    finally:
+        release.set()
+    batcher.timeout = 5
+    assert list(batcher(np.ones(3))) == [1, 1, 1]
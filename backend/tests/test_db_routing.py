@@ -0,0 +1,120 @@
+# Réplica de lectura con dos archivos SQLite: la réplica es una copia del
+# primario, así una fila escrita solo en uno de los dos dice de dónde leyó
+# cada endpoint.
+import shutil
+import sqlite3
+
+import pytest
+from flask import g
+
+from app.extensions import db
+from app.models.patient import Patient
+from app.services import db_routing, metrics
+from tests.helpers import register
+
+
+@pytest.fixture
+def replica_app(make_app, tmp_path):
+    primary = tmp_path / "app.db"
+    replica = tmp_path / "replica.db"
+    # El esquema tiene que existir antes de copiarlo
+    setup = make_app()
+    with setup.app_context():
+        db.engines[None].dispose()
+    shutil.copy(primary, replica)
+    app = make_app(SQLALCHEMY_REPLICA_URI=f"sqlite:///{replica}")
+    app.primary, app.replica = primary, replica
+    yield app
+    # init_app deja un MetaData vacío para el bind en el db global; sin él,
+    # create_all de la próxima app (sin réplica) no encuentra el bind
+    db.metadatas.pop(db_routing.REPLICA_BIND, None)
+
+
+def insert_patient(path, name):
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "INSERT INTO patients (doctor_id, full_name, age, gender) VALUES (1, ?, 40, 'F')", (name,)
+        )
+
+
+def patient_names(path):
+    with sqlite3.connect(path) as conn:
+        return [name for (name,) in conn.execute("SELECT full_name FROM patients ORDER BY id")]
+
+
+def test_read_only_views_use_replica(replica_app):
+    client = replica_app.test_client()
+    headers = register(client)
+    # La réplica todavía no tiene al doctor ni al paciente: la identidad del
+    # JWT se resuelve en el primario y el listado lee la réplica
+    shutil.copy(replica_app.primary, replica_app.replica)
+    insert_patient(replica_app.replica, "Solo en réplica")
+
+    response = client.get("/api/patients/", headers=headers)
+    assert response.status_code == 200
+    assert [p["full_name"] for p in response.get_json()["data"]] == ["Solo en réplica"]
+
+    for url in ("/api/diagnoses/", "/api/diagnoses/patient/1"):
+        assert client.get(url, headers=headers).status_code == 200
+
+
+def test_writes_and_other_views_use_primary(replica_app):
+    client = replica_app.test_client()
+    headers = register(client)
+    shutil.copy(replica_app.primary, replica_app.replica)
+
+    response = client.post("/api/patients/", json={"full_name": "Nuevo", "age": 30, "gender": "M"}, headers=headers)
+    assert response.status_code == 201
+    assert patient_names(replica_app.primary) == ["Nuevo"]
+    assert patient_names(replica_app.replica) == []
+
+    # /patients/<id> no está marcada como de solo lectura
+    response = client.get(f"/api/patients/{response.get_json()['id']}", headers=headers)
+    assert response.status_code == 200
+
+
+def test_dashboard_after_write_is_not_cached_from_lagging_replica(replica_app):
+    client = replica_app.test_client()
+    headers = register(client)
+    shutil.copy(replica_app.primary, replica_app.replica)
+    assert client.get("/api/dashboard/summary", headers=headers).get_json()["patients"]["total"] == 0
+
+    # La réplica no recibe la escritura (retraso de replicación)
+    client.post("/api/patients/", json={"full_name": "Nuevo", "age": 30, "gender": "M"}, headers=headers)
+    assert patient_names(replica_app.replica) == []
+
+    for _ in range(2):
+        summary = client.get("/api/dashboard/summary", headers=headers).get_json()
+        assert summary["patients"]["total"] == 1
+
+
+def test_dml_in_read_only_view_goes_to_primary(replica_app):
+    with replica_app.test_request_context():
+        g.db_read_only = True
+        replica = db.engines[db_routing.REPLICA_BIND]
+        select = db.select(Patient.id)
+        insert = db.insert(Patient).values(doctor_id=1, full_name="x")
+        assert db.session.get_bind(mapper=Patient.__mapper__, clause=select) is replica
+        assert db.session.get_bind(mapper=Patient.__mapper__, clause=insert) is db.engines[None]
+
+
+def test_without_read_only_flag_uses_primary(replica_app):
+    with replica_app.test_request_context():
+        bind = db.session.get_bind(mapper=Patient.__mapper__, clause=db.select(Patient.id))
+        assert bind is db.engines[None]
+
+
+def test_without_replica_nothing_changes(app):
+    with app.test_request_context():
+        g.db_read_only = True
+        assert db_routing.REPLICA_BIND not in db.engines
+        assert db.session.get_bind(mapper=Patient.__mapper__, clause=db.select(Patient.id)) is db.engines[None]
+
+
+def test_pool_wait_is_reported_per_bind(replica_app):
+    client = replica_app.test_client()
+    headers = register(client)
+    client.get("/api/patients/", headers=headers)
+    text = metrics.render()
+    assert 'db_pool_checkout_wait_seconds_count{bind="primary"}' in text
+    assert 'db_pool_checkout_wait_seconds_count{bind="replica"}' in text
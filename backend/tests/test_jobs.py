@@ -0,0 +1,113 @@
+import hashlib
+import io
+import threading
+
+import pytest
+from flask import Flask
+
+from app.services.jobs import JobQueue, QueueFullError
+from tests.helpers import png_bytes
+
+
+def make_queue(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    return JobQueue(app)
+
+
+def test_inline_runs_before_submit_returns():
+    queue = make_queue(JOB_QUEUE_MODE="inline")
+    job = queue.submit(1, lambda a, b: a + b, 2, 3)
+    assert job.status == "finished"
+    assert job.result == 5
+    assert job.finished_at is not None
+    assert queue.get(job.id) is job
+
+
+def test_inline_failure_is_recorded():
+    queue = make_queue(JOB_QUEUE_MODE="inline")
+
+    def fail():
+        raise ValueError("imagen inválida")
+
+    job = queue.submit(1, fail)
+    assert job.status == "failed"
+    assert job.error == "imagen inválida"
+
+
+def test_inline_never_reports_full():
+    queue = make_queue(JOB_QUEUE_MODE="inline", JOB_QUEUE_SIZE=1)
+    for _ in range(3):
+        queue.submit(1, lambda: None)
+    assert not queue.is_full()
+
+
+def test_thread_queue_rejects_when_full():
+    queue = make_queue(JOB_QUEUE_MODE="thread", JOB_QUEUE_WORKERS=1, JOB_QUEUE_SIZE=1)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    running = queue.submit(1, block)
+    assert started.wait(5)
+    queued = queue.submit(1, lambda: "ok")
+    assert queue.is_full()
+    with pytest.raises(QueueFullError):
+        queue.submit(1, lambda: None)
+
+    release.set()
+    queue._queue.join()
+    assert running.status == "finished"
+    assert queued.result == "ok"
+
+
+def test_history_drops_oldest_finished_jobs():
+    queue = make_queue(JOB_QUEUE_MODE="inline", JOB_QUEUE_HISTORY=2)
+    jobs = [queue.submit(1, lambda: None) for _ in range(3)]
+    assert queue.get(jobs[0].id) is None
+    assert queue.get(jobs[2].id) is jobs[2]
+
+
+def test_async_predict_finishes_inline(client, auth_headers):
+    patient = client.post(
+        "/api/patients/", json={"full_name": "P", "age": 40, "gender": "F"}, headers=auth_headers
+    ).get_json()
+    data = {"patient_id": str(patient["id"]), "disease_type": "IRA", "image": (io.BytesIO(png_bytes()), "rx.png")}
+    response = client.post(
+        "/api/diagnoses/predict?async=1", data=data, headers=auth_headers, content_type="multipart/form-data"
+    )
+    assert response.status_code == 202
+    job = client.get(f"/api/diagnoses/jobs/{response.get_json()['job_id']}", headers=auth_headers).get_json()
+    assert job["status"] == "finished"
+    assert job["result"]["id"] is not None
+
+
+@pytest.mark.parametrize("run_async", [False, True])
+def test_failed_predict_discards_upload(client, auth_headers, monkeypatch, run_async):
+    from app.routes import diagnosis_routes
+    from app.services import storage
+
+    def fail(*args):
+        raise RuntimeError("fallo del modelo")
+
+    monkeypatch.setattr(diagnosis_routes, "mock_prediction", fail)
+    patient = client.post(
+        "/api/patients/", json={"full_name": "P", "age": 40, "gender": "F"}, headers=auth_headers
+    ).get_json()
+    # Imagen distinta por caso: el nombre es por contenido
+    image = png_bytes(size=70 + run_async)
+    data = {"patient_id": str(patient["id"]), "disease_type": "IRA", "image": (io.BytesIO(image), "rx.png")}
+    response = client.post(
+        f"/api/diagnoses/predict?async={int(run_async)}", data=data, headers=auth_headers,
+        content_type="multipart/form-data"
+    )
+
+    if run_async:
+        job = client.get(f"/api/diagnoses/jobs/{response.get_json()['job_id']}", headers=auth_headers).get_json()
+        assert job["status"] == "failed"
+    else:
+        assert response.status_code == 500
+    filename = f"{hashlib.sha256(image).hexdigest()}.png"
+    assert not storage.media.exists(storage.upload_key(filename))
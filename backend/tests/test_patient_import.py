@@ -0,0 +1,142 @@
+# Alta masiva de pacientes (POST /api/patients/bulk): formatos, validación por
+# fila, upsert por dni, lotes que fallan y consistencia de doctor_stats.
+import json
+
+import pytest
+
+from app.models.patient import Patient
+from app.services import patient_import, stats
+
+
+def bulk(client, headers, body, content_type="text/csv", **params):
+    query = "&".join(f"{key}={value}" for key, value in params.items())
+    response = client.post(f"/api/patients/bulk?{query}", data=body, content_type=content_type, headers=headers)
+    if response.status_code != 200:
+        return response.status_code, response.get_json()
+    return 200, [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def patients(app):
+    with app.app_context():
+        return [(p.full_name, p.dni, p.age, p.gender) for p in Patient.query.order_by(Patient.id)]
+
+
+def stats_problems(app):
+    # Lo mismo que `flask stats check`
+    with app.app_context():
+        return stats.check()
+
+
+def test_csv_import(app, client, auth_headers):
+    body = "full_name,age,gender,dni\nAna,30,f,1\nBeto,41,M,\n"
+    status, report = bulk(client, auth_headers, body)
+    assert status == 200
+    assert report[-1] == {"status": "done", "total": 2, "inserted": 2, "updated": 0, "failed": 0}
+    assert patients(app) == [("Ana", "1", 30, "F"), ("Beto", None, 41, "M")]
+    assert stats_problems(app) == []
+
+
+def test_ndjson_import_reports_bad_lines(app, client, auth_headers):
+    body = "\n".join([
+        json.dumps({"full_name": "Ana", "age": 30, "gender": "F"}),
+        "{no es json",
+        "[1, 2]",
+        "",
+        json.dumps({"full_name": "Beto", "age": 41.0, "gender": "M"}),
+    ])
+    status, report = bulk(client, auth_headers, body, content_type="application/x-ndjson")
+    assert status == 200
+    assert {"line": 2, "error": "JSON inválido"} in report
+    assert {"line": 3, "error": "Cada línea debe ser un objeto JSON"} in report
+    assert report[-1] == {"status": "done", "total": 4, "inserted": 2, "updated": 0, "failed": 2}
+    assert [name for name, *_ in patients(app)] == ["Ana", "Beto"]
+
+
+@pytest.mark.parametrize("body, content_type, error", [
+    ("full_name,age\nAna,30\n", "text/csv", "Faltan columnas en el CSV: gender"),
+    ("", "text/csv", "El CSV está vacío"),
+    ("full_name,age,gender\n", "application/xml", "Formato no soportado"),
+])
+def test_rejected_before_reading_rows(app, client, auth_headers, body, content_type, error):
+    status, response = bulk(client, auth_headers, body, content_type=content_type)
+    assert status == 400
+    assert error in response["error"]
+    assert patients(app) == []
+
+
+def test_invalid_chunk_size(client, auth_headers):
+    status, _ = bulk(client, auth_headers, "full_name,age,gender\n", chunk_size=0)
+    assert status == 400
+
+
+def test_row_validation_errors(app, client, auth_headers):
+    body = (
+        "full_name,age,gender,dni\n"
+        ",30,F,\n"
+        "Ana,abc,F,\n"
+        "Beto,200,X,\n"
+        f"{'x' * 101},2.5,M,{'9' * 21}\n"
+        "Carla,50,o,\n"
+    )
+    status, report = bulk(client, auth_headers, body)
+    errors = {entry["line"]: entry["errors"] for entry in report if "errors" in entry}
+    assert errors == {
+        2: {"full_name": "Campo requerido"},
+        3: {"age": "Debe ser un número entero"},
+        4: {"age": "Debe estar entre 0 y 150", "gender": "Debe ser uno de M, F, O"},
+        5: {"full_name": "Máximo 100 caracteres", "age": "Debe ser un número entero", "dni": "Máximo 20 caracteres"},
+    }
+    assert report[-1]["failed"] == 4
+    assert patients(app) == [("Carla", None, 50, "O")]
+    assert stats_problems(app) == []
+
+
+def test_upsert_updates_by_dni(app, client, auth_headers):
+    bulk(client, auth_headers, "full_name,age,gender,dni\nAna,30,F,1\nBeto,41,M,2\n")
+
+    status, report = bulk(client, auth_headers, "full_name,age,gender,dni\nAna María,31,F,1\nCarla,50,O,3\n", upsert=1)
+    assert report[-1] == {"status": "done", "total": 2, "inserted": 1, "updated": 1, "failed": 0}
+    assert patients(app) == [("Ana María", "1", 31, "F"), ("Beto", "2", 41, "M"), ("Carla", "3", 50, "O")]
+    assert stats_problems(app) == []
+
+    # Sin upsert el mismo dni crea otro paciente
+    bulk(client, auth_headers, "full_name,age,gender,dni\nOtra Ana,20,F,1\n")
+    assert [dni for _, dni, *_ in patients(app)].count("1") == 2
+
+
+def test_upsert_duplicate_dni_in_chunk_updates_the_new_row(app, client, auth_headers):
+    # La segunda aparición cierra el lote y actualiza la fila recién insertada
+    body = "full_name,age,gender,dni\nAna,30,F,1\nBeto,41,M,2\nAna bis,32,F,1\n"
+    status, report = bulk(client, auth_headers, body, upsert=1, chunk_size=10)
+    progress = [entry for entry in report if entry.get("status") == "progress"]
+    assert [(p["inserted"], p["updated"]) for p in progress] == [(2, 0), (2, 1)]
+    assert report[-1] == {"status": "done", "total": 3, "inserted": 2, "updated": 1, "failed": 0}
+    assert patients(app) == [("Ana bis", "1", 32, "F"), ("Beto", "2", 41, "M")]
+    assert stats_problems(app) == []
+
+
+def test_failed_chunk_is_rolled_back(app, client, auth_headers, monkeypatch):
+    apply_deltas = stats.apply_deltas
+    calls = []
+
+    def fail_second_chunk(connection, *deltas):
+        # Después del INSERT masivo: el rollback tiene que deshacerlo
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("se cayó la base")
+        return apply_deltas(connection, *deltas)
+
+    monkeypatch.setattr(patient_import.stats, "apply_deltas", fail_second_chunk)
+    body = "full_name,age,gender\n" + "".join(f"P{i},{20 + i},M\n" for i in range(5))
+    status, report = bulk(client, auth_headers, body, chunk_size=2)
+
+    assert {"line": 4, "error": "No se pudo guardar el lote de esta fila"} in report
+    assert {"line": 5, "error": "No se pudo guardar el lote de esta fila"} in report
+    assert report[-1] == {"status": "done", "total": 5, "inserted": 3, "updated": 0, "failed": 2}
+    assert [name for name, *_ in patients(app)] == ["P0", "P1", "P4"]
+    assert stats_problems(app) == []
+
+    with app.app_context():
+        summary = stats.read_summary(1)
+    assert summary["total_patients"] == 3
+    assert summary["male_patients"] == 3
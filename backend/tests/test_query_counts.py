@@ -0,0 +1,58 @@
+# Número fijo de sentencias SQL por listado: no debe crecer con la cantidad
+# de filas (sin N+1). Si un cambio agrega una consulta a propósito, se
+# actualiza el número esperado acá.
+import pytest
+
+from app.extensions import db
+from app.models.diagnosis import Diagnosis
+from app.models.patient import Patient
+from app.services import dashboard
+from app.services.query_counter import count_queries
+
+
+def seed(app, patients, diagnoses_per_patient):
+    with app.app_context():
+        for i in range(patients):
+            patient = Patient(doctor_id=1, full_name=f"Paciente {i}", dni=str(i), age=30 + i, gender="MFO"[i % 3])
+            db.session.add(patient)
+            db.session.flush()
+            for j in range(diagnoses_per_patient):
+                db.session.add(Diagnosis(
+                    patient_id=patient.id, doctor_id=1, image_path=f"uploads/x-ray/{i}-{j}.png",
+                    heatmap_path=f"heatmap/{i}-{j}.png", result=("COVID", "NORMAL")[j % 2], confidence=90.0
+                ))
+        db.session.commit()
+
+
+def queries(client, headers, url):
+    # El primer request carga la identidad del JWT en caché; se mide el segundo
+    client.get(url, headers=headers)
+    dashboard.summary_cache.clear()
+    with count_queries() as counter:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return counter["count"]
+
+
+LISTINGS = {
+    "/api/patients/": 2,
+    "/api/patients/?cursor=": 1,
+    "/api/diagnoses/": 2,
+    "/api/diagnoses/?cursor=": 1,
+    "/api/diagnoses/patient/1": 2,
+    "/api/dashboard/summary": 2,
+}
+
+
+@pytest.mark.parametrize("url", LISTINGS)
+def test_listing_query_count(app, client, auth_headers, url):
+    seed(app, patients=3, diagnoses_per_patient=2)
+    assert queries(client, auth_headers, url) == LISTINGS[url]
+
+
+@pytest.mark.parametrize("url", LISTINGS)
+def test_listing_query_count_does_not_grow_with_rows(app, client, auth_headers, url):
+    seed(app, patients=1, diagnoses_per_patient=1)
+    few = queries(client, auth_headers, url)
+    seed(app, patients=8, diagnoses_per_patient=3)
+    assert queries(client, auth_headers, url) == few
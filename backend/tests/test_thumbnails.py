@@ -0,0 +1,22 @@
+from app.services import storage, thumbnails
+
+
+def test_corrupt_original_thumb_is_404_and_not_retried(client, monkeypatch):
+    key = storage.upload_key("0badc0de.png")
+    storage.media.write(key, b"\x89PNG\r\n\x1a\nno es una imagen")
+
+    calls = []
+    render = thumbnails.render
+
+    def counting_render(data):
+        calls.append(key)
+        return render(data)
+
+    monkeypatch.setattr(thumbnails, "render", counting_render)
+    for _ in range(2):
+        assert client.get(f"/media/{key}?size=thumb").status_code == 404
+    assert len(calls) == 1
+    assert not storage.media.exists(thumbnails.thumbnail_key(key))
+
+    # El original se sigue sirviendo tal cual
+    assert client.get(f"/media/{key}").status_code == 200
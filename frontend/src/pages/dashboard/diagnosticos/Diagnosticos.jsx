@@ -282,7 +282,7 @@ function Diagnosticos() {
               {diagnosticos.map(diag => (
                 <div key={diag.id} className="diagnostico-card">
                   <div className="diagnostico-image">
-                    <img src={diag.image_url} alt="Rayos X" />
+                    <img src={diag.thumbnail_url || diag.image_url} alt="Rayos X" loading="lazy" />
                   </div>
                   <div className="diagnostico-info">
                     <h4>{diag.patient_name}</h4>